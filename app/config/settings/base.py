@@ -108,6 +108,18 @@ USE_L10N = True
 USE_TZ = True
 
 
+# Cache
+# Shared tier of the results cache, eg. CACHE_BACKEND=django_redis.cache.RedisCache
+# and CACHE_LOCATION=redis://redis:6379/0 in production, local memory by default
+
+CACHES = {
+    'default': {
+        'BACKEND': get_env_variable('CACHE_BACKEND') or 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': get_env_variable('CACHE_LOCATION') or '',
+    }
+}
+
+
 # Django Rest Framework
 
 REST_FRAMEWORK = {
@@ -3,3 +3,29 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'google_scraper.core'
+
+    # Outgoing http connections are kept alive in the pool shared by the process
+    # Number of pooled hosts and max number of connections kept for each host
+    HTTP_POOL_CONNECTIONS = 10
+    HTTP_POOL_SIZE = 20
+
+    # Connect and read timeout in sec
+    HTTP_TIMEOUT = 10
+
+    # Retries of failed connections and server errors, with exponential backoff: factor * 2 ** (retry - 1) sec.
+    # The asynchronous client retries only failed connections, with its own backoff
+    HTTP_RETRIES = 2
+    HTTP_BACKOFF_FACTOR = 0.3
+    HTTP_RETRY_STATUSES = (500, 502, 503, 504)
+
+    # Use HTTP/2 in the asynchronous client, if h2 package is installed
+    HTTP2 = True
+
+    # Compression of API responses: brotli quality (0-11) used if brotli package is installed, else gzip level (1-9).
+    # Responses shorter than COMPRESSION_MIN_LENGTH bytes are not compressed
+    BROTLI_QUALITY = 5
+    GZIP_LEVEL = 6
+    COMPRESSION_MIN_LENGTH = 200
+
+    # Collect metrics exposed on /metrics, disabled metrics are not updated at all
+    METRICS_ENABLED = True
@@ -12,3 +12,25 @@ class ResponseDeserializationError(APIException):
     """Raised when response deserialization has failed"""
     status_code = status.HTTP_400_BAD_REQUEST
     default_detail = 'Response deserialization has failed.'
+
+
+class ServiceUnavailable(APIException):
+    """Base of errors of the temporarily overloaded service, client may retry after wait sec (Retry-After header)"""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Service is temporarily unavailable, try again later.'
+    default_wait = 1
+
+    def __init__(self, detail=None, code=None, wait=None):
+        super().__init__(detail, code)
+        # DRF exception handler sends wait in Retry-After header
+        self.wait = wait or self.default_wait
+
+
+class ExecutorSaturatedError(ServiceUnavailable):
+    """Raised when all workers of the executor are busy and its queue is full"""
+    default_detail = 'Service is overloaded, try again later.'
+
+
+class ExecutorTimeoutError(ServiceUnavailable):
+    """Raised when the task of the executor hasn't finished in time"""
+    default_detail = 'Task has timed out.'
@@ -1,3 +1,335 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
-# Create your tests here.
+import httpx
+import pytest
+from django.http import HttpResponse
+
+from .apps import CoreConfig
+from .exceptions import ExecutorSaturatedError, ExecutorTimeoutError
+from .utils import (
+    AdaptiveTokenBucket, AsyncSingleFlight, BoundedExecutor, CompressionMiddleware, Counter, Histogram, LRUCache,
+    MetricsRegistry, SingleFlight, TieredCache, TokenBucket, close_async_client, close_async_clients,
+    get_accepted_encodings, get_async_client, get_connection_stats, http_get,
+)
+from .utils.response import _async_clients
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    """
+    Verify that concurrent calls with the same key execute function only once
+    """
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls, results = [], []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return 'result'
+
+    leader = threading.Thread(target=lambda: results.append(flight.do('key', fetch)))
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=lambda: results.append(flight.do('key', fetch))) for _ in range(3)]
+    for follower in followers:
+        follower.start()
+    assert flight.is_in_flight('key')
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join()
+
+    assert len(calls) == 1
+    assert sorted(results) == [('result', False)] + [('result', True)] * 3
+    assert not flight.is_in_flight('key')
+
+
+def test_async_single_flight_coalesces_concurrent_calls():
+    """
+    Verify that concurrent coroutines with the same key await function only once
+    """
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return 'result'
+
+    async def run():
+        return await asyncio.gather(*[flight.do('key', fetch) for _ in range(4)])
+
+    results = asyncio.run(run())
+
+    assert len(calls) == 1
+    assert sorted(results) == [('result', False)] + [('result', True)] * 3
+    assert not flight.is_in_flight('key')
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def local_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}/'
+    server.shutdown()
+    server.server_close()
+
+
+def test_http_get_reuses_connections(local_url):
+    """
+    Verify that requests to the same host reuse the pooled connection
+    """
+    stats = get_connection_stats()
+    for _ in range(3):
+        assert http_get(local_url).text == 'ok'
+    new_stats = get_connection_stats()
+
+    assert new_stats['requests'] - stats['requests'] == 3
+    assert new_stats['connections'] - stats['connections'] == 1
+    assert new_stats['reused'] - stats['reused'] == 2
+
+
+async def get_client():
+    return get_async_client()
+
+
+def test_async_client_retries_failed_connections(monkeypatch):
+    """
+    Verify that async client retries failed connections like the shared session
+    """
+    transports = []
+
+    class Transport(httpx.AsyncHTTPTransport):
+        def __init__(self, **kwargs):
+            transports.append(kwargs)
+            super().__init__(**kwargs)
+
+    monkeypatch.setattr(httpx, 'AsyncHTTPTransport', Transport)
+    loop = asyncio.new_event_loop()
+    try:
+        client = loop.run_until_complete(get_client())
+        loop.run_until_complete(close_async_client())
+    finally:
+        loop.close()
+
+    assert isinstance(client, httpx.AsyncClient)
+    assert transports[0]['retries'] == CoreConfig.HTTP_RETRIES
+
+
+def test_async_clients_closed():
+    """
+    Verify that async client is shared by the loop, closed on request or on exit, and dropped with its closed loop
+    """
+    closed = []
+    loops = [asyncio.new_event_loop() for _ in range(3)]
+    clients = [loop.run_until_complete(get_client()) for loop in loops]
+    for client in clients:
+        client.aclose = lambda client=client: asyncio.sleep(0, closed.append(client))
+    try:
+        assert loops[0].run_until_complete(get_client()) is clients[0]
+
+        loops[0].run_until_complete(close_async_client())
+        assert closed == [clients[0]]
+        loops[1].close()
+        assert loops[0].run_until_complete(get_client()) is not clients[0]
+        assert loops[1] not in _async_clients
+
+        close_async_clients()
+        assert closed == [clients[0], clients[2]]
+        assert not _async_clients
+    finally:
+        for loop in loops:
+            loop.close()
+
+
+def test_token_bucket_limits_rate():
+    """
+    Verify that token bucket allows a burst up to its capacity and then waits for the next token
+    """
+    bucket = TokenBucket(rate=20, capacity=2)
+
+    assert bucket.acquire(timeout=0)
+    assert bucket.acquire(timeout=0)
+    assert not bucket.acquire(timeout=0)
+    assert bucket.acquire(timeout=0.2)
+
+
+def test_adaptive_token_bucket_slows_down_and_recovers():
+    """
+    Verify that throttled bucket halves its rate and pauses, and successes restore the base rate
+    """
+    bucket = AdaptiveTokenBucket(rate=20, capacity=5, slowdown=0.5, recovery=0.25)
+    bucket.throttle(pause=0.1)
+
+    assert bucket.rate == 10
+    assert not bucket.acquire(timeout=0.05)
+    assert bucket.acquire(timeout=0.2)
+
+    for _ in range(3):
+        bucket.succeed()
+    assert bucket.rate == 20
+
+
+def test_lru_cache_evicts_least_recently_used():
+    """
+    Verify that LRU cache evicts the least recently used entries above max entries and max bytes
+    """
+    cache = LRUCache(max_entries=2, max_bytes=100, sizeof=len)
+    cache.set('a', 'x' * 10)
+    cache.set('b', 'x' * 10)
+    cache.get('a')
+    cache.set('c', 'x' * 10)
+
+    assert cache.get('b') is None
+    assert cache.get('a') and cache.get('c')
+
+    cache.set('d', 'x' * 91)
+    assert cache.get('a') is None and cache.get('c') is None
+    assert cache.get_stats() == {
+        'entries': 1, 'bytes': 91, 'hits': 3, 'misses': 3, 'evictions': 3, 'expirations': 0,
+    }
+
+
+def test_lru_cache_expires_entries():
+    """
+    Verify that entries older than TTL are not served
+    """
+    cache = LRUCache(ttl=0.01)
+    cache.set('key', 'value')
+    assert cache.get('key') == 'value'
+    time.sleep(0.02)
+
+    assert cache.get('key') is None
+    assert cache.get_stats()['expirations'] == 1
+
+
+def test_tiered_cache_fills_local_tier_and_invalidates_both():
+    """
+    Verify that values found in the shared tier are copied to the local tier and deleted from both
+    """
+    writer, reader = TieredCache(LRUCache(), prefix='test:'), TieredCache(LRUCache(), prefix='test:')
+    writer.set('key', 'value')
+
+    assert reader.get('key') == 'value'
+    assert reader.get('key') == 'value'
+    assert reader.get_stats()['shared']['hits'] == 1
+    assert reader.get_stats()['local']['hits'] == 1
+
+    reader.delete('key')
+    assert writer.shared.get('test:key') is None
+    assert reader.get('key') is None
+
+
+def test_metrics_rendered_in_prometheus_format():
+    """
+    Verify that counters and histograms are rendered in Prometheus text format
+    """
+    registry = MetricsRegistry()
+    requests = Counter('requests', 'Requests', labelnames=['status'], registry=registry)
+    latency = Histogram('latency_seconds', 'Latency', buckets=(0.1, 1), registry=registry)
+    requests.inc(status=200)
+    requests.inc(2, status=200)
+    latency.observe(0.5)
+    with latency.time():
+        pass
+
+    assert registry.render().splitlines() == [
+        '# HELP requests Requests',
+        '# TYPE requests counter',
+        'requests_total{status="200"} 3',
+        '# HELP latency_seconds Latency',
+        '# TYPE latency_seconds histogram',
+        'latency_seconds_bucket{le="0.1"} 1',
+        'latency_seconds_bucket{le="1"} 2',
+        'latency_seconds_bucket{le="+Inf"} 2',
+        f'latency_seconds_sum {latency._values[()][1]}',
+        'latency_seconds_count 2',
+    ]
+
+
+def test_disabled_metrics_are_not_updated(monkeypatch):
+    """
+    Verify that disabled metrics ignore updates
+    """
+    monkeypatch.setattr(CoreConfig, 'METRICS_ENABLED', False)
+    registry = MetricsRegistry()
+    requests = Counter('requests', 'Requests', registry=registry)
+    latency = Histogram('latency_seconds', 'Latency', registry=registry)
+    requests.inc()
+    with latency.time():
+        pass
+
+    assert requests.get() == 0
+    assert latency.get_count() == 0
+
+
+def test_bounded_executor_pushes_back_when_saturated():
+    """
+    Verify that submitting to the saturated executor waits for a free slot at most timeout
+    """
+    executor = BoundedExecutor(max_workers=1, max_pending=1)
+    release = threading.Event()
+    try:
+        future = executor.submit(release.wait)
+        with pytest.raises(ExecutorSaturatedError):
+            executor.submit(release.wait, timeout=0.01)
+
+        release.set()
+        future.result()
+        with pytest.raises(ExecutorTimeoutError):
+            executor.run(time.sleep, 0.2, timeout=0.05)
+        # Slot of the timed out task is free again when the task finishes
+        assert executor.run(sum, [1, 2], timeout=1) == 3
+    finally:
+        release.set()
+        executor.shutdown()
+
+
+def test_accepted_encodings_skip_refused_codings():
+    """
+    Verify that codings refused with q=0 are not accepted
+    """
+    assert get_accepted_encodings('gzip;q=1.0, br;q=0, identity') == {'gzip', 'identity'}
+    assert get_accepted_encodings('') == set()
+
+
+def test_compression_middleware_compresses_long_responses(rf):
+    """
+    Verify that only long responses accepted by the client are compressed, with weak ETag
+    """
+    middleware = CompressionMiddleware(lambda request: None)
+    request = rf.get('/', HTTP_ACCEPT_ENCODING='gzip')
+    content = b'results ' * 100
+
+    response = HttpResponse(content)
+    response['ETag'] = '"key"'
+    response = middleware.process_response(request, response)
+    assert response['Content-Encoding'] == 'gzip'
+    assert response['ETag'] == 'W/"key"'
+    assert gzip.decompress(response.content) == content
+
+    response = middleware.process_response(request, HttpResponse(b'short'))
+    assert not response.has_header('Content-Encoding')
+
+    response = middleware.process_response(rf.get('/', HTTP_ACCEPT_ENCODING='gzip;q=0'), HttpResponse(content))
+    assert not response.has_header('Content-Encoding')
+    assert response['Vary'] == 'Accept-Encoding'
@@ -2,3 +2,10 @@ from .bulkcreate import *
 from .response import *
 from .db import *
 from .requests import *
+from .singleflight import *
+from .background import *
+from .ratelimit import *
+from .cache import *
+from .metrics import *
+from .executors import *
+from .compression import *
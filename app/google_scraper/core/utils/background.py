@@ -0,0 +1,52 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Get an instance of a logger
+logger = logging.getLogger(__name__)
+
+
+class KeyedExecutor(object):
+    """
+    This helper class runs background tasks in a bounded thread pool,
+    with at most one pending or running task per key.
+    The pool is created on the first submitted task.
+    """
+
+    def __init__(self, max_workers, thread_name_prefix=''):
+        self.max_workers = max_workers
+        self.thread_name_prefix = thread_name_prefix
+        self._executor = None
+        self._lock = threading.Lock()
+        self._keys = set()
+
+    def submit(self, key, fn, *args, **kwargs):
+        """
+        Schedule fn in the pool, unless a task for the key is already scheduled.
+        :return: True if scheduled, else False
+        """
+        with self._lock:
+            if key in self._keys:
+                return False
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix=self.thread_name_prefix,
+                )
+            self._keys.add(key)
+
+        self._executor.submit(self._run, key, fn, *args, **kwargs)
+        return True
+
+    def _run(self, key, fn, *args, **kwargs):
+        try:
+            fn(*args, **kwargs)
+        except Exception as err:
+            logger.error(f"Background task {key} failed: {err}")
+        finally:
+            with self._lock:
+                self._keys.discard(key)
+
+    def is_scheduled(self, key):
+        with self._lock:
+            return key in self._keys
@@ -0,0 +1,144 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+
+
+def get_pickled_size(value):
+    """
+    Approximate memory size of the value in bytes by its pickled size
+    """
+    return len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+
+
+class LRUCache(object):
+    """
+    Thread-safe per-process cache with TTL, bounded by number of entries and their approximate size.
+    Least recently used entries are evicted when a bound is exceeded.
+    """
+
+    def __init__(self, max_entries=1000, max_bytes=None, ttl=None, sizeof=get_pickled_size):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = self.expirations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, size, expires = entry
+            if expires is not None and expires <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        size = self.sizeof(value) if self.max_bytes else 0
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if self.max_bytes and size > self.max_bytes:
+                return
+            self._entries[key] = (value, size, expires)
+            self.bytes += size
+
+            while len(self._entries) > self.max_entries or (self.max_bytes and self.bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def _remove(self, key):
+        self.bytes -= self._entries.pop(key)[1]
+
+    def get_stats(self):
+        return {
+            'entries': len(self._entries),
+            'bytes': self.bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
+
+
+class TieredCache(object):
+    """
+    Two-tier cache: per-process LRUCache in front of the Django cache framework,
+    eg. local memory in tests and Redis shared by all processes in production.
+    Values found only in the Django cache are copied to the local tier.
+    """
+
+    def __init__(self, local, alias='default', prefix='', timeout=None):
+        self.local = local
+        self.alias = alias
+        self.prefix = prefix
+        self.timeout = timeout
+        self.shared_hits = self.shared_misses = 0
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    def make_key(self, key):
+        return f'{self.prefix}{key}'
+
+    def get(self, key, default=None):
+        value = self.local.get(key)
+        if value is not None:
+            return value
+
+        value = self.shared.get(self.make_key(key))
+        if value is None:
+            self.shared_misses += 1
+            return default
+
+        self.shared_hits += 1
+        self.local.set(key, value)
+        return value
+
+    def set(self, key, value):
+        self.local.set(key, value)
+        self.shared.set(self.make_key(key), value, self.timeout)
+
+    def delete(self, key):
+        """
+        Invalidate the key in both tiers. Local tiers of other processes expire after their TTL.
+        """
+        self.local.delete(key)
+        self.shared.delete(self.make_key(key))
+
+    def delete_many(self, keys):
+        for key in keys:
+            self.local.delete(key)
+        self.shared.delete_many([self.make_key(key) for key in keys])
+
+    def get_stats(self):
+        return {
+            'local': self.local.get_stats(),
+            'shared': {'hits': self.shared_hits, 'misses': self.shared_misses},
+        }
@@ -0,0 +1,69 @@
+import gzip
+import re
+
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import decorator_from_middleware
+from django.utils.deprecation import MiddlewareMixin
+
+from ..apps import CoreConfig
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def get_accepted_encodings(accept_encoding):
+    """
+    Return content codings of Accept-Encoding header, without the ones refused with q=0
+    """
+    encodings = set()
+    for coding in accept_encoding.lower().split(','):
+        name, *params = [part.strip() for part in coding.split(';')]
+        if name and not any(re.fullmatch(r'q=0(\.0*)?', param) for param in params):
+            encodings.add(name)
+    return encodings
+
+
+def compress_content(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(content, quality=CoreConfig.BROTLI_QUALITY)
+    # Constant mtime, so the same content is always compressed to the same bytes
+    return gzip.compress(content, compresslevel=CoreConfig.GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress responses with brotli, if brotli package is installed and the client accepts it, else with gzip.
+    Like GZipMiddleware of Django, responses shorter than COMPRESSION_MIN_LENGTH, streamed or already encoded
+    are not compressed and strong ETag is made weak, because compressed content differs between encodings.
+    Used with compress_page only on views without secrets in the content, see BREACH attack.
+    """
+
+    def process_response(self, request, response):
+        if response.streaming or len(response.content) < CoreConfig.COMPRESSION_MIN_LENGTH:
+            return response
+        if response.has_header('Content-Encoding'):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        accepted = get_accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        encoding = 'br' if brotli is not None and 'br' in accepted else 'gzip' if 'gzip' in accepted else None
+        if encoding is None:
+            return response
+
+        compressed_content = compress_content(response.content, encoding)
+        # Return the original content if compression doesn't save anything
+        if len(compressed_content) >= len(response.content):
+            return response
+
+        response.content = compressed_content
+        response['Content-Length'] = str(len(response.content))
+        if response.has_header('ETag'):
+            response['ETag'] = re.sub('^"', 'W/"', response['ETag'])
+        response['Content-Encoding'] = encoding
+        return response
+
+
+# View decorator compressing its responses, see CompressionMiddleware
+compress_page = decorator_from_middleware(CompressionMiddleware)
@@ -1,4 +1,5 @@
-from django.db.models import Func
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Func
 
 
 class Round(Func):
@@ -7,3 +8,91 @@ class Round(Func):
     """
     function = 'ROUND'
     template = '%(function)s(%(expressions)s, 1)'
+
+
+def get_insert_values(model_class, values):
+    """
+    Return list of column names and db values of the new object, including auto_now(_add) fields
+    """
+    obj = model_class(**values)
+    columns, params = [], []
+    for field in model_class._meta.concrete_fields:
+        if field.primary_key:
+            continue
+        columns.append(field.column)
+        params.append(field.get_db_prep_save(field.pre_save(obj, True), connection))
+    return columns, params
+
+
+def bulk_upsert(model_class, rows, unique_fields, update_fields, batch_size=500, increment_fields=()):
+    """
+    Insert objects or update the existing ones in a single atomic statement
+    INSERT ... ON CONFLICT (unique_fields) DO UPDATE, so concurrent writers never duplicate rows.
+    Databases without ON CONFLICT support fall back to update_or_create.
+    :param rows: List of dictionaries with field values
+    :param unique_fields: Fields of the unique constraint
+    :param update_fields: Fields overwritten when the object already exists
+    :param increment_fields: Fields incremented by the values when the object already exists, eg. counters
+    """
+    if not rows:
+        return
+    if connection.vendor not in ('postgresql', 'sqlite'):
+        for values in rows:
+            _update_or_create(model_class, values, unique_fields, update_fields, increment_fields)
+        return
+
+    opts, quote_name = model_class._meta, connection.ops.quote_name
+    table = quote_name(opts.db_table)
+    unique_columns = [opts.get_field(name).column for name in unique_fields]
+    assignments = [
+        f'{quote_name(column)} = EXCLUDED.{quote_name(column)}'
+        for column in (opts.get_field(name).column for name in update_fields)
+    ] + [
+        f'{quote_name(column)} = {table}.{quote_name(column)} + EXCLUDED.{quote_name(column)}'
+        for column in (opts.get_field(name).column for name in increment_fields)
+    ]
+    for start in range(0, len(rows), batch_size):
+        columns, params, placeholders = None, [], []
+        for values in rows[start:start + batch_size]:
+            columns, row_params = get_insert_values(model_class, values)
+            params.extend(row_params)
+            placeholders.append(f"({', '.join(['%s'] * len(row_params))})")
+
+        sql = (
+            f"INSERT INTO {table} ({', '.join(map(quote_name, columns))}) "
+            f"VALUES {', '.join(placeholders)} "
+            f"ON CONFLICT ({', '.join(map(quote_name, unique_columns))}) DO UPDATE SET "
+            + ', '.join(assignments)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+
+
+def upsert(model_class, values, unique_fields, update_fields):
+    """
+    Insert object or update the existing one atomically, see bulk_upsert()
+    :return: Primary key of the saved object
+    """
+    bulk_upsert(model_class, [values], unique_fields, update_fields)
+    return model_class.objects.values_list('pk', flat=True).get(
+        **{name: values[name] for name in unique_fields}
+    )
+
+
+def _update_or_create(model_class, values, unique_fields, update_fields, increment_fields=()):
+    lookup = {name: values[name] for name in unique_fields}
+    defaults = {name: values[name] for name in update_fields if name in values}
+    if increment_fields:
+        increments = {name: F(name) + values[name] for name in increment_fields}
+        try:
+            with transaction.atomic():
+                model_class.objects.create(**values)
+        except IntegrityError:
+            model_class.objects.filter(**lookup).update(**defaults, **increments)
+        return
+    try:
+        with transaction.atomic():
+            model_class.objects.update_or_create(defaults=defaults, **lookup)
+    except IntegrityError:
+        # Created concurrently after the lookup, so the object exists now
+        model_class.objects.filter(**lookup).update(**defaults)
@@ -0,0 +1,107 @@
+import logging
+import threading
+import time
+from concurrent import futures
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from ..exceptions import ExecutorSaturatedError, ExecutorTimeoutError
+
+# Get an instance of a logger
+logger = logging.getLogger(__name__)
+
+
+class BoundedExecutor(object):
+    """
+    Long-lived thread or process pool with at most max_pending submitted and not finished tasks.
+    When the pool is saturated, callers wait for a free slot at most timeout sec, which pushes back
+    the load instead of queueing it without limit. The pool is created on the first submitted task,
+    eg. after the web server has forked its workers, and a broken process pool is replaced.
+    """
+
+    def __init__(self, kind='thread', max_workers=None, max_pending=None, initializer=None, initargs=(),
+                 thread_name_prefix=''):
+        if kind not in ('thread', 'process'):
+            raise ValueError(f'Unknown executor kind: {kind}')
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.initializer = initializer
+        self.initargs = initargs
+        self.thread_name_prefix = thread_name_prefix
+        self._executor = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_pending) if max_pending else None
+
+    def get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                if self.kind == 'process':
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers, initializer=self.initializer, initargs=self.initargs,
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix=self.thread_name_prefix,
+                        initializer=self.initializer, initargs=self.initargs,
+                    )
+            return self._executor
+
+    def reset(self, executor=None):
+        """
+        Replace the broken executor, by default the current one, with a new one on the next submit
+        """
+        with self._lock:
+            executor = executor or self._executor
+            if self._executor is executor:
+                self._executor = None
+        if executor:
+            executor.shutdown(wait=False)
+
+    def submit(self, fn, *args, timeout=None):
+        """
+        Submit fn to the pool, waiting for a free slot if the pool is saturated
+        :param timeout: Max waiting time in sec, None waits as long as needed
+        :return: Future of the task
+        """
+        if self._slots and not self._slots.acquire(timeout=timeout):
+            raise ExecutorSaturatedError()
+
+        executor = self.get_executor()
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self.reset(executor)
+            if self._slots:
+                self._slots.release()
+            raise
+        except BaseException:
+            if self._slots:
+                self._slots.release()
+            raise
+
+        if self._slots:
+            future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def run(self, fn, *args, timeout=None):
+        """
+        Run fn in the pool and wait for its result, with timeout shared by waiting for a slot and for the result
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        future = self.submit(fn, *args, timeout=timeout)
+        try:
+            return future.result(timeout=None if deadline is None else max(deadline - time.monotonic(), 0))
+        except futures.TimeoutError:
+            future.cancel()
+            raise ExecutorTimeoutError()
+        except BrokenProcessPool:
+            logger.error('Process pool is broken, it will be replaced')
+            self.reset()
+            raise
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=wait)
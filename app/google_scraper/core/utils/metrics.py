@@ -0,0 +1,205 @@
+import threading
+import time
+from bisect import bisect_left
+
+from ..apps import CoreConfig
+
+# Default histogram buckets in sec, from a fast db query to a slow Google response
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class NullTimer(object):
+    """
+    Timer doing nothing, used when metrics are disabled
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def observe(self):
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+
+def escape_label_value(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label_value(value)}"' for name, value in labels) + '}'
+
+
+class Metric(object):
+    """
+    Base of metrics with values per set of label values, rendered in Prometheus text format.
+    Updates are no-ops when METRICS_ENABLED of CoreConfig is False.
+    """
+    type = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        (registry or metrics_registry).register(self)
+
+    def get_labels(self, labels):
+        return tuple((name, labels.get(name, '')) for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.extend(self.render_value(labels, value))
+        return lines
+
+    def render_value(self, labels, value):
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        if not CoreConfig.METRICS_ENABLED:
+            return
+        key = self.get_labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels):
+        return self._values.get(self.get_labels(labels), 0)
+
+    def render_value(self, labels, value):
+        return [f'{self.name}_total{format_labels(labels)} {value}']
+
+
+class HistogramTimer(object):
+    """
+    Timer observing the elapsed time in the histogram. Used as a context manager it observes every block,
+    with accumulate=True it sums up many blocks until observe() is called.
+    """
+
+    def __init__(self, histogram, labels, accumulate=False):
+        self.histogram = histogram
+        self.labels = labels
+        self.accumulate = accumulate
+        self.elapsed = 0
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.elapsed += time.perf_counter() - self.start
+        if not self.accumulate:
+            self.observe()
+        return False
+
+    def observe(self):
+        self.histogram.observe(self.elapsed, **self.labels)
+        self.elapsed = 0
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        if not CoreConfig.METRICS_ENABLED:
+            return
+        key = self.get_labels(labels)
+        with self._lock:
+            # Counts per bucket (last one is +Inf), sum and count of observed values
+            stats = self._values.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0, 0])
+            stats[0][bisect_left(self.buckets, value)] += 1
+            stats[1] += value
+            stats[2] += 1
+
+    def time(self, accumulate=False, **labels):
+        """
+        Return timer of the code block, see HistogramTimer
+        """
+        if not CoreConfig.METRICS_ENABLED:
+            return NULL_TIMER
+        return HistogramTimer(self, labels, accumulate)
+
+    def get_count(self, **labels):
+        return self._values.get(self.get_labels(labels), [None, 0, 0])[2]
+
+    def render_value(self, labels, value):
+        counts, total, count = value
+        lines, cumulative = [], 0
+        for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+            cumulative += bucket_count
+            lines.append(f'{self.name}_bucket{format_labels(labels + (("le", bound),))} {cumulative}')
+        lines.append(f'{self.name}_sum{format_labels(labels)} {total}')
+        lines.append(f'{self.name}_count{format_labels(labels)} {count}')
+        return lines
+
+
+class CallbackMetric(Metric):
+    """
+    Metric read from the function when rendered, for stats kept by other objects, eg. connection pools.
+    The function returns the value, or list of (labels dictionary, value) tuples if the metric has labels.
+    """
+
+    def __init__(self, name, documentation, function, type='gauge', labelnames=(), registry=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.function = function
+        self.type = type
+
+    def render(self):
+        values = self.function()
+        if not self.labelnames:
+            values = [({}, values)]
+        with self._lock:
+            self._values = {self.get_labels(labels): value for labels, value in values}
+        return super().render()
+
+    def render_value(self, labels, value):
+        suffix = '_total' if self.type == 'counter' else ''
+        return [f'{self.name}{suffix}{format_labels(labels)} {value}']
+
+
+class MetricsRegistry(object):
+    """
+    Metrics of the process rendered together in Prometheus text format
+    """
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+
+    def clear(self):
+        for metric in self.metrics:
+            metric.clear()
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+# Registry of all metrics of the process
+metrics_registry = MetricsRegistry()
@@ -0,0 +1,128 @@
+import asyncio
+import threading
+import time
+
+
+class TokenBucket(object):
+    """
+    Thread-safe token bucket limiting the rate of actions to `rate` per sec,
+    with bursts up to `capacity` actions.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self):
+        """
+        Take a token if it's available
+        :return: 0 if token was taken, else time in sec until the next token
+        """
+        with self._lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+    def get_tokens(self):
+        with self._lock:
+            self._refill()
+            return self.tokens
+
+    def acquire(self, timeout=None):
+        """
+        Take a token, waiting until it's available.
+        :param timeout: Max waiting time in sec, None waits as long as needed
+        :return: True if token was taken, False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    async def aacquire(self, timeout=None):
+        """
+        Asynchronous variant of acquire(), waiting without blocking the event loop
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            await asyncio.sleep(wait)
+
+
+class AdaptiveTokenBucket(TokenBucket):
+    """
+    Token bucket adapting its rate to the limits of the target:
+    every throttled action multiplies the rate by `slowdown` down to `min_rate`
+    and every successful one increases it by `recovery` of the base rate back up to the base rate.
+    """
+
+    def __init__(self, rate, capacity=None, min_rate=None, slowdown=0.5, recovery=0.1):
+        super().__init__(rate, capacity)
+        self.base_rate = rate
+        self.min_rate = min_rate or rate / 100
+        self.slowdown = slowdown
+        self.recovery = recovery
+
+    def throttle(self, pause=None):
+        """
+        Slow down and drop the burst, so the next token is available after `pause` sec at the earliest
+        """
+        with self._lock:
+            self._refill()
+            self.rate = max(self.rate * self.slowdown, self.min_rate)
+            wait = max(pause or 0, 1 / self.rate)
+            self.tokens = min(self.tokens, 1 - wait * self.rate)
+
+    def succeed(self):
+        with self._lock:
+            if self.rate < self.base_rate:
+                self._refill()
+                self.rate = min(self.rate + self.base_rate * self.recovery, self.base_rate)
+
+
+class RateLimiter(object):
+    """
+    Separate token buckets per key, eg. per target host.
+    """
+
+    def __init__(self, rate, capacity=None, bucket_class=TokenBucket, **bucket_kwargs):
+        self.rate = rate
+        self.capacity = capacity
+        self.bucket_class = bucket_class
+        self.bucket_kwargs = bucket_kwargs
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def get_bucket(self, key):
+        with self._lock:
+            if key not in self._buckets:
+                self._buckets[key] = self.bucket_class(self.rate, self.capacity, **self.bucket_kwargs)
+            return self._buckets[key]
+
+    def get_rates(self):
+        with self._lock:
+            return {key: bucket.rate for key, bucket in self._buckets.items()}
+
+    def acquire(self, key, timeout=None):
+        return self.get_bucket(key).acquire(timeout)
+
+    async def aacquire(self, key, timeout=None):
+        return await self.get_bucket(key).aacquire(timeout)
@@ -1,17 +1,162 @@
-import requests
+import asyncio
+import atexit
+import importlib.util
 import logging
+import threading
+import weakref
+from http.cookiejar import DefaultCookiePolicy
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+from .metrics import CallbackMetric
+from ..apps import CoreConfig
 from ..exceptions import GetResponseError, ResponseDeserializationError
 
 # Get an instance of a logger
 logger = logging.getLogger(__name__)
 
+# Session shared by the process, created on the first request
+_session = None
+_session_lock = threading.Lock()
+
+# Asynchronous clients shared by event loops
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def create_session():
+    """
+    Return requests session with the keep-alive connections pool and retries configured in CoreConfig.
+    Cookies are not stored, so requests don't depend on each other.
+    """
+    session = requests.Session()
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    adapter = HTTPAdapter(
+        pool_connections=CoreConfig.HTTP_POOL_CONNECTIONS,
+        pool_maxsize=CoreConfig.HTTP_POOL_SIZE,
+        max_retries=Retry(
+            total=CoreConfig.HTTP_RETRIES,
+            backoff_factor=CoreConfig.HTTP_BACKOFF_FACTOR,
+            status_forcelist=CoreConfig.HTTP_RETRY_STATUSES,
+            raise_on_status=False,
+            # 429 responses are returned at once, waiting for Retry-After is up to the caller, eg. scraping scheduler
+            respect_retry_after_header=False,
+        ),
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = create_session()
+    return _session
+
+
+def http_get(url, **kwargs):
+    """
+    Send GET request with the shared session, so TCP and TLS connections are reused
+    """
+    kwargs.setdefault('timeout', CoreConfig.HTTP_TIMEOUT)
+    return get_session().get(url, **kwargs)
+
+
+def get_async_client():
+    """
+    Return asynchronous http client shared by the running event loop.
+    HTTP/2 is used if available. Failed connections are retried HTTP_RETRIES times, like by the shared session,
+    but server errors are not, as httpx has no retries of responses.
+    """
+    loop = asyncio.get_running_loop()
+    if loop not in _async_clients:
+        # Clients of closed loops, eg. of async_to_sync calls, can't be used nor closed anymore
+        for closed_loop in [key for key in _async_clients.keys() if key.is_closed()]:
+            del _async_clients[closed_loop]
+        transport = httpx.AsyncHTTPTransport(
+            http2=CoreConfig.HTTP2 and importlib.util.find_spec('h2') is not None,
+            limits=httpx.Limits(
+                max_connections=CoreConfig.HTTP_POOL_CONNECTIONS * CoreConfig.HTTP_POOL_SIZE,
+                max_keepalive_connections=CoreConfig.HTTP_POOL_SIZE,
+            ),
+            retries=CoreConfig.HTTP_RETRIES,
+        )
+        client = httpx.AsyncClient(transport=transport, timeout=CoreConfig.HTTP_TIMEOUT)
+        client.cookies.jar.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        _async_clients[loop] = client
+    return _async_clients[loop]
+
+
+async def close_async_client():
+    """
+    Close asynchronous client of the running event loop, call before the loop is closed
+    """
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+@atexit.register
+def close_async_clients():
+    """
+    Close asynchronous clients of the event loops not running anymore, called on exit of the process
+    """
+    for loop, client in list(_async_clients.items()):
+        if not loop.is_closed() and not loop.is_running():
+            loop.run_until_complete(client.aclose())
+    _async_clients.clear()
+
+
+def get_connection_stats():
+    """
+    Return number of requests and opened connections of the shared session pools.
+    Reused connections are requests sent without opening a new connection.
+    """
+    stats = {'requests': 0, 'connections': 0}
+    if _session is not None:
+        for adapter in set(_session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool:
+                    stats['requests'] += pool.num_requests
+                    stats['connections'] += pool.num_connections
+    stats['reused'] = stats['requests'] - stats['connections']
+    return stats
+
+
+# Connection reuse of the shared session, read from its pools when metrics are rendered
+http_client_requests = CallbackMetric(
+    'http_client_requests',
+    'HTTP requests sent by the shared session',
+    lambda: get_connection_stats()['requests'],
+    type='counter',
+)
+
+http_client_connections = CallbackMetric(
+    'http_client_connections',
+    'HTTP connections opened by the shared session',
+    lambda: get_connection_stats()['connections'],
+    type='counter',
+)
+
+http_client_reused_connections = CallbackMetric(
+    'http_client_reused_connections',
+    'HTTP requests of the shared session sent on the already opened connection',
+    lambda: get_connection_stats()['reused'],
+    type='counter',
+)
+
 
 def get_response(url):
     response = None
     try:
 
-        response = requests.get(url)
+        response = http_get(url)
         # Raise Exception if response is not successful
         response.raise_for_status()
         return response
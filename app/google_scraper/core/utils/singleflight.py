@@ -0,0 +1,98 @@
+import asyncio
+import threading
+
+
+class _Call(object):
+    """
+    Single in-flight function call shared between threads.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result, self.error = None, None
+
+
+class SingleFlight(object):
+    """
+    This helper class coalesces concurrent calls for the same key within a process.
+    Only the first thread (a leader) executes the function, other threads calling `do()`
+    with the same key wait for the leader and get its result (or its exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Execute and return the result of fn, unless there is already call in flight for a key.
+        :return: Tuple of the result and flag if the result was shared by other thread
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except Exception as err:
+            call.error = err
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result, False
+
+    def is_in_flight(self, key):
+        with self._lock:
+            return key in self._calls
+
+
+class AsyncSingleFlight(object):
+    """
+    Asynchronous variant of SingleFlight for coroutines.
+    Calls are coalesced within the event loop, so waiting coroutines don't block the loop.
+    """
+
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key, fn, *args, **kwargs):
+        """
+        Await and return the result of coroutine function fn, unless there is already call in flight for a key.
+        :return: Tuple of the result and flag if the result was shared by other coroutine
+        """
+        loop = asyncio.get_running_loop()
+        future = self._calls.get((loop, key))
+        if future:
+            return await asyncio.shield(future), True
+
+        future = self._calls[(loop, key)] = loop.create_future()
+        try:
+            result = await fn(*args, **kwargs)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as err:
+            future.set_exception(err)
+            # Mark exception as retrieved, it's raised to the leader anyway
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            del self._calls[(loop, key)]
+
+        return result, False
+
+    def is_in_flight(self, key):
+        return any(call_key == key for _, call_key in list(self._calls))
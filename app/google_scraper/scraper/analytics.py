@@ -0,0 +1,95 @@
+from urllib.parse import urlparse
+
+from django.db import transaction
+from django.db.models import Avg, Count, Sum
+
+from .apps import ScraperConfig
+from .models import ResultLink, Results, ResultWord
+from ..core.utils import BulkCreateManager, Round
+
+# Max number of Results ids in the single delete query, below the sqlite limit of query parameters
+DELETE_CHUNK_SIZE = 500
+
+
+def get_domain(url):
+    """
+    Return host of the url without "www." prefix
+    """
+    domain = urlparse(url).hostname or ''
+    return domain[4:] if domain.startswith('www.') else domain
+
+
+def save_analytics(rows):
+    """
+    Replace links and words of the results with the scraped ones, created in bulk.
+    Results rows are locked in the id order, so concurrent saves of the same results wait for each other
+    instead of failing on unique ranks and words.
+    :param rows: List of tuples of Results id, result blocks of the links in the rank order and Counter of words
+    """
+    if not ScraperConfig.RESULTS_ANALYTICS or not rows:
+        return
+
+    max_word_length = ResultWord._meta.get_field('word').max_length
+    manager = BulkCreateManager(chunk_size=ScraperConfig.ANALYTICS_CHUNK_SIZE)
+    all_ids = sorted({row[0] for row in rows})
+    with transaction.atomic():
+        for start in range(0, len(all_ids), DELETE_CHUNK_SIZE):
+            ids = all_ids[start:start + DELETE_CHUNK_SIZE]
+            list(Results.objects.select_for_update().filter(id__in=ids).order_by('id').values_list('id', flat=True))
+            ResultLink.objects.filter(results_id__in=ids).delete()
+            ResultWord.objects.filter(results_id__in=ids).delete()
+
+        for results_id, blocks, words in rows:
+            for rank, block in enumerate(blocks, 1):
+                manager.add(ResultLink(
+                    results_id=results_id,
+                    rank=rank,
+                    url=block.link,
+                    domain=get_domain(block.link),
+                    title=block.title,
+                    snippet=block.description,
+                ))
+            for word, count in words.items():
+                # Longer "words" are leftovers of urls or scripts
+                if len(word) <= max_word_length:
+                    manager.add(ResultWord(results_id=results_id, word=word, count=count))
+        manager.done()
+
+
+def get_top_words(results_id, number):
+    """
+    Return dictionary of the most common words of the results, the same as scraped with TOP_WORDS_QTY of number.
+    Words are created in the order of the first occurrence, so ties keep the order by id.
+    """
+    words = ResultWord.objects.filter(results_id=results_id).order_by('-count', 'id')[:number]
+    return {word.word: word.count for word in words}
+
+
+def get_top_domains(since=None, number=10):
+    """
+    Return domains linked by the most results, with the average rank
+    :param since: Take only results modified since the datetime
+    """
+    links = ResultLink.objects.all()
+    if since:
+        links = links.filter(results__modified_date__gte=since)
+    return list(
+        links.values('domain')
+        .annotate(results=Count('results', distinct=True), average_rank=Round(Avg('rank')))
+        .order_by('-results', 'average_rank', 'domain')[:number]
+    )
+
+
+def get_top_words_since(since=None, number=10):
+    """
+    Return the most common words of all results
+    :param since: Take only results modified since the datetime
+    """
+    words = ResultWord.objects.all()
+    if since:
+        words = words.filter(results__modified_date__gte=since)
+    return list(
+        words.values('word')
+        .annotate(count=Sum('count'), results=Count('results'))
+        .order_by('-count', 'word')[:number]
+    )
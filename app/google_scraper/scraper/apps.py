@@ -1,8 +1,115 @@
+import os
+import tempfile
+from pathlib import Path
+
 from django.apps import AppConfig
 
 
 class ScraperConfig(AppConfig):
     name = 'google_scraper.scraper'
 
+    # Google search url, may be replaced with a local stub server, eg. GOOGLE_URL=http://127.0.0.1:8001/search
+    # of the serve_stub_google command
+    GOOGLE_URL = os.environ.get('GOOGLE_URL') or 'https://www.google.com/search'
+
     # Time parameter in sec when scraping result will be updated
     SCRAPING_EXPIRATION = 20
+
+    # Time parameter in sec until expired results are still served while being refreshed in the background
+    SCRAPING_HARD_EXPIRATION = 24 * 60 * 60
+
+    # Number of background threads refreshing expired results, 0 disables background refreshing
+    SCRAPING_REFRESH_WORKERS = 2
+
+    # Google results page parser backend, one of parsers.PARSERS: 'soup', 'stream' (pure Python) or 'lxml' (faster)
+    PARSER_BACKEND = 'lxml'
+
+    # Where results pages are parsed: 'inline' in the request thread, or in the long-lived 'thread' or 'process' pool
+    # of PARSE_WORKERS, so CPU parsing doesn't stall the web worker. At most PARSE_MAX_PENDING pages are queued,
+    # then scraping waits for the pool up to PARSE_TIMEOUT sec
+    PARSE_EXECUTOR = 'inline'
+    PARSE_WORKERS = 2
+    PARSE_MAX_PENDING = 8
+    PARSE_TIMEOUT = 10
+
+    # Results above PAGE_SIZE (max number of results of the Google page) are scraped from many pages,
+    # PAGE_WORKERS of them are fetched at once and added in the rank order.
+    # MAX_RESULTS_LIMITATION is the max results_limitation of the API requests
+    PAGE_SIZE = 100
+    PAGE_WORKERS = 3
+    MAX_RESULTS_LIMITATION = 500
+
+    # Download and parse results page in chunks with the 'stream' parser and stop when enough results are found
+    STREAMING_FETCH = False
+    STREAMING_CHUNK_SIZE = 16 * 1024
+
+    # Time in sec after which a claim of scraping in progress is considered abandoned
+    SCRAPING_CLAIM_TIMEOUT = 30
+
+    # Max time in sec and polling interval when waiting for results scraped by another worker
+    SCRAPING_WAIT_TIMEOUT = 10
+    SCRAPING_WAIT_INTERVAL = 0.2
+
+    # Cache of valid results in front of the db lookup: per-process LRU tier bounded by number of entries,
+    # their size in bytes and TTL in sec, backed by the Django cache framework (CACHES setting).
+    # 0 entries disables the cache
+    RESULTS_CACHE_ENTRIES = 1000
+    RESULTS_CACHE_BYTES = 32 * 1024 * 1024
+    RESULTS_CACHE_TTL = 60
+
+    # Save links with titles and snippets, and counts of all words of the scraped results in the ResultLink
+    # and ResultWord tables for the analytics across queries, created in bulk in chunks of ANALYTICS_CHUNK_SIZE
+    RESULTS_ANALYTICS = True
+    ANALYTICS_CHUNK_SIZE = 1000
+
+    # Daily rollups read by the analytics API are incremented by the rollup_results command window by window
+    # of ROLLUP_WINDOW sec, rows of the last ROLLUP_LAG sec are left for the next run.
+    # Words API returns at most ANALYTICS_MAX_WORDS words
+    ROLLUP_WINDOW = 24 * 60 * 60
+    ROLLUP_LAG = 60
+    ANALYTICS_MAX_WORDS = 100
+
+    # Max number of queries in the bulk results API request, its results are served only from the cache or db
+    BULK_MAX_QUERIES = 100
+
+    # Redirect form to the async results view, served without blocking by the ASGI server
+    ASYNC_RESULTS = False
+
+    # Batch scraping: max number of queries in the API request and parallel fetches
+    BATCH_MAX_QUERIES = 1000
+    BATCH_WORKERS = 8
+    # Scraped results are saved every BATCH_CHUNK_SIZE results, so results of a long batch aren't lost
+    # when the worker is killed, eg. on the gunicorn timeout, and other requests can serve them sooner
+    BATCH_CHUNK_SIZE = 20
+
+    # Scheduler of requests to Google: max requests per sec per Google host and per browser profile
+    # (custom browser or client's user agent), None disables the limit. Requests wait for the scheduler
+    # at most GOOGLE_QUEUE_TIMEOUT sec. Every 429 response or CAPTCHA page multiplies the rates by
+    # THROTTLE_SLOWDOWN and pauses requests for Retry-After or THROTTLE_PAUSE sec,
+    # every successful response restores THROTTLE_RECOVERY of the limit
+    GOOGLE_RATE_LIMIT = 5
+    PROFILE_RATE_LIMIT = 2
+    GOOGLE_QUEUE_TIMEOUT = 10
+    THROTTLE_SLOWDOWN = 0.5
+    THROTTLE_RECOVERY = 0.1
+    THROTTLE_PAUSE = 30
+
+    # Retention in sec of results not modified and of the access log, None keeps them forever.
+    # Older rows are deleted by the purge_results command in batches of PURGE_BATCH_SIZE rows
+    RESULTS_RETENTION = 90 * 24 * 60 * 60
+    ACCESS_RETENTION = 30 * 24 * 60 * 60
+    PURGE_BATCH_SIZE = 1000
+
+    # Fraction of results requests profiled with cProfile, 0 disables profiling.
+    # Profiles and parsed pages are saved in PROFILING_DIR, only the last PROFILING_MAX_FILES are kept
+    PROFILING_SAMPLE_RATE = 0
+    PROFILING_DIR = Path(tempfile.gettempdir()) / 'google_scraper_profiles'
+    PROFILING_MAX_FILES = 100
+
+    # Save fetched Google pages compressed in the content-addressed store, so results can be parsed again
+    # with the reparse_results command without scraping. The least recently saved pages are evicted
+    # above HTML_STORE_MAX_BYTES
+    HTML_STORE_ENABLED = False
+    HTML_STORE_DIR = Path(tempfile.gettempdir()) / 'google_scraper_pages'
+    HTML_STORE_MAX_BYTES = 1024 * 1024 * 1024
+    HTML_STORE_COMPRESSION = 6
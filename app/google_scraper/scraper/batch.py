@@ -0,0 +1,213 @@
+import datetime
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pytz
+
+from .analytics import save_analytics
+from .apps import ScraperConfig
+from .mixins import GoogleScraper, claim_scraping, release_scraping, results_cache
+from .models import Results
+from .words import dump_top_words, load_top_words
+from ..core.utils import bulk_upsert
+
+# Get an instance of a logger
+logger = logging.getLogger(__name__)
+
+
+class BatchScraper(object):
+    """
+    Scrape many queries at once.
+    Queries are deduplicated, valid results are taken from db and the rest is scraped
+    in the thread pool, limited by the scraping scheduler. Results are saved in bulk every chunk_size results.
+    Requests are claimed like in ResultsMixin.scrape_results(), so requests scraped by other workers
+    are served from their stale results or waited for, instead of scraped again.
+
+    Every query is a dictionary with "query" and optional "lang", "country", "browser"
+    and "results_limitation" parameters of GoogleScraper.
+    """
+
+    def __init__(self, queries, max_workers=None, chunk_size=None):
+        self.max_workers = max_workers or ScraperConfig.BATCH_WORKERS
+        self.chunk_size = chunk_size or ScraperConfig.BATCH_CHUNK_SIZE
+        self.now = datetime.datetime.now(pytz.utc)
+
+        # Keys claimed by this batch, scraped results not saved yet and analytics of the scrapers by key
+        self.claimed, self.scraped, self.analytics = set(), [], {}
+
+        # Unique requests by the normalized key
+        self.requests = {}
+        for query in queries:
+            params = {
+                'query': query['query'],
+                'lang': query.get('lang') or None,
+                'country': query.get('country') or None,
+                'browser': query.get('browser') or None,
+                'results_limitation': query.get('results_limitation') or 20,
+            }
+            self.requests.setdefault(GoogleScraper.get_results_key(**params), params)
+
+    def run(self):
+        """
+        Yield results dictionary of every unique query as soon as it's ready,
+        first the cached ones and then scraped in order of completion.
+        """
+        existing = {
+            obj.key: obj for obj in Results.objects.filter(key__in=list(self.requests))
+        }
+        expiration_datetime = self.now - datetime.timedelta(seconds=ScraperConfig.SCRAPING_EXPIRATION)
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        futures, waiting = {}, []
+        try:
+            for key, params in self.requests.items():
+                obj = existing.get(key)
+                if obj and obj.modified_date > expiration_datetime:
+                    yield dict(self.get_result_dict_from_existing(obj, params), cached=True)
+                elif claim_scraping(key):
+                    self.claimed.add(key)
+                    futures[executor.submit(self.scrape, params)] = key
+                elif obj:
+                    # Another worker is scraping the request, serve its stale results
+                    yield dict(self.get_result_dict_from_existing(obj, params), cached=True)
+                else:
+                    waiting.append(key)
+            yield from self.collect(futures)
+
+            found = self.wait_for_results(waiting)
+            for key in waiting:
+                if key in found:
+                    yield dict(self.get_result_dict_from_existing(found[key], self.requests[key]), cached=True)
+                else:
+                    # Results of another worker not saved in time are scraped without the claim, like in ResultsMixin
+                    logger.warning(f"Timeout while waiting for results of another worker: {key}")
+                    futures[executor.submit(self.scrape, self.requests[key])] = key
+            yield from self.collect({future: key for future, key in futures.items() if key in waiting})
+        finally:
+            # Results consumer may stop early, eg. client disconnected, then don't scrape the rest
+            for future in futures:
+                future.cancel()
+            executor.shutdown()
+
+            # Save already scraped results and release claims of the not scraped ones
+            self.save_scraped()
+            self.release(list(self.claimed))
+
+    def collect(self, futures):
+        """
+        Yield results of the scraping futures in order of completion and save them every chunk_size results
+        """
+        for future in as_completed(futures):
+            key = futures[future]
+            params = self.requests[key]
+            try:
+                results, self.analytics[key] = future.result()
+            except Exception as err:
+                logger.error(f"Batch scraping of {params['query']} failed: {err}")
+                self.release([key])
+                yield {'query': params['query'], 'error': str(err), 'cached': False}
+                continue
+
+            if 'error' in results:
+                self.release([key])
+            else:
+                self.scraped.append(self.get_results_values(key, params, results))
+                if len(self.scraped) >= self.chunk_size:
+                    self.save_scraped()
+            yield dict(results, cached=False)
+
+    @staticmethod
+    def wait_for_results(keys):
+        """
+        Poll db until other workers save results of the keys or SCRAPING_WAIT_TIMEOUT passes
+        :return: Dictionary of the found Results objects by key
+        """
+        found = {}
+        deadline = time.monotonic() + ScraperConfig.SCRAPING_WAIT_TIMEOUT
+        while len(found) < len(keys) and time.monotonic() < deadline:
+            time.sleep(ScraperConfig.SCRAPING_WAIT_INTERVAL)
+            found.update((obj.key, obj) for obj in Results.objects.filter(key__in=set(keys) - set(found)))
+        return found
+
+    def save_scraped(self):
+        """
+        Save scraped results in bulk, invalidate their cache and release their claims
+        """
+        if not self.scraped:
+            return
+        scraped, self.scraped = self.scraped, []
+        keys = [values['key'] for values in scraped]
+        bulk_upsert(Results, scraped, unique_fields=['key'], update_fields=Results.UPSERT_FIELDS,
+                    batch_size=self.chunk_size)
+        results_cache.delete_many(keys)
+        self.save_analytics(scraped, self.analytics)
+        self.release(keys)
+
+    def release(self, keys):
+        """
+        Release claims of the keys claimed by this batch
+        """
+        keys = [key for key in keys if key in self.claimed]
+        if keys:
+            release_scraping(keys)
+            self.claimed.difference_update(keys)
+
+    @staticmethod
+    def scrape(params):
+        """
+        :return: Tuple of results dictionary and analytics of the scraper, see GoogleScraper.get_analytics()
+        """
+        scraper = GoogleScraper(
+            params['query'],
+            None,
+            results_limitation=params['results_limitation'],
+            lang=params['lang'],
+            country=params['country'],
+            browser=params['browser'],
+        )
+        return scraper.search(), scraper.get_analytics()
+
+    def save_analytics(self, scraped, analytics):
+        """
+        Save links and words of the scraped results, Results ids are taken from db after the bulk upsert
+        """
+        if not ScraperConfig.RESULTS_ANALYTICS:
+            return
+        for start in range(0, len(scraped), self.chunk_size):
+            keys = [values['key'] for values in scraped[start:start + self.chunk_size]]
+            ids = dict(Results.objects.filter(key__in=keys).values_list('key', 'id'))
+            save_analytics([(ids[key], *analytics[key]) for key in keys])
+
+    @staticmethod
+    def get_result_dict_from_existing(obj, params):
+        return {'query': params['query'],
+                'links': obj.links,
+                'top_words': load_top_words(obj.top_words),
+                'number_of_results': obj.number_of_results,
+                'results_limitation': obj.results_limitation,
+                'top_words_number': obj.top_words_number}
+
+    @staticmethod
+    def get_results_values(key, params, results):
+        return {
+            'key': key,
+            'query': GoogleScraper.normalize_query(params['query']),
+            'lang': params['lang'] or '',
+            'country': params['country'] or '',
+            'browser': params['browser'] if params['browser'] in GoogleScraper.BROWSERS else '',
+            'number_of_results': results['number_of_results'],
+            'top_words': dump_top_words(results['top_words']),
+            'links': results['links'],
+            'results_limitation': results['results_limitation'],
+            'top_words_number': results['top_words_number'],
+        }
+
+
+def to_ndjson(results):
+    """
+    Yield results dictionaries as lines of the newline delimited JSON
+    """
+    for result in results:
+        yield json.dumps(result) + '\n'
@@ -0,0 +1,186 @@
+import json
+import time
+import tracemalloc
+from pathlib import Path
+
+from .apps import ScraperConfig
+from .mixins import GoogleScraper
+from .models import Results
+from .parsers import get_parser_class
+from .words import dump_top_words, load_top_words
+
+# Synthetic Google results pages used by default, generated with the markup of the real ones
+SERP_FIXTURES_DIR = Path(__file__).resolve().parent / 'tests' / 'fixtures' / 'serp'
+
+# Report of benchmark_parser on SERP_FIXTURES_DIR, compared with in tests to catch big regressions
+BENCHMARK_BASELINE = SERP_FIXTURES_DIR.parent / 'benchmark_baseline.json'
+
+
+def get_scraper():
+    return GoogleScraper('benchmark', None, user_agent='benchmark')
+
+
+def time_it(fn, repeat):
+    """
+    Return the best time in sec of the repeated fn calls
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def count_words(blocks):
+    scraper = get_scraper()
+    for block in blocks:
+        scraper.count_words(block.description)
+        scraper.count_words(block.title)
+    scraper.set_top_words()
+    return scraper.top_words
+
+
+def count_words_legacy(blocks):
+    """
+    Word counting as it was done before words.WordCounter, kept as the benchmark reference.
+    """
+    words, top_words = {}, {}
+    for block in blocks:
+        for text in (block.description, block.title):
+            for ch in GoogleScraper.ODD_CHARS:
+                if ch in text:
+                    text = text.replace(ch, '')
+            for word in text.lower().split():
+                if len(word) > 1 and not word.isdigit() and word not in GoogleScraper.EXCLUDED_WORDS:
+                    words[word] = words[word] + 1 if word in words else 1
+
+    sorted_words = dict(sorted(words.items(), key=lambda item: item[1], reverse=True))
+    for i, key in enumerate(list(sorted_words.keys())):
+        if i < GoogleScraper.TOP_WORDS_QTY:
+            top_words[key] = sorted_words[key]
+    return top_words
+
+
+def get_stored_results(results, legacy=False):
+    """
+    Return db values of links and top words of results saved in Results JSONFields.
+    Legacy results were JSON encoded before saving, so JSON string was stored inside JSON.
+    """
+    stored = {}
+    for name in ('links', 'top_words'):
+        value = results[name]
+        if legacy:
+            value = json.dumps(value)
+        elif name == 'top_words':
+            value = dump_top_words(value)
+        stored[name] = Results._meta.get_field(name).get_prep_value(value)
+    return stored
+
+
+def read_stored_results(stored, legacy=False):
+    """
+    Decode links and top words read from db, as on every cache hit
+    """
+    results = {}
+    for name, value in stored.items():
+        value = Results._meta.get_field(name).from_db_value(value, None, None)
+        if legacy:
+            value = json.loads(value)
+        elif name == 'top_words':
+            value = load_top_words(value)
+        results[name] = value
+    return results
+
+
+def get_standard_blocks(raw_html):
+    """
+    Return result blocks with title and description, which words are counted
+    """
+    return [
+        block for block in get_parser_class(ScraperConfig.PARSER_BACKEND)(raw_html).get_result_blocks()
+        if block.title is not None and block.description is not None
+    ]
+
+
+def get_page_stages(raw_html):
+    """
+    Return dictionary of stage name and function timed for the single page
+    """
+    parsed = get_scraper()
+    parsed.parse_results(raw_html)
+    blocks = get_standard_blocks(raw_html)
+    results = {'links': parsed.get_enumerated_dict_links(), 'top_words': parsed.top_words}
+    stored, stored_legacy = get_stored_results(results), get_stored_results(results, legacy=True)
+
+    return {
+        'parse_results': lambda: get_scraper().parse_results(raw_html),
+        'get_number_of_results': parsed.get_number_of_results,
+        'count_words': lambda: count_words(blocks),
+        'count_words_legacy': lambda: count_words_legacy(blocks),
+        'cache_hit': lambda: read_stored_results(stored),
+        'cache_hit_legacy': lambda: read_stored_results(stored_legacy, legacy=True),
+    }
+
+
+def get_peak_memory(raw_html):
+    """
+    Return peak memory in KiB allocated while parsing the page.
+    Only Python allocations are traced, memory of C extensions like lxml is not included.
+    """
+    tracemalloc.start()
+    try:
+        get_scraper().parse_results(raw_html)
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark_pages(paths, repeat=5):
+    """
+    Time GoogleScraper stages per page and in bulk for all pages.
+    :return: Report dictionary with "pages" and "bulk" results, times in ms
+    """
+    pages, totals = {}, {}
+    size = 0
+    for path in paths:
+        raw_html = Path(path).read_text(encoding='utf-8')
+        size += len(raw_html.encode())
+
+        page = {
+            stage: time_it(fn, repeat) * 1000
+            for stage, fn in get_page_stages(raw_html).items()
+        }
+        page['peak_memory_kib'] = get_peak_memory(raw_html)
+        pages[Path(path).stem] = page
+
+        for stage, value in page.items():
+            if stage == 'peak_memory_kib':
+                totals[stage] = max(totals.get(stage, 0), value)
+            else:
+                totals[stage] = totals.get(stage, 0) + value
+
+    parse_time = totals.get('parse_results', 0) / 1000
+    bulk = dict(totals)
+    bulk['pages_per_sec'] = len(pages) / parse_time if parse_time else 0
+    bulk['mb_per_sec'] = size / 1024 / 1024 / parse_time if parse_time else 0
+
+    return {'pages': pages, 'bulk': bulk}
+
+
+def get_regressions(report, baseline, max_regression):
+    """
+    Compare bulk results of the report with baseline report.
+    :param max_regression: Accepted relative regression, eg. 0.25 for 25%
+    :return: List of regression descriptions
+    """
+    regressions = []
+    for key, value in report['bulk'].items():
+        base_value = baseline.get('bulk', {}).get(key)
+        if not base_value:
+            continue
+        # Throughput should grow, times and memory should drop
+        change = (base_value - value) / base_value if key.endswith('_per_sec') else (value - base_value) / base_value
+        if change > max_regression:
+            regressions.append(f"{key}: {value:.2f} vs baseline {base_value:.2f} ({change:.0%} worse)")
+    return regressions
@@ -2,6 +2,8 @@ from rest_framework import status
 from rest_framework.exceptions import APIException
 from django.utils.translation import gettext_lazy as _
 
+from ..core.exceptions import ServiceUnavailable
+
 
 class ResultsNotFound(APIException):
     """
@@ -9,3 +11,17 @@ class ResultsNotFound(APIException):
     """
     status_code = status.HTTP_404_NOT_FOUND
     default_detail = _('Raised when no results found.')
+
+
+class ScrapingThrottled(ServiceUnavailable):
+    """
+    Raised when Google throttles scraping with 429 response or CAPTCHA page.
+    """
+    default_detail = _('Scraping is throttled by Google, try again later.')
+
+
+class ScrapingQueueTimeout(ServiceUnavailable):
+    """
+    Raised when request to Google has waited in the scheduler queue too long.
+    """
+    default_detail = _('Too many scraping requests, try again later.')
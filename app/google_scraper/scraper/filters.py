@@ -0,0 +1,19 @@
+import django_filters
+
+from .models import DailyRollup, DailyWordRollup
+
+
+class DailyRollupFilter(django_filters.FilterSet):
+    date_from = django_filters.DateFilter(field_name='day', lookup_expr='gte')
+    date_to = django_filters.DateFilter(field_name='day', lookup_expr='lte')
+
+    class Meta:
+        model = DailyRollup
+        fields = ['date_from', 'date_to', 'country', 'lang']
+
+
+class DailyWordRollupFilter(DailyRollupFilter):
+
+    class Meta:
+        model = DailyWordRollup
+        fields = ['date_from', 'date_to', 'country', 'lang']
@@ -0,0 +1,135 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from .mixins import ResultsMixin
+
+# Number of queries in one bulk API request of the load test
+BULK_QUERIES = 10
+
+
+def get_form_response(client, queries, i):
+    """
+    Post the query form and follow the redirect to the results, like a user
+    """
+    return client.post(reverse('scraper:index'), {'query': queries[i]}, follow=True)
+
+
+def get_results_response(client, queries, i):
+    return client.get(ResultsMixin.get_results_url(queries[i]))
+
+
+def get_api_response(client, queries, i):
+    return client.get(reverse('scraper:results-api'), {'query': queries[i]}, HTTP_ACCEPT_ENCODING='gzip')
+
+
+def get_bulk_response(client, queries, i):
+    bulk_queries = [queries[(i + offset) % len(queries)] for offset in range(BULK_QUERIES)]
+    return client.get(reverse('scraper:results-bulk'), {'query': bulk_queries}, HTTP_ACCEPT_ENCODING='gzip')
+
+
+# Requests of the load test scenarios, called with the client, list of queries and index of the query
+SCENARIOS = {
+    'form': get_form_response,
+    'results': get_results_response,
+    'api': get_api_response,
+    'bulk': get_bulk_response,
+}
+
+
+def get_percentile(values, percent):
+    """
+    Return percentile of the sorted values, nearest-rank method
+    """
+    if not values:
+        return None
+    return values[min(int(len(values) * percent / 100), len(values) - 1)]
+
+
+class LoadTest(object):
+    """
+    Open-loop load test of the application views served in the process by the Django test client.
+    Requests of the scenarios are started in turn at the target rate, whether the previous ones
+    have finished or not, and their latency is measured from the planned start, so waiting for
+    a busy worker is counted in. Queries are drawn from the pool of the given size,
+    so there are both cache misses and hits.
+    """
+
+    def __init__(self, scenarios, rps, duration, workers=8, queries=50, seed=0):
+        self.scenarios = scenarios
+        self.rps = rps
+        self.duration = duration
+        self.workers = workers
+        self.queries = [f'load test {i}' for i in range(queries)]
+        self.random = random.Random(seed)
+        # Per scenario list of (latency in sec, status code, number of db queries)
+        self.samples = {scenario: [] for scenario in scenarios}
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def get_client(self):
+        if not hasattr(self.local, 'client'):
+            host = next((host for host in settings.ALLOWED_HOSTS if host != '*' and not host.startswith('.')), None)
+            self.local.client = Client(
+                raise_request_exception=False, SERVER_NAME=host or 'localhost', REMOTE_ADDR='127.0.0.1',
+            )
+        return self.local.client
+
+    def send(self, scenario, i, planned_start):
+        db_queries = []
+
+        def count_query(execute, sql, params, many, context):
+            db_queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count_query):
+            response = SCENARIOS[scenario](self.get_client(), self.queries, i)
+        latency = time.perf_counter() - planned_start
+        with self.lock:
+            self.samples[scenario].append((latency, response.status_code, len(db_queries)))
+
+    def run(self):
+        """
+        Send requests for the duration and return report of every scenario
+        """
+        total = int(self.rps * self.duration)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = []
+            for n in range(total):
+                planned_start = start + n / self.rps
+                delay = planned_start - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                scenario = self.scenarios[n % len(self.scenarios)]
+                futures.append(executor.submit(self.send, scenario, self.random.randrange(len(self.queries)),
+                                               planned_start))
+            for future in futures:
+                future.result()
+        elapsed = time.perf_counter() - start
+
+        return {scenario: self.get_report(samples, elapsed) for scenario, samples in self.samples.items()}
+
+    @staticmethod
+    def get_report(samples, elapsed):
+        latencies = sorted(latency * 1000 for latency, _, _ in samples)
+        db_queries = [count for _, _, count in samples]
+        statuses = {}
+        for _, status, _ in samples:
+            statuses[status] = statuses.get(status, 0) + 1
+        return {
+            'requests': len(samples),
+            'throughput': len(samples) / elapsed,
+            'p50_ms': get_percentile(latencies, 50),
+            'p95_ms': get_percentile(latencies, 95),
+            'p99_ms': get_percentile(latencies, 99),
+            'statuses': statuses,
+            'db_queries_mean': sum(db_queries) / len(db_queries) if db_queries else 0,
+            'db_queries_max': max(db_queries, default=0),
+        }
@@ -0,0 +1,39 @@
+import io
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...apps import ScraperConfig
+from ...profiling import get_folded_stacks, load_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Aggregate sampled request profiles: print the top functions and write folded stacks, '
+        'ready for flamegraph.pl or speedscope'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=str(ScraperConfig.PROFILING_DIR), help='Directory with *.prof files')
+        parser.add_argument('--output', help='File of the folded stacks, eg. profiles.folded')
+        parser.add_argument('--top', type=int, default=20, help='Number of printed functions')
+        parser.add_argument('--sort', default='cumulative', help='Sort key of printed functions, see pstats')
+
+    def handle(self, *args, **options):
+        paths = sorted(Path(options['dir']).glob('*.prof'))
+        if not paths:
+            raise CommandError(f"No profiles found in {options['dir']}")
+
+        stats = load_stats(paths)
+        stream = io.StringIO()
+        stats.stream = stream
+        stats.sort_stats(options['sort']).print_stats(options['top'])
+        self.stdout.write(f'{len(paths)} profiles, pages to reproduce: *.html in {options["dir"]}')
+        self.stdout.write(stream.getvalue())
+
+        if options['output']:
+            folded = get_folded_stacks(stats)
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                for stack, microseconds in sorted(folded.items()):
+                    file.write(f'{stack} {microseconds}\n')
+            self.stdout.write(self.style.SUCCESS(f"{len(folded)} stacks saved in {options['output']}"))
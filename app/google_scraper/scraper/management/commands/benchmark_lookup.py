@@ -0,0 +1,68 @@
+import hashlib
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from ...models import Results
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure latency of the Results lookup by the indexed key against the not indexed query column. '
+        'Generated rows are rolled back at the end.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000, help='Number of generated Results rows')
+        parser.add_argument('--lookups', type=int, default=200, help='Number of timed lookups')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows inserted at once')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.create_rows(options['rows'], options['batch_size'])
+            rows = random.sample(range(options['rows']), min(options['lookups'], options['rows']))
+
+            self.stdout.write(f"{connection.vendor}, {Results.objects.count()} rows")
+            self.stdout.write(Results.objects.filter(key=self.get_key(rows[0])).explain())
+            for name, lookup in (('key', self.get_by_key), ('query', self.get_by_query)):
+                # Sequential scans are slow, so the not indexed column is timed on fewer lookups
+                timings = self.time_lookups(lookup, rows if name == 'key' else rows[:10])
+                self.stdout.write(
+                    f"{name}: p50={statistics.median(timings):.3f} ms, max={max(timings):.3f} ms"
+                )
+
+            transaction.set_rollback(True)
+
+    def create_rows(self, rows, batch_size):
+        for start in range(0, rows, batch_size):
+            Results.objects.bulk_create([
+                Results(key=self.get_key(i), query=f'benchmark {i}', links={}, top_words=[])
+                for i in range(start, min(start + batch_size, rows))
+            ])
+
+    @staticmethod
+    def get_key(i):
+        return hashlib.sha1(f'benchmark {i}'.encode()).hexdigest()
+
+    @classmethod
+    def get_by_key(cls, i):
+        return Results.objects.values('id', 'modified_date').get(key=cls.get_key(i))
+
+    @staticmethod
+    def get_by_query(i):
+        return Results.objects.values('id', 'modified_date').get(query=f'benchmark {i}')
+
+    @staticmethod
+    def time_lookups(lookup, rows):
+        """
+        Return list of lookup times in ms
+        """
+        timings = []
+        for i in rows:
+            start = time.perf_counter()
+            lookup(i)
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
@@ -0,0 +1,45 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...apps import ScraperConfig
+from ...benchmarks import SERP_FIXTURES_DIR, benchmark_pages, get_regressions
+
+
+class Command(BaseCommand):
+    help = 'Benchmark parsing of synthetic Google results pages without network traffic'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fixtures', default=str(SERP_FIXTURES_DIR),
+                            help='Directory with Google results pages (*.html)')
+        parser.add_argument('--repeat', type=int, default=5, help='Number of timed runs per page stage')
+        parser.add_argument('--backend', default=None, help='Parser backend, see parsers.PARSERS')
+        parser.add_argument('--output', help='Save JSON report to the file, eg. to use as a baseline')
+        parser.add_argument('--baseline', help='JSON report to compare with')
+        parser.add_argument('--max-regression', type=float, default=0.25,
+                            help='Accepted relative regression against the baseline')
+
+    def handle(self, *args, **options):
+        paths = sorted(Path(options['fixtures']).glob('*.html'))
+        if not paths:
+            raise CommandError(f"No pages found in {options['fixtures']}")
+
+        if options['backend']:
+            ScraperConfig.PARSER_BACKEND = options['backend']
+
+        report = benchmark_pages(paths, repeat=options['repeat'])
+
+        for name, page in report['pages'].items():
+            self.stdout.write(f"{name}: " + ', '.join(f"{key}={value:.2f}" for key, value in page.items()))
+        self.stdout.write('bulk: ' + ', '.join(f"{key}={value:.2f}" for key, value in report['bulk'].items()))
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(report, indent=2))
+
+        if options['baseline']:
+            baseline = json.loads(Path(options['baseline']).read_text())
+            regressions = get_regressions(report, baseline, options['max_regression'])
+            if regressions:
+                raise CommandError('Performance regression:\n' + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
@@ -0,0 +1,66 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from ....core.utils import close_async_client, get_connection_stats
+from ...apps import ScraperConfig
+from ...mixins import AsyncGoogleScraper, GoogleScraper
+from ...scheduler import scraping_scheduler
+from ...stub import StubGoogleServer
+
+
+class Command(BaseCommand):
+    help = 'Compare throughput of the sync and async scraping against the local stub Google server'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Number of scraped queries')
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Number of sync workers, like gunicorn sync workers')
+        parser.add_argument('--concurrency', type=int, default=100,
+                            help='Max number of in-flight async fetches')
+        parser.add_argument('--latency', type=float, default=0.2, help='Stub server response time in sec')
+
+    def handle(self, *args, **options):
+        queries = [f'load test {i}' for i in range(options['requests'])]
+
+        with StubGoogleServer(latency=options['latency']) as server, scraping_scheduler.unlimited():
+            google_url, ScraperConfig.GOOGLE_URL = ScraperConfig.GOOGLE_URL, server.url
+            try:
+                sync_time = self.run_sync(queries, options['workers'])
+                async_time = self.run_async(queries, options['concurrency'])
+            finally:
+                ScraperConfig.GOOGLE_URL = google_url
+
+        sync_rps, async_rps = len(queries) / sync_time, len(queries) / async_time
+        self.stdout.write(f"sync ({options['workers']} workers): {sync_rps:.1f} req/s")
+        self.stdout.write(f"async ({options['concurrency']} in flight): {async_rps:.1f} req/s")
+        stats = get_connection_stats()
+        self.stdout.write(f"sync connections: {stats['connections']} opened, {stats['reused']} reused")
+        self.stdout.write(self.style.SUCCESS(f"async speedup: {async_rps / sync_rps:.1f}x"))
+
+    @staticmethod
+    def run_sync(queries, workers):
+        def scrape(query):
+            return GoogleScraper(query, None, user_agent='loadtest').search()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(scrape, queries))
+        return time.perf_counter() - start
+
+    @staticmethod
+    def run_async(queries, concurrency):
+        async def scrape(query, semaphore):
+            async with semaphore:
+                return await AsyncGoogleScraper(query, None, user_agent='loadtest').search()
+
+        async def scrape_all():
+            semaphore = asyncio.Semaphore(concurrency)
+            await asyncio.gather(*[scrape(query, semaphore) for query in queries])
+            await close_async_client()
+
+        start = time.perf_counter()
+        asyncio.run(scrape_all())
+        return time.perf_counter() - start
@@ -0,0 +1,60 @@
+import contextlib
+
+from django.core.management.base import BaseCommand
+
+from ...apps import ScraperConfig
+from ...loadtest import SCENARIOS, LoadTest
+from ...scheduler import scraping_scheduler
+from ...stub import StubGoogleServer, add_stub_arguments, get_stub_kwargs
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test the form, results page and results API views at the target rate against the local stub '
+        'Google server. Reports throughput, latency percentiles, db queries per request and Google requests. '
+        'Results and access logs are saved in the configured database, run it against a development one'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS),
+                            help='Views requested in turn')
+        parser.add_argument('--rps', type=float, default=20, help='Target number of requests per sec')
+        parser.add_argument('--duration', type=float, default=10, help='Time in sec of the run')
+        parser.add_argument('--workers', type=int, default=8, help='Number of threads sending requests')
+        parser.add_argument('--queries', type=int, default=50,
+                            help='Number of distinct queries, fewer queries give more cache hits')
+        parser.add_argument('--rate-limits', action='store_true',
+                            help='Keep the scraping scheduler limits, by default the stub is not rate limited')
+        add_stub_arguments(parser)
+
+    def handle(self, *args, **options):
+        load_test = LoadTest(
+            options['scenarios'], options['rps'], options['duration'], options['workers'], options['queries'],
+            options['seed'],
+        )
+        limits = contextlib.nullcontext() if options['rate_limits'] else scraping_scheduler.unlimited()
+
+        with StubGoogleServer(**get_stub_kwargs(options)) as server, limits:
+            google_url, ScraperConfig.GOOGLE_URL = ScraperConfig.GOOGLE_URL, server.url
+            try:
+                report = load_test.run()
+            finally:
+                ScraperConfig.GOOGLE_URL = google_url
+
+        for scenario, stats in report.items():
+            if not stats['requests']:
+                continue
+            statuses = ', '.join(f'{status}: {count}' for status, count in sorted(stats['statuses'].items()))
+            self.stdout.write(
+                f"{scenario}: {stats['requests']} requests, {stats['throughput']:.1f} req/s, "
+                f"p50={stats['p50_ms']:.1f} ms, p95={stats['p95_ms']:.1f} ms, p99={stats['p99_ms']:.1f} ms, "
+                f"db queries {stats['db_queries_mean']:.1f}/request (max {stats['db_queries_max']}), "
+                f"statuses {{{statuses}}}"
+            )
+        stub_stats = server.get_stats()
+        google_requests = stub_stats.pop('requests')
+        total = sum(stats['requests'] for stats in report.values())
+        kinds = ', '.join(f'{kind}: {count}' for kind, count in sorted(stub_stats.items()))
+        self.stdout.write(
+            f"Google requests: {google_requests} ({kinds}), {google_requests / total if total else 0:.2f} per request"
+        )
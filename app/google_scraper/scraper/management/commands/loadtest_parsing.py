@@ -0,0 +1,80 @@
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+
+from ...apps import ScraperConfig
+from ...mixins import GoogleScraper, parse_executors
+from ...scheduler import scraping_scheduler
+from ...stub import StubGoogleServer
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure latency of cache hits while concurrent cache misses scrape and parse pages '
+        'from the local stub Google server, for every parse executor'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--executors', nargs='+', default=['inline', 'thread', 'process'],
+                            help='Parse executors to compare')
+        parser.add_argument('--misses', type=int, default=4, help='Number of threads scraping cache misses')
+        parser.add_argument('--duration', type=float, default=5, help='Time in sec of every run')
+        parser.add_argument('--hit-interval', type=float, default=0.005, help='Time in sec between cache hits')
+
+    def handle(self, *args, **options):
+        parse_executor = ScraperConfig.PARSE_EXECUTOR
+        with StubGoogleServer() as server, scraping_scheduler.unlimited():
+            google_url, ScraperConfig.GOOGLE_URL = ScraperConfig.GOOGLE_URL, server.url
+            try:
+                for executor in options['executors']:
+                    ScraperConfig.PARSE_EXECUTOR = executor
+                    hits, misses = self.run(options['misses'], options['duration'], options['hit_interval'])
+                    hits.sort()
+                    self.stdout.write(
+                        f"{executor}: cache hit p50={statistics.median(hits):.2f} ms, "
+                        f"p99={hits[int(len(hits) * 0.99)]:.2f} ms, max={hits[-1]:.2f} ms, "
+                        f"misses {misses / options['duration']:.1f}/s"
+                    )
+            finally:
+                ScraperConfig.GOOGLE_URL = google_url
+                ScraperConfig.PARSE_EXECUTOR = parse_executor
+                for executor in parse_executors.values():
+                    executor.shutdown()
+                parse_executors.clear()
+
+    @staticmethod
+    def run(miss_threads, duration, hit_interval):
+        """
+        Return list of cache hit times in ms and number of scraped misses
+        """
+        # Cache hit renders results already found in the cache, without db or Google requests
+        results = GoogleScraper('warm up', None, user_agent='loadtest').search()
+        stop = threading.Event()
+        misses = []
+
+        def scrape_misses(worker):
+            i = 0
+            while not stop.is_set():
+                GoogleScraper(f'load test {worker} {i}', None, user_agent='loadtest').search()
+                misses.append(1)
+                i += 1
+
+        threads = [threading.Thread(target=scrape_misses, args=(worker,)) for worker in range(miss_threads)]
+        for thread in threads:
+            thread.start()
+
+        hits = []
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            render_to_string('scraper/results.html', results)
+            hits.append((time.perf_counter() - start) * 1000)
+            time.sleep(hit_interval)
+
+        stop.set()
+        for thread in threads:
+            thread.join()
+        return hits, len(misses)
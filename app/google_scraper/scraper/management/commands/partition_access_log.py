@@ -0,0 +1,22 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from ...retention import partition_access_log
+
+
+class Command(BaseCommand):
+    help = (
+        'PostgreSQL only. Partition the access log by month of created_date and create partitions ahead, '
+        'run periodically, eg. daily, so expired months are dropped by purge_results'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=3, help='Number of next months partitions')
+
+    def handle(self, *args, **options):
+        try:
+            created = partition_access_log(options['months_ahead'])
+        except ImproperlyConfigured as err:
+            raise CommandError(err)
+        for name in created:
+            self.stdout.write(f'Created {name}')
@@ -0,0 +1,52 @@
+import datetime
+import gzip
+import os
+from contextlib import ExitStack
+
+import pytz
+from django.core.management.base import BaseCommand
+
+from ... import retention
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete results and access log older than RESULTS_RETENTION and ACCESS_RETENTION of ScraperConfig '
+        'in small batches, optionally archived to gzipped newline delimited JSON files first'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--archive', metavar='DIR',
+                            help='Directory of the archive files, eg. results-20210101T000000.ndjson.gz')
+        parser.add_argument('--batch-size', type=int, help='Rows deleted in one transaction')
+        parser.add_argument('--pause', type=float, default=0, help='Time in sec to wait between batches')
+        parser.add_argument('--dry-run', action='store_true', help='Only count rows to purge')
+
+    def handle(self, *args, **options):
+        now = datetime.datetime.now(pytz.utc)
+        # Access log first, so deleted results don't set null in the rows which are purged anyway
+        querysets = {
+            'accesses': retention.get_expired_accesses(now),
+            'results': retention.get_expired_results(now),
+        }
+
+        if options['dry_run']:
+            for name, queryset in querysets.items():
+                count = 'retention disabled' if queryset is None else queryset.count()
+                self.stdout.write(f'{name}: {count}')
+            return
+
+        with ExitStack() as stack:
+            for name, queryset in querysets.items():
+                if queryset is None:
+                    continue
+                archive = None
+                if options['archive']:
+                    path = os.path.join(options['archive'], f"{name}-{now.strftime('%Y%m%dT%H%M%S')}.ndjson.gz")
+                    archive = stack.enter_context(gzip.open(path, 'wt', encoding='utf-8'))
+
+                deleted = 0
+                if name == 'accesses':
+                    deleted += retention.drop_expired_partitions(archive, now)
+                deleted += retention.purge(queryset, options['batch_size'], archive, options['pause'])
+                self.stdout.write(f'{name}: {deleted} purged')
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from ...reparse import reparse_results
+
+
+class Command(BaseCommand):
+    help = 'Parse again pages saved in the html store and update results without scraping'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int,
+                            help='Number of parsing processes, by default number of CPUs, 0 parses in this process')
+        parser.add_argument('--chunk-size', type=int, default=100, help='Results updated at once')
+
+    def handle(self, *args, **options):
+        stats = reparse_results(workers=options['workers'], chunk_size=options['chunk_size'])
+        self.stdout.write(', '.join(f'{name}: {count}' for name, count in stats.items()))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from ... import rollups
+
+
+class Command(BaseCommand):
+    help = (
+        'Add results requests and scrapes changed since the last run to the daily rollups '
+        'read by the analytics API. Run it periodically, eg. every few minutes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Delete the rollups and roll up all rows again, purged rows are lost')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            rollups.clear_rollups()
+
+        stats = rollups.rollup()
+        self.stdout.write(
+            f"Rolled up {stats['windows']} windows: {stats['daily_rows']} daily rows, {stats['word_rows']} word rows"
+        )
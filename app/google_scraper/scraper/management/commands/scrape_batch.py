@@ -0,0 +1,37 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from ...batch import BatchScraper, to_ndjson
+
+
+class Command(BaseCommand):
+    help = 'Scrape queries from the file, one query per line, and write results as newline delimited JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', nargs='?', default='-', help='File with queries, "-" reads from stdin')
+        parser.add_argument('--lang', help='Interface language of all queries')
+        parser.add_argument('--country', help='Search results location of all queries')
+        parser.add_argument('--browser', help='Custom browser of all queries')
+        parser.add_argument('--workers', type=int, help='Number of parallel fetches')
+
+    def handle(self, *args, **options):
+        if options['file'] == '-':
+            lines = sys.stdin.readlines()
+        else:
+            with open(options['file'], encoding='utf-8') as file:
+                lines = file.readlines()
+
+        queries = [
+            {
+                'query': line.strip(),
+                'lang': options['lang'],
+                'country': options['country'],
+                'browser': options['browser'],
+            }
+            for line in lines if line.strip()
+        ]
+
+        batch = BatchScraper(queries, max_workers=options['workers'])
+        for line in to_ndjson(batch.run()):
+            self.stdout.write(line, ending='')
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from ...stub import StubGoogleServer, add_stub_arguments, get_stub_kwargs
+
+
+class Command(BaseCommand):
+    help = (
+        'Serve the local stub Google search with saved results pages, configurable latency, errors, 429 '
+        'and CAPTCHA pages. Run the application with GOOGLE_URL set to its url to scrape it'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1', help='Address to listen on')
+        parser.add_argument('--port', type=int, default=8001, help='Port to listen on')
+        add_stub_arguments(parser)
+
+    def handle(self, *args, **options):
+        server = StubGoogleServer(options['host'], options['port'], **get_stub_kwargs(options))
+        self.stdout.write(f'Serving stub Google search, set GOOGLE_URL={server.url}')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        self.stdout.write(f'Served responses: {server.get_stats()}')
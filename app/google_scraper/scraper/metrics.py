@@ -0,0 +1,39 @@
+from ..core.utils import Counter, Histogram
+
+# Time of the scraping pipeline stages:
+# queue (waiting for the scheduler), fetch, parse (includes count), count,
+# stream (fetch and parse of the streamed page), lookup, persist and access_log of the results request
+stage_seconds = Histogram(
+    'scraper_stage_seconds',
+    'Time of the scraping and results request stages in sec',
+    labelnames=['stage'],
+)
+
+results_requests = Counter(
+    'scraper_results_requests',
+    'Results requests by cache status: hit (served from db or shared scraping) or miss (scraped)',
+    labelnames=['cache'],
+)
+
+google_responses = Counter(
+    'scraper_google_responses',
+    'Google responses by HTTP status code',
+    labelnames=['status'],
+)
+
+parse_failures = Counter(
+    'scraper_parse_failures',
+    'Results pages which failed to parse, by reason: exception or no_result_stats',
+    labelnames=['reason'],
+)
+
+skipped_blocks = Counter(
+    'scraper_skipped_blocks',
+    'Not standard result blocks without title or description, eg. Twitter cards',
+)
+
+throttled_responses = Counter(
+    'scraper_throttled_responses',
+    'Google responses throttling scraping, by reason: status_429 or captcha',
+    labelnames=['reason'],
+)
@@ -0,0 +1,51 @@
+# Generated by Django 3.1.3 on 2026-10-18 02:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Results',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=40)),
+                ('query', models.CharField(max_length=200)),
+                ('lang', models.CharField(blank=True, default='', max_length=10)),
+                ('country', models.CharField(blank=True, default='', max_length=10)),
+                ('browser', models.CharField(blank=True, default='', max_length=20)),
+                ('number_of_results', models.PositiveBigIntegerField(null=True)),
+                ('links', models.JSONField()),
+                ('top_words', models.JSONField()),
+                ('results_limitation', models.PositiveSmallIntegerField(null=True)),
+                ('top_words_number', models.PositiveSmallIntegerField(null=True)),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+                ('modified_date', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ScrapeClaim',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=40, unique=True)),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ResultsAccess',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ip', models.GenericIPAddressField()),
+                ('cache_hit', models.BooleanField(default=False)),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+                ('results', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='accesses', to='scraper.results')),
+            ],
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 3.1.3 on 2026-10-18 02:46
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def delete_duplicated_results(apps, schema_editor):
+    """
+    Keep the most recently modified results of every key, move access log to them and delete the rest
+    """
+    Results = apps.get_model('scraper', 'Results')
+    ResultsAccess = apps.get_model('scraper', 'ResultsAccess')
+
+    duplicated_keys = Results.objects.values('key').annotate(count=Count('id')).filter(count__gt=1)
+    for key in duplicated_keys.values_list('key', flat=True):
+        kept, *duplicates = Results.objects.filter(key=key).order_by('-modified_date', '-id').values_list(
+            'id', flat=True
+        )
+        ResultsAccess.objects.filter(results_id__in=duplicates).update(results_id=kept)
+        Results.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraper', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicated_results, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='results',
+            name='key',
+            field=models.CharField(max_length=40, unique=True),
+        ),
+    ]
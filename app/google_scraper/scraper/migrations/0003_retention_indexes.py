@@ -0,0 +1,23 @@
+# Generated by Django 3.1.3 on 2026-10-18 02:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraper', '0002_results_key_unique'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='results',
+            name='modified_date',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='resultsaccess',
+            name='created_date',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,43 @@
+import json
+
+from django.db import migrations
+
+
+def decode_json_strings(apps, schema_editor):
+    """
+    Replace links and top words stored as JSON encoded strings inside JSON with the decoded objects
+    """
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            "UPDATE scraper_results SET links = (links #>> '{}')::jsonb WHERE jsonb_typeof(links) = 'string'"
+        )
+        schema_editor.execute(
+            "UPDATE scraper_results SET top_words = (top_words #>> '{}')::jsonb "
+            "WHERE jsonb_typeof(top_words) = 'string'"
+        )
+        return
+
+    Results = apps.get_model('scraper', 'Results')
+    for obj in Results.objects.only('links', 'top_words').iterator():
+        if isinstance(obj.links, str) or isinstance(obj.top_words, str):
+            Results.objects.filter(id=obj.id).update(
+                links=json.loads(obj.links) if isinstance(obj.links, str) else obj.links,
+                top_words=json.loads(obj.top_words) if isinstance(obj.top_words, str) else obj.top_words,
+            )
+
+
+def encode_json_strings(apps, schema_editor):
+    Results = apps.get_model('scraper', 'Results')
+    for obj in Results.objects.only('links', 'top_words').iterator():
+        Results.objects.filter(id=obj.id).update(links=json.dumps(obj.links), top_words=json.dumps(obj.top_words))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraper', '0003_retention_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(decode_json_strings, encode_json_strings),
+    ]
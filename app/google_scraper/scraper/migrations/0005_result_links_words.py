@@ -0,0 +1,43 @@
+# Generated by Django 3.1.3 on 2026-10-18 03:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraper', '0004_results_native_json'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResultWord',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('word', models.CharField(db_index=True, max_length=100)),
+                ('count', models.PositiveIntegerField()),
+                ('results', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='result_words', to='scraper.results')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ResultLink',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('url', models.TextField()),
+                ('domain', models.CharField(db_index=True, max_length=255)),
+                ('title', models.TextField()),
+                ('snippet', models.TextField()),
+                ('results', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='result_links', to='scraper.results')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='resultword',
+            constraint=models.UniqueConstraint(fields=('results', 'word'), name='unique_result_word'),
+        ),
+        migrations.AddConstraint(
+            model_name='resultlink',
+            constraint=models.UniqueConstraint(fields=('results', 'rank'), name='unique_result_link_rank'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 3.1.3 on 2026-10-18 03:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraper', '0005_result_links_words'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(db_index=True)),
+                ('country', models.CharField(blank=True, default='', max_length=10)),
+                ('lang', models.CharField(blank=True, default='', max_length=10)),
+                ('requests', models.PositiveIntegerField(default=0)),
+                ('cache_hits', models.PositiveIntegerField(default=0)),
+                ('scrapes', models.PositiveIntegerField(default=0)),
+                ('number_of_results_sum', models.PositiveBigIntegerField(default=0)),
+                ('number_of_results_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyWordRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('country', models.CharField(blank=True, default='', max_length=10)),
+                ('lang', models.CharField(blank=True, default='', max_length=10)),
+                ('word', models.CharField(max_length=100)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='dailywordrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'country', 'lang', 'word'), name='unique_daily_word_rollup'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'country', 'lang'), name='unique_daily_rollup'),
+        ),
+    ]
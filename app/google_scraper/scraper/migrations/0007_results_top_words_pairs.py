@@ -0,0 +1,39 @@
+from django.db import migrations
+
+
+def objects_to_pairs(apps, schema_editor):
+    """
+    Replace top words objects with lists of [word, count] pairs ordered by count,
+    jsonb objects have already lost the order of the words
+    """
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            "UPDATE scraper_results SET top_words = ("
+            "SELECT coalesce(jsonb_agg(jsonb_build_array(key, value) ORDER BY (value #>> '{}')::int DESC), '[]') "
+            "FROM jsonb_each(top_words)) WHERE jsonb_typeof(top_words) = 'object'"
+        )
+        return
+
+    Results = apps.get_model('scraper', 'Results')
+    for obj in Results.objects.only('top_words').iterator():
+        if isinstance(obj.top_words, dict):
+            top_words = sorted(obj.top_words.items(), key=lambda item: item[1], reverse=True)
+            Results.objects.filter(id=obj.id).update(top_words=[[word, count] for word, count in top_words])
+
+
+def pairs_to_objects(apps, schema_editor):
+    Results = apps.get_model('scraper', 'Results')
+    for obj in Results.objects.only('top_words').iterator():
+        if isinstance(obj.top_words, list):
+            Results.objects.filter(id=obj.id).update(top_words=dict(obj.top_words))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraper', '0006_daily_rollups'),
+    ]
+
+    operations = [
+        migrations.RunPython(objects_to_pairs, pairs_to_objects),
+    ]
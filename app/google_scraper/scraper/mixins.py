@@ -1,19 +1,71 @@
+import asyncio
+import collections
+import copy
 import datetime
-import json
+import hashlib
+import itertools
 import logging
-import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlencode, urlparse
+
 import pytz
-from requests import get
 
-from bs4 import BeautifulSoup
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, close_old_connections, transaction
+from django.urls import reverse
 
+from .analytics import save_analytics
 from .apps import ScraperConfig
-from .models import Results
-from ..core.utils import get_client_ip
+from .exceptions import ScrapingThrottled
+from .metrics import (
+    google_responses, parse_failures, results_requests, skipped_blocks, stage_seconds, throttled_responses,
+)
+from .models import Results, ResultsAccess, ScrapeClaim
+from .parsers import StreamParser, get_parser_class, is_captcha_page, warm_up
+from .profiling import capture_html, is_profiled
+from .scheduler import CLIENT_PROFILE, get_retry_after, scraping_scheduler
+from .serializers import QuerySerializer
+from .store import html_store
+from .words import Tokenizer, WordCounter, dump_top_words, load_top_words
+from ..core.exceptions import ServiceUnavailable
+from ..core.utils import (
+    AsyncSingleFlight, BoundedExecutor, KeyedExecutor, LRUCache, SingleFlight, TieredCache, get_async_client,
+    get_client_ip, http_get, upsert,
+)
 
 # Get an instance of a logger
 logger = logging.getLogger(__name__)
 
+# Coalesce concurrent scraping of the same request within the process, by threads and coroutines
+scraping_flight = SingleFlight()
+async_scraping_flight = AsyncSingleFlight()
+
+# Valid results by the request key, invalidated when results are saved
+results_cache = TieredCache(
+    LRUCache(
+        max_entries=ScraperConfig.RESULTS_CACHE_ENTRIES,
+        max_bytes=ScraperConfig.RESULTS_CACHE_BYTES,
+        ttl=ScraperConfig.RESULTS_CACHE_TTL,
+    ),
+    prefix='results:',
+    timeout=ScraperConfig.RESULTS_CACHE_TTL,
+)
+
+# Google serves results up to this offset, next pages are empty
+MAX_PAGE_START = 1000
+
+# Parse executors by kind, see get_parse_executor()
+parse_executors = {}
+parse_executors_lock = threading.Lock()
+
+# Refresh expired results in the background
+results_refresher = KeyedExecutor(
+    max_workers=max(ScraperConfig.SCRAPING_REFRESH_WORKERS, 1),
+    thread_name_prefix='results-refresh',
+)
+
 
 class GoogleScraper:
     """
@@ -36,6 +88,9 @@ class GoogleScraper:
     # Amount of most popular words in the results
     TOP_WORDS_QTY = 10
 
+    # Words of titles and descriptions are split by the tokenizer created once for all instances
+    TOKENIZER = Tokenizer(EXCLUDED_WORDS, ODD_CHARS)
+
     # Different browser simulation
     # List based on https://deviceatlas.com/blog/list-of-user-agent-strings#desktop
     BROWSERS = {
@@ -51,20 +106,29 @@ class GoogleScraper:
         'Firefox': 'Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:15.0) Gecko/20100101 Firefox/15.0.1',
     }
 
-    def __init__(self, query, request, results_limitation=20, lang=None, country=None, browser=None):
+    def __init__(self, query, request, results_limitation=20, lang=None, country=None, browser=None,
+                 user_agent=None):
 
         # User's query from form
         self.query = query
 
-        # Get custom browser or take from request header
-        # If provided incorrect browser then take random custom browser
+        # Get custom browser or take from request header or user_agent parameter
+        # If provided incorrect browser then take custom browser least loaded by the scheduler
         if browser:
             if browser in self.BROWSERS:
-                user_agent = self.BROWSERS[browser]
+                self.profile = browser
             else:
-                user_agent = self.BROWSERS[random.choice(list(self.BROWSERS.keys()))]
+                self.profile = scraping_scheduler.choose_profile(list(self.BROWSERS))
         else:
-            user_agent = request.headers["User-Agent"]
+            if request:
+                user_agent = request.headers["User-Agent"]
+
+            # Take custom browser if there is no client's user agent, eg. in batch scraping,
+            # otherwise all clients' user agents are scheduled as one browser profile
+            self.profile = CLIENT_PROFILE if user_agent else scraping_scheduler.choose_profile(list(self.BROWSERS))
+
+        if self.profile in self.BROWSERS:
+            user_agent = self.BROWSERS[self.profile]
 
         # Get user's request header to fake google request
         self.usr_agent = {
@@ -80,31 +144,86 @@ class GoogleScraper:
         # Country parameter in the request
         self.country = country
 
+        # Custom browser, a part of the request key
+        self.browser = browser
+
         # Prepare Google url, which contains user's query, number of returned results and language
-        self.google_url = 'https://www.google.com/search?q={}&num={}' \
-            .format(self.query.replace(' ', '+'),
-                    self.results_limitation + 5,
-                    )
+        self.google_url = self.get_page_url(self.results_limitation + 5)
 
-        # Add an optional interface language parameter
-        self.google_url += f'&hl={self.lang}' if self.lang else ''
+        # Google host, requests are scheduled per host and browser profile
+        self.host = urlparse(ScraperConfig.GOOGLE_URL).netloc
 
-        # Add an optional search results location limitation parameter
-        self.google_url += f'&cr=country{self.country}' if self.country else ''
+        # Number of Google's results and parsed html, see parsers.BaseParser
+        self.number_of_results, self.parser = None, None
 
-        # Number of Google's results and BeautifulSoup's parsed html
-        self.number_of_results, self.soup = None, None
+        # Lists of links downloaded from results, the same links for lookups and their result blocks
+        self.links, self.seen_links, self.link_blocks = [], set(), []
 
-        # Lists of links downloaded from results
-        self.links = []
+        # Counter of all and dictionary of most popular words in results - based on titles and descriptions
+        self.word_counter, self.top_words = WordCounter(self.TOKENIZER), {}
+        self.count_timer = stage_seconds.time(accumulate=True, stage='count')
 
-        # List of all and most popular words in results - based on titles and descriptions
-        self.words, self.top_words = {}, {}
+    @staticmethod
+    def normalize_query(query):
+        """
+        Return lowercase query with collapsed whitespaces.
+        """
+        return ' '.join(query.lower().split())
+
+    @classmethod
+    def get_results_key(cls, query, results_limitation=20, lang=None, country=None, browser=None):
+        """
+        Return key of the normalized request, shared between all clients.
+        Google results don't depend on the client, so the key is built from query parameters only.
+        Browser is a part of the key only if it's one of the custom browsers,
+        otherwise user agent comes from the client or is random.
+        """
+        normalized_request = '|'.join([
+            cls.normalize_query(query),
+            str(results_limitation),
+            (lang or '').lower(),
+            (country or '').upper(),
+            browser if browser in cls.BROWSERS else '',
+        ])
+        return hashlib.sha1(normalized_request.encode()).hexdigest()
+
+    def get_page_url(self, num, start=0):
+        """
+        Return url of the Google page with num results starting at the start offset
+        """
+        params = {'q': self.query, 'num': num}
+
+        # Add an optional offset of the next pages
+        if start:
+            params['start'] = start
+
+        # Add an optional interface language parameter
+        if self.lang:
+            params['hl'] = self.lang
+
+        # Add an optional search results location limitation parameter
+        if self.country:
+            params['cr'] = f'country{self.country}'
+
+        # Parameters are encoded, so characters like "&" and "#" of the query don't change the url
+        return f'{ScraperConfig.GOOGLE_URL}?{urlencode(params)}'
 
     def search(self):
-        html = self.fetch_results()
-        self.parse_results(html)
+        if self.results_limitation > ScraperConfig.PAGE_SIZE:
+            self.search_pages()
+        elif ScraperConfig.STREAMING_FETCH:
+            with stage_seconds.time(stage='stream'):
+                self.stream_results()
+        else:
+            with stage_seconds.time(stage='fetch'):
+                html = self.fetch_results()
+            self.store_page(html)
+            with stage_seconds.time(stage='parse'):
+                self.parse_page(html)
+
+        return self.get_results_dict()
 
+    def get_results_dict(self):
         results = {
             'query': self.query,
             'links': self.get_enumerated_dict_links(),
@@ -119,196 +238,838 @@ class GoogleScraper:
 
         return results
 
-    def fetch_results(self):
-        response = get(self.google_url, headers=self.usr_agent)
+    def fetch_results(self, url=None):
+        scraping_scheduler.acquire(self.host, self.profile)
+        response = http_get(url or self.google_url, headers=self.usr_agent)
+        google_responses.inc(status=response.status_code)
+        self.check_response(response.status_code, response.headers, response.text)
         response.raise_for_status()
 
         return response.text
 
-    def parse_results(self, raw_html):
-        self.soup = BeautifulSoup(raw_html, 'html.parser')
-        self.number_of_results = self.get_number_of_results()
+    def check_response(self, status_code, headers, raw_html):
+        """
+        Report Google response to the scheduler. When Google throttles scraping with 429 response
+        or CAPTCHA page, slow down the scheduler and raise ScrapingThrottled, so the page is never parsed
+        :param raw_html: Page or its beginning, enough to detect CAPTCHA page
+        """
+        if status_code == 429:
+            reason = 'status_429'
+        elif is_captcha_page(raw_html):
+            reason = 'captcha'
+        else:
+            if status_code < 400:
+                scraping_scheduler.succeed(self.host, self.profile)
+            return
 
-        result_block = self.soup.find_all('div', attrs={'class': 'g'})
+        throttled_responses.inc(reason=reason)
+        pause = get_retry_after(headers)
+        pause = ScraperConfig.THROTTLE_PAUSE if pause is None else pause
+        scraping_scheduler.throttle(self.host, self.profile, pause)
+        # Clients are asked to retry when the scheduler sends requests again
+        raise ScrapingThrottled(wait=pause)
 
-        for result in result_block:
+    def search_pages(self):
+        """
+        Fetch and parse pages of PAGE_SIZE results in the thread pool, PAGE_WORKERS pages at once,
+        and add their results in the rank order as soon as the previous pages are added.
+        Scraping stops when results_limitation is reached or a page has no result blocks.
+        When results are still missing after the expected pages, eg. because of not standard blocks,
+        the next pages are fetched one by one.
+        """
+        expected_pages = -(-self.results_limitation // ScraperConfig.PAGE_SIZE)
+        executor = ThreadPoolExecutor(max_workers=ScraperConfig.PAGE_WORKERS, thread_name_prefix='pages')
+        # Pages of the profiled request are only fetched by the workers and parsed in the request thread
+        profiled = is_profiled()
+        pending = collections.deque()
+        page = 0
+        try:
+            while True:
+                while (page < expected_pages or not pending) and len(pending) < ScraperConfig.PAGE_WORKERS \
+                        and page * ScraperConfig.PAGE_SIZE < MAX_PAGE_START:
+                    pending.append(executor.submit(self.fetch_page, page, not profiled))
+                    page += 1
+                if not pending:
+                    break
+
+                page_result = pending.popleft().result()
+                parser, blocks = self.parse_page_blocks(page_result) if profiled else page_result
+                if self.parser is None:
+                    # Number of results is taken from the first page
+                    self.parser = parser
+                    self.number_of_results = self.get_number_of_results()
+                if not blocks or self.add_results(blocks):
+                    break
+        finally:
+            # Don't wait for pages no longer needed
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+        self.set_top_words()
+
+    def fetch_page(self, page, parse=True):
+        """
+        Fetch and parse results page of the given number in the page worker
+        :return: Tuple of the parser and list of the result blocks, or the page if not parsed
+        """
+        with stage_seconds.time(stage='fetch'):
+            html = self.fetch_results(self.get_page_url(ScraperConfig.PAGE_SIZE, page * ScraperConfig.PAGE_SIZE))
+        return self.parse_page_blocks(html) if parse else html
+
+    def parse_page_blocks(self, html):
+        """
+        :return: Tuple of the parser and list of the result blocks of the page
+        """
+        capture_html(html)
+        with stage_seconds.time(stage='parse'):
             try:
-                title = result.find('h3').get_text()
-                description = result.find('span', attrs={'class': 'aCOpRe'}).get_text()
-                link = result.find('a', href=True)
-            except AttributeError:
+                parser = get_parser_class(ScraperConfig.PARSER_BACKEND)(html)
+                return parser, list(parser.get_result_blocks())
+            except Exception:
+                parse_failures.inc(reason='exception')
+                raise
+
+    def stream_results(self):
+        """
+        Download and parse results page chunk by chunk.
+        Connection is closed as soon as results_limitation links are found.
+        """
+        self.parser = StreamParser()
+        chunks = [] if ScraperConfig.HTML_STORE_ENABLED else None
+
+        scraping_scheduler.acquire(self.host, self.profile)
+        with http_get(self.google_url, headers=self.usr_agent, stream=True) as response:
+            google_responses.inc(status=response.status_code)
+            # Chunks are decoded only if the encoding is known
+            response.encoding = response.encoding or 'utf-8'
+
+            content = response.iter_content(chunk_size=ScraperConfig.STREAMING_CHUNK_SIZE, decode_unicode=True)
+            first_chunk = next(content, '')
+            self.check_response(response.status_code, response.headers, first_chunk)
+            response.raise_for_status()
+
+            for chunk in itertools.chain([first_chunk], content):
+                capture_html(chunk)
+                if chunks is not None:
+                    chunks.append(chunk)
+                self.parser.feed(chunk)
+                if self.add_results(self.parser.get_result_blocks()):
+                    break
+            else:
+                self.parser.close()
+                self.add_results(self.parser.get_result_blocks())
+
+        if chunks is not None:
+            # Page is stored up to the last downloaded chunk, which is enough to parse results again
+            self.store_page(''.join(chunks))
+        self.number_of_results = self.get_number_of_results()
+        self.set_top_words()
+
+    def store_page(self, raw_html):
+        """
+        Save fetched page in the html store if enabled, errors of the store don't break scraping
+        """
+        if not ScraperConfig.HTML_STORE_ENABLED:
+            return
+        try:
+            html_store.put(self.get_key(), raw_html)
+        except OSError as err:
+            logger.error(f"Page of {self.query} not stored: {err}")
+
+    def get_key(self):
+        return self.get_results_key(
+            self.query,
+            results_limitation=self.results_limitation,
+            lang=self.lang,
+            country=self.country,
+            browser=self.browser,
+        )
+
+    def parse_page(self, raw_html):
+        """
+        Parse results page with PARSE_EXECUTOR, in this thread or in the thread or process pool.
+        Page of the profiled request is parsed in this thread, so parsing is in the profile.
+        """
+        if ScraperConfig.PARSE_EXECUTOR == 'inline' or is_profiled():
+            self.parse_results(raw_html)
+            return
+
+        capture_html(raw_html)
+        self.number_of_results, self.links, self.top_words, self.link_blocks, self.word_counter.counter = \
+            get_parse_executor().run(
+                parse_results_page, raw_html, self.results_limitation, timeout=ScraperConfig.PARSE_TIMEOUT,
+            )
+
+    def parse_results(self, raw_html):
+        capture_html(raw_html)
+        try:
+            self.parser = get_parser_class(ScraperConfig.PARSER_BACKEND)(raw_html)
+            self.number_of_results = self.get_number_of_results()
+            self.add_results(self.parser.get_result_blocks())
+            self.set_top_words()
+        except Exception:
+            parse_failures.inc(reason='exception')
+            raise
+
+    def add_results(self, results):
+        """
+        Count words and add links of the result blocks until results_limitation is reached.
+        :return: True if results_limitation is reached, else False
+        """
+        for result in results:
+            title, description = result.title, result.description
+            if title is None or description is None:
                 # This happen when result block is not a standard one, eg. Twitter block
                 # We skip this iteration
+                skipped_blocks.inc()
                 continue
 
-            description_words = self.deleted_odd_chars(description).lower().split()
-            title_words = self.deleted_odd_chars(title).lower().split()
-
-            title_words = self.get_validated_words(title_words)
-            description_words = self.get_validated_words(description_words)
-            validated_words = description_words + title_words
+            # Google repeats some results on the next pages, they are added once
+            if result.link in self.seen_links:
+                continue
 
-            for word in validated_words:
-                self.words[word] = self.words[word] + 1 if word in self.words else 1
+            with self.count_timer:
+                self.count_words(description)
+                self.count_words(title)
 
-            self.set_link(title, link)
+            if self.set_link(title, result.link):
+                self.link_blocks.append(result)
             if len(self.links) == self.results_limitation:
-                break
+                return True
 
-        self.set_top_words()
+        return False
 
-    def deleted_odd_chars(self, text):
+    def count_words(self, text):
         """
-        Remove all odd and not needed characters from the variable passed.
+        Count validated words of the title or description.
         """
-        for ch in self.ODD_CHARS:
-            if ch in text:
-                text = text.replace(ch, '')
-        return text
+        self.word_counter.add(text)
 
     def get_number_of_results(self):
         """
-        Parse soup in search of number of all results.
+        Parse results stats in search of number of all results.
         Include situations where numbers are presented
         with comma or dot separator in different languages.
         PL - 10 000
         DE - 10.000
         EN - 10,000
         """
-        try:
-            stats_list = self.soup.find_all('div', attrs={'id': 'result-stats'})[0].get_text().split()
+        stats = self.parser.get_result_stats()
+        if stats is None:
+            parse_failures.inc(reason='no_result_stats')
+            logger.error("Results stats not found in the page")
+        else:
+            stats_list = stats.split()
             stats_number = ''
             for i, item in enumerate(stats_list):
                 if item[0].isdigit():
                     stats_number += item
                 elif i > 0:
                     break
-        except IndexError as err:
-            logger.error(f"Results stats not found in the soup: {err}")
-        else:
+
             # Try to convert stats to int
             # Stats number in different languages may contain dot or comma, so try to delete these chars.
             return int(stats_number.replace('.', '').replace(',', ''))
 
-    def get_validated_words(self, words):
-        """
-        Return filtered list of words with length greater than 1,
-        not digits and not from the list of excluded words.
-        """
-        validated_words = []
-        for word in words:
-            if len(word) > 1 and not word.isdigit() and word not in self.EXCLUDED_WORDS:
-                validated_words.append(word)
-        return validated_words
-
     def set_link(self, title, link):
         """
         Add link to the list of links if exists and has title.
         In addition it has to lead to external resource
         - this means it's not Google internal request, like /search?=q
+        :return: True if link was added, else False
         """
-        if link and title and 'http' in link['href']:
-            self.links.append(link['href'])
+        if link and title and 'http' in link:
+            self.links.append(link)
+            self.seen_links.add(link)
+            return True
+        return False
 
     def get_enumerated_dict_links(self):
         return dict((i + 1, link) for i, link in enumerate(self.links))
 
+    def get_analytics(self):
+        """
+        Return result blocks of the links and counts of all words, saved by analytics.save_analytics()
+        """
+        return self.link_blocks, self.word_counter.counter
+
     def set_top_words(self):
-        sorted_words = dict(sorted(self.words.items(), key=lambda item: item[1], reverse=True))
+        with self.count_timer:
+            self.top_words = self.word_counter.get_top_words(self.TOP_WORDS_QTY)
+        self.count_timer.observe()
+
+
+def parse_results_page(raw_html, results_limitation):
+    """
+    Parse results page in the parse executor
+    :return: Tuple of number of results, links, top words, result blocks of the links and counts of all words
+    """
+    scraper = GoogleScraper('', None, results_limitation=results_limitation, user_agent='parser')
+    scraper.parse_results(raw_html)
+    return (scraper.number_of_results, scraper.links, scraper.top_words) + scraper.get_analytics()
+
+
+def get_parse_executor():
+    """
+    Return pool of PARSE_EXECUTOR kind, created once per process
+    """
+    kind = ScraperConfig.PARSE_EXECUTOR
+    with parse_executors_lock:
+        if kind not in parse_executors:
+            parse_executors[kind] = BoundedExecutor(
+                kind,
+                max_workers=ScraperConfig.PARSE_WORKERS,
+                max_pending=ScraperConfig.PARSE_MAX_PENDING,
+                initializer=warm_up if kind == 'process' else None,
+                initargs=(ScraperConfig.PARSER_BACKEND,) if kind == 'process' else (),
+                thread_name_prefix='parser',
+            )
+        return parse_executors[kind]
+
+
+def claim_scraping(key):
+    """
+    Claim scraping of the request key for this worker, so other workers don't scrape it at the same time.
+    Abandoned claims are taken over.
+    :return: True if claimed, else False
+    """
+    ScrapeClaim.objects.filter(
+        key=key,
+        created_date__lt=datetime.datetime.now(pytz.utc) - datetime.timedelta(
+            seconds=ScraperConfig.SCRAPING_CLAIM_TIMEOUT
+        ),
+    ).delete()
+    try:
+        with transaction.atomic():
+            ScrapeClaim.objects.create(key=key)
+    except IntegrityError:
+        return False
+    return True
 
-        for i, key in enumerate(list(sorted_words.keys())):
-            if i < self.TOP_WORDS_QTY:
-                self.top_words[key] = sorted_words[key]
+
+def release_scraping(keys):
+    ScrapeClaim.objects.filter(key__in=keys).delete()
+
+
+class AsyncGoogleScraper(GoogleScraper):
+    """
+    Scrape Google result without blocking the event loop.
+    Page is downloaded asynchronously and parsed in the thread pool.
+    Results above PAGE_SIZE are scraped from many pages by the page workers, see search_pages,
+    because Google serves at most PAGE_SIZE results on one page.
+    """
+
+    async def search(self):
+        if self.results_limitation > ScraperConfig.PAGE_SIZE:
+            await sync_to_async(self.search_pages, thread_sensitive=False)()
+            return self.get_results_dict()
+
+        with stage_seconds.time(stage='fetch'):
+            html = await self.fetch_results()
+        if ScraperConfig.HTML_STORE_ENABLED:
+            await asyncio.get_running_loop().run_in_executor(None, self.store_page, html)
+        with stage_seconds.time(stage='parse'):
+            await asyncio.get_running_loop().run_in_executor(None, self.parse_page, html)
+
+        return self.get_results_dict()
+
+    async def fetch_results(self):
+        await scraping_scheduler.aacquire(self.host, self.profile)
+        response = await get_async_client().get(self.google_url, headers=self.usr_agent)
+        google_responses.inc(status=response.status_code)
+        self.check_response(response.status_code, response.headers, response.text)
+        response.raise_for_status()
+
+        return response.text
+
+    def fetch_page(self, page, parse=True):
+        # Page workers are threads, so they fetch pages with the blocking client
+        with stage_seconds.time(stage='fetch'):
+            html = super().fetch_results(self.get_page_url(ScraperConfig.PAGE_SIZE, page * ScraperConfig.PAGE_SIZE))
+        return self.parse_page_blocks(html) if parse else html
 
 
 class ResultsMixin(object):
 
+    # Search parameters passed to GoogleScraper
+    results_limitation = 20
+    lang, country, browser = None, None, None
+
+    # Values of Results objects served and cached
+    RESULTS_FIELDS = (
+        'id',
+        'number_of_results',
+        'links',
+        'top_words',
+        'results_limitation',
+        'top_words_number',
+        'modified_date',
+    )
+
     def __init__(self):
-        self.query, self.existing_obj, self.ip = None, None, None
+        self.query, self.key, self.existing_obj, self.ip, self.user_agent = None, None, None, None, None
         self.results = {}
+        self.results_id, self.modified_date = None, None
         self.now = datetime.datetime.now(pytz.utc)
 
+    @classmethod
+    def get_results_url(cls, query, lang=None, country=None, browser=None, results_limitation=None,
+                        view_name='scraper:results'):
+        """
+        Return canonical url of the results: normalized query and only not default options,
+        so the same results always have the same url, cached by browsers and HTTP caches
+        """
+        params = {'query': GoogleScraper.normalize_query(query)}
+        if lang:
+            params['lang'] = lang.lower()
+        if country:
+            params['country'] = country.upper()
+        if browser in GoogleScraper.BROWSERS:
+            params['browser'] = browser
+        if results_limitation and results_limitation != cls.results_limitation:
+            params['results_limitation'] = results_limitation
+        return f'{reverse(view_name)}?{urlencode(params)}'
+
+    def get_canonical_url(self, request, view_name='scraper:results'):
+        """
+        Return canonical url of the requested results if the request url is not canonical, else None
+        """
+        url = self.get_results_url(
+            self.query,
+            lang=self.lang,
+            country=self.country,
+            browser=self.browser,
+            results_limitation=self.results_limitation,
+            view_name=view_name,
+        )
+        # Parameters are compared, not their encoding, so redirects never loop
+        canonical = parse_qsl(urlparse(url).query)
+        return None if parse_qsl(request.META.get('QUERY_STRING', '')) == canonical else url
+
     def get_results(self, request):
         """
         Get results from db, if exist and valid,
-        else scrape new one and update existing or create new Results object
+        else scrape new one and update existing or create new Results object.
+        Results are shared between users, every request is saved in the access log.
         :return: Results dictionary based on GoogleScraper.search()
         """
-        self.query = request.session['query'] if 'query' in request.session else None
+        self.query = self.get_query(request)
 
         if self.query:
-            self.ip = get_client_ip(request)
-            try:
-                self.existing_obj = self.get_results_from_db()
+            cache_hit = self.get_cached_results(request)
 
-                if self.results_are_valid():
-                    self.results = self.get_result_dict_from_existing()
-            except Results.DoesNotExist:
-                pass
-            finally:
-                # Object not exist or is not valid then scrape and create new or update existing object
-                if not self.results:
-                    scraper = GoogleScraper(self.query, request)
-                    self.results = scraper.search()
-                    self.save_results_in_db()
+            # Object not exist or is not valid then scrape and create new or update existing object
+            if not self.results:
+                try:
+                    (results, self.results_id, scraped), shared = scraping_flight.do(
+                        self.key, self.scrape_results,
+                    )
+                except ServiceUnavailable as exc:
+                    results, scraped, shared = self.get_stale_results(exc), False, False
+                self.results = dict(results, query=self.query)
+                cache_hit = shared or not scraped
 
-            # Delete query session variable to force redirect to form view
-            del request.session['query']
+            self.finish_results(request, cache_hit)
 
             return self.results
 
+    async def aget_results(self, request):
+        """
+        Asynchronous variant of get_results() for async views.
+        Google results are fetched with AsyncGoogleScraper without blocking the event loop.
+        """
+        self.query = self.get_query(request)
+
+        if self.query:
+            cache_hit = await sync_to_async(self.get_cached_results)(request)
+
+            if not self.results:
+                try:
+                    (results, self.results_id, scraped), shared = await async_scraping_flight.do(
+                        self.key, self.ascrape_results,
+                    )
+                except ServiceUnavailable as exc:
+                    results, scraped, shared = self.get_stale_results(exc), False, False
+                self.results = dict(results, query=self.query)
+                cache_hit = shared or not scraped
+
+            await sync_to_async(self.finish_results)(request, cache_hit)
+
+            return self.results
+
+    def get_stale_results(self, exc):
+        """
+        Return expired results if exist, when scraping is unavailable, eg. the parse pool is overloaded
+        :param exc: ServiceUnavailable error raised again if there are no results
+        """
+        if not self.existing_obj:
+            raise exc
+        logger.warning(f"Serving expired results of {self.key}: {exc.detail}")
+        self.modified_date = self.existing_obj['modified_date']
+        return self.get_result_dict_from_existing()
+
+    def get_query(self, request, raise_exception=False):
+        """
+        Set search parameters from the results url, see get_results_url()
+        :param raise_exception: Raise ValidationError if parameters are not valid, like serializers of API views
+        :return: Query or None if parameters are not valid
+        """
+        serializer = QuerySerializer(data=request.GET)
+        if not serializer.is_valid(raise_exception=raise_exception):
+            return None
+
+        self.set_search_params(serializer.validated_data)
+        return serializer.validated_data['query']
+
+    def set_search_params(self, params):
+        self.lang = params.get('lang') or None
+        self.country = params.get('country') or None
+        self.browser = params.get('browser') or None
+        self.results_limitation = params.get('results_limitation') or self.results_limitation
+
+    def get_cached_results(self, request):
+        """
+        Set results from db if valid, or stale results if they are already being refreshed
+        :return: True if results were found, else False
+        """
+        self.ip = get_client_ip(request)
+        self.user_agent = request.headers.get('User-Agent')
+        self.key = GoogleScraper.get_results_key(
+            self.query,
+            results_limitation=self.results_limitation,
+            lang=self.lang,
+            country=self.country,
+            browser=self.browser,
+        )
+        try:
+            with stage_seconds.time(stage='lookup'):
+                self.existing_obj = self.get_results_from_db()
+            self.results_id = self.existing_obj['id']
+
+            if self.results_are_valid():
+                self.results = self.get_result_dict_from_existing()
+        except Results.DoesNotExist:
+            pass
+
+        if not self.results and self.existing_obj:
+            if self.results_are_refreshable():
+                # Serve stale results and refresh them in the background
+                self.results = self.get_result_dict_from_existing()
+                self.schedule_refresh()
+            elif self.is_scraping():
+                # Another thread is scraping the same request, serve stale results meanwhile
+                self.results = self.get_result_dict_from_existing()
+
+        if self.results:
+            self.modified_date = self.existing_obj['modified_date']
+        return bool(self.results)
+
+    def finish_results(self, request, cache_hit):
+        results_requests.inc(cache='hit' if cache_hit else 'miss')
+        with stage_seconds.time(stage='access_log'):
+            self.save_access_in_db(cache_hit)
+
+    def get_modified_date(self):
+        """
+        Return modification date of the served results, None if results are not saved, eg. no records found
+        """
+        if 'error' in self.results:
+            return None
+        if self.modified_date is None and self.results_id:
+            # Results were scraped just now
+            self.modified_date = Results.objects.filter(id=self.results_id).values_list(
+                'modified_date', flat=True,
+            ).first()
+        return self.modified_date
+
+    def get_etag(self, key=None, modified_date=None):
+        modified_date = modified_date or self.get_modified_date()
+        return f'"{key or self.key}-{int(modified_date.timestamp() * 1000000):x}"'
+
+    def get_max_age(self, modified_date=None):
+        """
+        Return time in sec until the served results expire, 0 for stale results
+        """
+        modified_date = modified_date or self.get_modified_date()
+        expiration_datetime = modified_date + datetime.timedelta(seconds=ScraperConfig.SCRAPING_EXPIRATION)
+        return max(int((expiration_datetime - datetime.datetime.now(pytz.utc)).total_seconds()), 0)
+
+    def get_cache_validators(self):
+        """
+        Return ETag, Last-Modified timestamp and max-age of the served results, empty dict if they must not be cached
+        """
+        modified_date = self.get_modified_date()
+        if modified_date is None:
+            return {}
+        return {
+            'etag': self.get_etag(),
+            'last_modified': int(modified_date.timestamp()),
+            'max_age': self.get_max_age(),
+        }
+
+    def is_scraping(self):
+        return scraping_flight.is_in_flight(self.key) or async_scraping_flight.is_in_flight(self.key)
+
+    def get_scraper(self, scraper_class=None):
+        return (scraper_class or GoogleScraper)(
+            self.query,
+            None,
+            results_limitation=self.results_limitation,
+            lang=self.lang,
+            country=self.country,
+            browser=self.browser,
+            user_agent=self.user_agent,
+        )
+
+    def scrape_results(self):
+        """
+        Scrape results and save them in db, unless another worker process has claimed the same request.
+        In that case serve stale results if exist or wait for the results of another worker.
+        :return: Tuple of results dictionary, Results object id and flag if results were scraped
+        """
+        claimed = self.claim_scraping()
+        if not claimed:
+            if self.existing_obj or self.wait_for_results():
+                return self.get_result_dict_from_existing(), self.results_id, False
+            logger.warning(f"Timeout while waiting for results of another worker: {self.key}")
+
+        try:
+            scraper = self.get_scraper()
+            self.results = scraper.search()
+            with stage_seconds.time(stage='persist'):
+                self.save_results_in_db(scraper)
+        finally:
+            # Claim of another worker is kept, so no third worker claims the request while it's scraped
+            if claimed:
+                self.release_scraping()
+
+        return self.results, self.results_id, True
+
+    async def ascrape_results(self):
+        """
+        Asynchronous variant of scrape_results()
+        """
+        claimed = await sync_to_async(self.claim_scraping)()
+        if not claimed:
+            # Waiting for another worker blocks the thread, so don't use the thread shared by async views
+            if self.existing_obj or await sync_to_async(self.wait_for_results, thread_sensitive=False)():
+                return self.get_result_dict_from_existing(), self.results_id, False
+            logger.warning(f"Timeout while waiting for results of another worker: {self.key}")
+
+        try:
+            scraper = self.get_scraper(AsyncGoogleScraper)
+            self.results = await scraper.search()
+            with stage_seconds.time(stage='persist'):
+                await sync_to_async(self.save_results_in_db)(scraper)
+        finally:
+            if claimed:
+                await sync_to_async(self.release_scraping)()
+
+        return self.results, self.results_id, True
+
+    def schedule_refresh(self):
+        """
+        Schedule refreshing of the results in the background thread,
+        unless the request is already being scraped.
+        """
+        if self.is_scraping():
+            return
+        # Refresh on a copy, so the background thread doesn't change results being served
+        refresher = copy.copy(self)
+        refresher.results = {}
+        results_refresher.submit(self.key, refresher.refresh_results)
+
+    def refresh_results(self):
+        """
+        Scrape and save results in the background thread
+        """
+        close_old_connections()
+        try:
+            scraping_flight.do(self.key, self.scrape_results)
+        finally:
+            close_old_connections()
+
+    def claim_scraping(self):
+        return claim_scraping(self.key)
+
+    def release_scraping(self):
+        release_scraping([self.key])
+
+    def wait_for_results(self):
+        """
+        Poll db until another worker saves the results or SCRAPING_WAIT_TIMEOUT passes
+        :return: True if results were found, else False
+        """
+        deadline = time.monotonic() + ScraperConfig.SCRAPING_WAIT_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(ScraperConfig.SCRAPING_WAIT_INTERVAL)
+            try:
+                self.existing_obj = self.get_results_from_db()
+            except Results.DoesNotExist:
+                continue
+            self.results_id = self.existing_obj['id']
+            return True
+        return False
+
     def get_results_from_db(self):
         """
-        Get Results object based on user's IP address and query
-        """
-        return Results.objects.values(
-            'id',
-            'number_of_results',
-            'links',
-            'top_words',
-            'results_limitation',
-            'top_words_number',
-            'modified_date',
-        ).get(query=self.query.lower(), ip=self.ip)
-
-    def get_result_dict_from_existing(self):
-        return {'query': self.query,
-                'links': json.loads(self.existing_obj['links']),
-                'top_words': json.loads(self.existing_obj['top_words']),
-                'number_of_results': self.existing_obj['number_of_results'],
-                'results_limitation': self.existing_obj['results_limitation'],
-                'top_words_number': self.existing_obj['top_words_number']}
-
-    def save_results_in_db(self):
-        """
-        Update Results object if already exists in db, else create new one
-        """
-        if 'error' not in self.results:
-            Results.objects.filter(id=self.existing_obj['id']).update(
-                number_of_results=self.results['number_of_results'],
-                top_words=json.dumps(self.results['top_words']),
-                links=json.dumps(self.results['links']),
-                results_limitation=self.results['results_limitation'],
-                top_words_number=self.results['top_words_number'],
-                modified_date=datetime.datetime.now(pytz.utc)
-            ) if self.existing_obj else Results.objects.create(
-                ip=self.ip,
-                query=self.query.lower(),
-                number_of_results=self.results['number_of_results'],
-                top_words=json.dumps(self.results['top_words']),
-                links=json.dumps(self.results['links']),
-                results_limitation=self.results['results_limitation'],
-                top_words_number=self.results['top_words_number'],
-            )
+        Get Results object based on the normalized request key.
+        Valid results are served from the results cache without the db query.
+        """
+        use_cache = bool(ScraperConfig.RESULTS_CACHE_ENTRIES)
+        if use_cache:
+            cached_obj = results_cache.get(self.key)
+            if cached_obj and self.results_are_valid(cached_obj):
+                return cached_obj
+
+        existing_obj = Results.objects.values(*self.RESULTS_FIELDS).get(key=self.key)
+        if use_cache and self.results_are_valid(existing_obj):
+            results_cache.set(self.key, existing_obj)
+        return existing_obj
+
+    def get_result_dict_from_existing(self, existing_obj=None, query=None):
+        existing_obj = existing_obj or self.existing_obj
+        return {'query': query or self.query,
+                'links': existing_obj['links'],
+                'top_words': load_top_words(existing_obj['top_words']),
+                'number_of_results': existing_obj['number_of_results'],
+                'results_limitation': existing_obj['results_limitation'],
+                'top_words_number': existing_obj['top_words_number']}
+
+    def save_results_in_db(self, scraper=None):
+        """
+        Create or update Results object of the request key in the single atomic upsert,
+        so concurrent scrapers never create duplicated results
+        :param scraper: GoogleScraper of the results, its links and words are saved for analytics
+        """
+        if 'error' in self.results:
+            return
+
+        self.results_id = upsert(Results, {
+            'key': self.key,
+            'query': GoogleScraper.normalize_query(self.query),
+            'lang': self.lang or '',
+            'country': self.country or '',
+            'browser': self.browser if self.browser in GoogleScraper.BROWSERS else '',
+            'number_of_results': self.results['number_of_results'],
+            'top_words': dump_top_words(self.results['top_words']),
+            'links': self.results['links'],
+            'results_limitation': self.results['results_limitation'],
+            'top_words_number': self.results['top_words_number'],
+        }, unique_fields=['key'], update_fields=Results.UPSERT_FIELDS)
+        results_cache.delete(self.key)
+        if scraper:
+            save_analytics([(self.results_id, *scraper.get_analytics())])
+
+    def save_access_in_db(self, cache_hit):
+        """
+        Log user's IP address with served results
+        """
+        ResultsAccess.objects.create(
+            results_id=self.results_id,
+            ip=self.ip,
+            cache_hit=cache_hit,
+        )
 
-    def results_are_valid(self):
+    def results_are_valid(self, existing_obj=None):
         """
         Check if results are valid in application config according to SCRAPING_EXPIRATION time policy
+        :param existing_obj: Results values to check, by default existing_obj
         :return: True if valid, else False
         """
-        expiration_datetime = self.existing_obj['modified_date'] + datetime.timedelta(
+        existing_obj = existing_obj or self.existing_obj
+        expiration_datetime = existing_obj['modified_date'] + datetime.timedelta(
             seconds=ScraperConfig.SCRAPING_EXPIRATION
         )
         return True if self.now < expiration_datetime else False
 
+    def results_are_refreshable(self):
+        """
+        Check if expired results can be served while being refreshed in the background
+        according to SCRAPING_HARD_EXPIRATION time policy
+        :return: True if refreshable, else False
+        """
+        if not ScraperConfig.SCRAPING_REFRESH_WORKERS:
+            return False
+        hard_expiration_datetime = self.existing_obj['modified_date'] + datetime.timedelta(
+            seconds=ScraperConfig.SCRAPING_HARD_EXPIRATION
+        )
+        return self.now < hard_expiration_datetime
 
+
+class BulkResultsMixin(ResultsMixin):
+    """
+    Valid results of many queries with the same search parameters, served from the results cache
+    and one db query. Results are never scraped, queries without valid results are missing.
+    """
+
+    def __init__(self):
+        super().__init__()
+        # Keys and Results values of the found results in order of the queries
+        self.found = []
+
+    def get_bulk_results(self, request, queries):
+        """
+        Set found results of the queries and log their accesses in one db query
+        :return: Tuple of list of results dictionaries and list of missing queries
+        """
+        self.ip = get_client_ip(request)
+        keys = {}
+        for query in queries:
+            key = GoogleScraper.get_results_key(
+                query,
+                results_limitation=self.results_limitation,
+                lang=self.lang,
+                country=self.country,
+                browser=self.browser,
+            )
+            keys.setdefault(key, query)
+
+        existing_objs = {}
+        if ScraperConfig.RESULTS_CACHE_ENTRIES:
+            for key in keys:
+                cached_obj = results_cache.get(key)
+                if cached_obj and self.results_are_valid(cached_obj):
+                    existing_objs[key] = cached_obj
+
+        with stage_seconds.time(stage='lookup'):
+            db_objs = Results.objects.filter(key__in=[key for key in keys if key not in existing_objs]).values(
+                'key', *self.RESULTS_FIELDS,
+            )
+            for existing_obj in db_objs:
+                key = existing_obj.pop('key')
+                if self.results_are_valid(existing_obj):
+                    existing_objs[key] = existing_obj
+                    if ScraperConfig.RESULTS_CACHE_ENTRIES:
+                        results_cache.set(key, existing_obj)
+
+        results, missing = [], []
+        for key, query in keys.items():
+            if key in existing_objs:
+                self.found.append((key, existing_objs[key]))
+                results.append(self.get_result_dict_from_existing(existing_objs[key], query))
+            else:
+                missing.append(query)
+
+        results_requests.inc(len(self.found), cache='hit')
+        with stage_seconds.time(stage='access_log'):
+            ResultsAccess.objects.bulk_create([
+                ResultsAccess(results_id=existing_obj['id'], ip=self.ip, cache_hit=True)
+                for _, existing_obj in self.found
+            ])
+        return results, missing
+
+    def get_cache_validators(self):
+        """
+        Return ETag of all found results, the last Last-Modified and the shortest max-age of them
+        """
+        if not self.found:
+            return {}
+        etags = ','.join(self.get_etag(key, existing_obj['modified_date']) for key, existing_obj in self.found)
+        modified_dates = [existing_obj['modified_date'] for _, existing_obj in self.found]
+        return {
+            'etag': f'"{hashlib.sha1(etags.encode()).hexdigest()}"',
+            'last_modified': int(max(modified_dates).timestamp()),
+            'max_age': self.get_max_age(min(modified_dates)),
+        }
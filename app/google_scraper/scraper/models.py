@@ -4,10 +4,37 @@ from django.db import models
 
 
 class Results(models.Model):
-    ip = models.GenericIPAddressField()
+    """
+    Scraping results shared between all users.
+    Object is identified by the key of a normalized request, see GoogleScraper.get_results_key()
+    """
+    # Fields overwritten when the results of the existing key are scraped again
+    UPSERT_FIELDS = [
+        'number_of_results', 'links', 'top_words', 'results_limitation', 'top_words_number', 'modified_date',
+    ]
+
+    key = models.CharField(
+        max_length=40,
+        unique=True,
+    )
     query = models.CharField(
         max_length=200,
     )
+    lang = models.CharField(
+        max_length=10,
+        blank=True,
+        default='',
+    )
+    country = models.CharField(
+        max_length=10,
+        blank=True,
+        default='',
+    )
+    browser = models.CharField(
+        max_length=20,
+        blank=True,
+        default='',
+    )
     number_of_results = models.PositiveBigIntegerField(
         null=True
     )
@@ -24,5 +51,164 @@ class Results(models.Model):
     )
     modified_date = models.DateTimeField(
         auto_now=True,
+        db_index=True,
+    )
+
+
+class ResultLink(models.Model):
+    """
+    Link of the results in the rank order, with its domain, title and snippet, for analytics across queries
+    """
+    results = models.ForeignKey(
+        Results,
+        on_delete=models.CASCADE,
+        related_name='result_links',
+    )
+    rank = models.PositiveSmallIntegerField()
+    url = models.TextField()
+    domain = models.CharField(
+        max_length=255,
+        db_index=True,
+    )
+    title = models.TextField()
+    snippet = models.TextField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['results', 'rank'], name='unique_result_link_rank'),
+        ]
+
+
+class ResultWord(models.Model):
+    """
+    Number of the word occurrences in titles and descriptions of the results, for analytics across queries
+    """
+    results = models.ForeignKey(
+        Results,
+        on_delete=models.CASCADE,
+        related_name='result_words',
+    )
+    word = models.CharField(
+        max_length=100,
+        db_index=True,
+    )
+    count = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['results', 'word'], name='unique_result_word'),
+        ]
+
+
+class ResultsAccess(models.Model):
+    """
+    Access log of results served to the user's IP address
+    """
+    results = models.ForeignKey(
+        Results,
+        on_delete=models.SET_NULL,
+        related_name='accesses',
+        null=True,
+    )
+    ip = models.GenericIPAddressField()
+    cache_hit = models.BooleanField(
+        default=False,
+    )
+    created_date = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+    )
+
+
+class ScrapeClaim(models.Model):
+    """
+    Claim of scraping in progress for the normalized request key.
+    Shared between worker processes to scrape the same request only once.
+    """
+    key = models.CharField(
+        max_length=40,
+        unique=True,
     )
+    created_date = models.DateTimeField(
+        auto_now_add=True,
+    )
+
 
+class DailyRollup(models.Model):
+    """
+    Daily summary of the results requests and scrapes per country and language,
+    incremented by the rollup_results command, see rollups.py
+    """
+    day = models.DateField(
+        db_index=True,
+    )
+    country = models.CharField(
+        max_length=10,
+        blank=True,
+        default='',
+    )
+    lang = models.CharField(
+        max_length=10,
+        blank=True,
+        default='',
+    )
+    requests = models.PositiveIntegerField(
+        default=0,
+    )
+    cache_hits = models.PositiveIntegerField(
+        default=0,
+    )
+    scrapes = models.PositiveIntegerField(
+        default=0,
+    )
+    # Sum and count of not null number_of_results of the scrapes, to average them across days
+    number_of_results_sum = models.PositiveBigIntegerField(
+        default=0,
+    )
+    number_of_results_count = models.PositiveIntegerField(
+        default=0,
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'country', 'lang'], name='unique_daily_rollup'),
+        ]
+
+
+class DailyWordRollup(models.Model):
+    """
+    Daily number of the word occurrences in the scraped results per country and language
+    """
+    day = models.DateField()
+    country = models.CharField(
+        max_length=10,
+        blank=True,
+        default='',
+    )
+    lang = models.CharField(
+        max_length=10,
+        blank=True,
+        default='',
+    )
+    word = models.CharField(
+        max_length=100,
+    )
+    count = models.PositiveIntegerField(
+        default=0,
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'country', 'lang', 'word'], name='unique_daily_word_rollup'),
+        ]
+
+
+class RollupWatermark(models.Model):
+    """
+    End of the last time window added to the rollups
+    """
+    name = models.CharField(
+        max_length=50,
+        unique=True,
+    )
+    value = models.DateTimeField()
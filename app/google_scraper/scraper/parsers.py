@@ -0,0 +1,299 @@
+from collections import deque, namedtuple
+from html.parser import HTMLParser
+
+import django
+from bs4 import BeautifulSoup
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+# Single Google result block.
+# Title or description is None when the block is not a standard one, eg. Twitter block.
+ResultBlock = namedtuple('ResultBlock', ['title', 'description', 'link'])
+
+# Markers of the CAPTCHA page served by Google instead of results to throttled clients
+CAPTCHA_MARKERS = ('id="captcha-form"', 'class="g-recaptcha"', '/sorry/index')
+
+# CAPTCHA page is small, so only beginning of the page is searched for the markers.
+# Results pages start with long scripts and styles, so snippets of results never get there
+CAPTCHA_SCAN_LENGTH = 16 * 1024
+
+
+class BaseParser(object):
+    """
+    Interface of the Google results page parser backend.
+    """
+
+    def __init__(self, raw_html):
+        self.raw_html = raw_html
+
+    def get_result_stats(self):
+        """
+        Return text of the results stats block, eg. "About 10,000 results (0.35 seconds)"
+        or None if not found.
+        """
+        raise NotImplementedError
+
+    def get_result_blocks(self):
+        """
+        Yield ResultBlock for every result block of the page in the document order.
+        """
+        raise NotImplementedError
+
+
+class SoupParser(BaseParser):
+    """
+    Pure Python parser based on the BeautifulSoup with html.parser.
+    """
+
+    def __init__(self, raw_html):
+        super().__init__(raw_html)
+        self.soup = BeautifulSoup(raw_html, 'html.parser')
+
+    def get_result_stats(self):
+        stats = self.soup.find('div', attrs={'id': 'result-stats'})
+        return stats.get_text() if stats else None
+
+    def get_result_blocks(self):
+        for result in self.soup.find_all('div', attrs={'class': 'g'}):
+            title = result.find('h3')
+            description = result.find('span', attrs={'class': 'aCOpRe'})
+            link = result.find('a', href=True)
+            yield ResultBlock(
+                title.get_text() if title else None,
+                description.get_text() if description else None,
+                link['href'] if link else None,
+            )
+
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+class LxmlParser(BaseParser):
+    """
+    C-accelerated parser based on the lxml with precompiled XPath expressions.
+    Returns the same results as SoupParser.
+    """
+
+    if etree:
+        RESULT_STATS = etree.XPath("(//div[@id='result-stats'])[1]")
+        RESULT_BLOCKS = etree.XPath(f"//div[{_has_class('g')}]")
+        TITLE = etree.XPath("(.//h3)[1]")
+        DESCRIPTION = etree.XPath(f"(.//span[{_has_class('aCOpRe')}])[1]")
+        LINK = etree.XPath("(.//a[@href])[1]")
+        # BeautifulSoup's get_text() skips comments, scripts, styles and templates
+        TEXT = etree.XPath(".//text()[not(ancestor::script or ancestor::style or ancestor::template)]")
+
+    def __init__(self, raw_html):
+        if not etree:
+            raise ImproperlyConfigured('lxml is required by the lxml parser backend')
+        super().__init__(raw_html)
+        self.root = etree.HTML(raw_html)
+
+    def get_text(self, element):
+        return ''.join(self.TEXT(element))
+
+    def get_result_stats(self):
+        if self.root is None:
+            return None
+        stats = self.RESULT_STATS(self.root)
+        return self.get_text(stats[0]) if stats else None
+
+    def get_result_blocks(self):
+        if self.root is None:
+            return
+        for result in self.RESULT_BLOCKS(self.root):
+            title = self.TITLE(result)
+            description = self.DESCRIPTION(result)
+            link = self.LINK(result)
+            yield ResultBlock(
+                self.get_text(title[0]) if title else None,
+                self.get_text(description[0]) if description else None,
+                link[0].get('href') if link else None,
+            )
+
+
+class _Block(object):
+    """
+    Result block being parsed by the StreamParser.
+    """
+
+    def __init__(self):
+        self.title, self.description, self.link = None, None, None
+        self.complete = False
+
+    def to_result_block(self):
+        return ResultBlock(self.title, self.description, self.link)
+
+
+class _StreamHTMLParser(HTMLParser):
+    """
+    Incremental html parser finding result blocks and stats the same way as BeautifulSoup with html.parser:
+    end tag closes the most recent open element with the same name and text is taken from all descendants
+    except comments, scripts, styles and templates.
+    """
+
+    VOID_ELEMENTS = {
+        'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+        'link', 'meta', 'param', 'source', 'track', 'wbr',
+    }
+    SKIPPED_TEXT_ELEMENTS = {'script', 'style', 'template'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        # Open elements as (tag, list of callbacks called when element is closed)
+        self.stack = []
+        # Result blocks in the document order, not yielded yet
+        self.blocks = deque()
+        self.open_blocks = []
+        # Lists of text parts collected for open elements
+        self.captures = []
+        self.skipped_text_depth = 0
+        self.result_stats = None
+
+    def capture_text(self, on_close, setter):
+        text = []
+        self.captures.append(text)
+
+        def close():
+            self.captures.remove(text)
+            setter(''.join(text))
+
+        on_close.append(close)
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        classes = (attrs.get('class') or '').split()
+        on_close = []
+
+        if tag == 'div' and attrs.get('id') == 'result-stats' and self.result_stats is None:
+            self.capture_text(on_close, self.set_result_stats)
+
+        for block in self.open_blocks:
+            if tag == 'h3' and block.title is None:
+                block.title = ''
+                self.capture_text(on_close, lambda text, block=block: setattr(block, 'title', text))
+            elif tag == 'span' and 'aCOpRe' in classes and block.description is None:
+                block.description = ''
+                self.capture_text(on_close, lambda text, block=block: setattr(block, 'description', text))
+            elif tag == 'a' and 'href' in attrs and block.link is None:
+                block.link = attrs['href'] or ''
+
+        if tag == 'div' and 'g' in classes:
+            block = _Block()
+            self.blocks.append(block)
+            self.open_blocks.append(block)
+            on_close.append(lambda: self.close_block(block))
+
+        if tag in self.SKIPPED_TEXT_ELEMENTS:
+            self.skipped_text_depth += 1
+            on_close.append(self.close_skipped_text)
+
+        if tag in self.VOID_ELEMENTS:
+            for callback in on_close:
+                callback()
+        else:
+            self.stack.append((tag, on_close))
+
+    def handle_endtag(self, tag):
+        for i in range(len(self.stack) - 1, -1, -1):
+            if self.stack[i][0] == tag:
+                self.close_elements(i)
+                break
+
+    def handle_data(self, data):
+        if not self.skipped_text_depth:
+            for text in self.captures:
+                text.append(data)
+
+    def close(self):
+        super().close()
+        self.close_elements(0)
+
+    def close_elements(self, index):
+        while len(self.stack) > index:
+            _, on_close = self.stack.pop()
+            for callback in on_close:
+                callback()
+
+    def close_block(self, block):
+        block.complete = True
+        self.open_blocks.remove(block)
+
+    def close_skipped_text(self):
+        self.skipped_text_depth -= 1
+
+    def set_result_stats(self, text):
+        self.result_stats = text
+
+
+class StreamParser(BaseParser):
+    """
+    Incremental pure Python parser. Html may be fed in chunks, eg. while downloading the page,
+    and result blocks are available as soon as they are complete.
+    Returns the same results as SoupParser.
+    """
+
+    def __init__(self, raw_html=None):
+        super().__init__(raw_html)
+        self.parser = _StreamHTMLParser()
+        if raw_html is not None:
+            self.feed(raw_html)
+            self.close()
+
+    def feed(self, chunk):
+        self.parser.feed(chunk)
+
+    def close(self):
+        self.parser.close()
+
+    def get_result_stats(self):
+        return self.parser.result_stats
+
+    def get_result_blocks(self):
+        """
+        Yield complete result blocks in the document order,
+        every block is yielded once, so next call continues with blocks parsed in the meantime.
+        """
+        blocks = self.parser.blocks
+        while blocks and blocks[0].complete:
+            yield blocks.popleft().to_result_block()
+
+
+PARSERS = {
+    'soup': SoupParser,
+    'lxml': LxmlParser,
+    'stream': StreamParser,
+}
+
+
+def get_parser_class(name):
+    """
+    Return parser backend class by the name from PARSERS
+    """
+    try:
+        return PARSERS[name]
+    except KeyError:
+        raise ImproperlyConfigured(f"Unknown parser backend: {name}")
+
+
+def is_captcha_page(raw_html):
+    """
+    Check if the page is Google CAPTCHA page, without parsing it
+    :return: True if CAPTCHA page, else False
+    """
+    head = raw_html[:CAPTCHA_SCAN_LENGTH]
+    return any(marker in head for marker in CAPTCHA_MARKERS)
+
+
+def warm_up(backend):
+    """
+    Initializer of the parsing processes: set up Django, so the scraper can be imported,
+    and parse an empty page, so the first parsed page doesn't pay for imports
+    """
+    django.setup()
+    get_parser_class(backend)('<html><body></body></html>').get_result_stats()
@@ -0,0 +1,138 @@
+import contextvars
+import cProfile
+import datetime
+import functools
+import logging
+import pstats
+import random
+import uuid
+from pathlib import Path
+
+import pytz
+
+from .apps import ScraperConfig
+
+# Get an instance of a logger
+logger = logging.getLogger(__name__)
+
+# Raw HTML pieces parsed during the profiled request, None when the request is not profiled
+captured_html = contextvars.ContextVar('captured_html', default=None)
+
+
+def is_profiled():
+    """
+    Return True if the current request is profiled, then its CPU work should run in the request thread,
+    because cProfile measures only the thread where it was enabled
+    """
+    return captured_html.get() is not None
+
+
+def capture_html(raw_html):
+    """
+    Save raw HTML parsed during the profiled request, eg. a whole page or streamed chunks
+    """
+    pieces = captured_html.get()
+    if pieces is not None:
+        pieces.append(raw_html)
+
+
+def profile_sampled(view):
+    """
+    Profile PROFILING_SAMPLE_RATE of the view calls with cProfile.
+    Profile and raw HTML parsed meanwhile are saved in PROFILING_DIR as <name>.prof and <name>.html
+    """
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not ScraperConfig.PROFILING_SAMPLE_RATE or random.random() >= ScraperConfig.PROFILING_SAMPLE_RATE:
+            return view(*args, **kwargs)
+
+        token = captured_html.set([])
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            try:
+                return view(*args, **kwargs)
+            finally:
+                profiler.disable()
+                save_profile(profiler, captured_html.get())
+        finally:
+            captured_html.reset(token)
+
+    return wrapper
+
+
+def save_profile(profiler, html_pieces):
+    """
+    Save profile with the parsed HTML and delete the oldest profiles above PROFILING_MAX_FILES
+    """
+    directory = Path(ScraperConfig.PROFILING_DIR)
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        name = f"{datetime.datetime.now(pytz.utc).strftime('%Y%m%dT%H%M%S%f')}-{uuid.uuid4().hex[:8]}"
+        profiler.dump_stats(directory / f'{name}.prof')
+        if html_pieces:
+            (directory / f'{name}.html').write_text(''.join(html_pieces), encoding='utf-8')
+
+        for path in sorted(directory.glob('*.prof'))[:-ScraperConfig.PROFILING_MAX_FILES or None]:
+            path.unlink()
+            path.with_suffix('.html').unlink(missing_ok=True)
+    except OSError as err:
+        # Profiling must never break the request
+        logger.error(f"Profile not saved: {err}")
+
+
+def load_stats(paths):
+    """
+    Return pstats.Stats of all profiles summed up
+    """
+    stats = None
+    for path in paths:
+        if stats is None:
+            stats = pstats.Stats(str(path))
+        else:
+            stats.add(str(path))
+    return stats
+
+
+def get_function_name(func):
+    filename, line, name = func
+    return f'{name} ({Path(filename).name}:{line})' if line else name
+
+
+def get_folded_stacks(stats):
+    """
+    Return flame graph folded stacks {"root;caller;function": self time in microseconds}.
+    cProfile keeps only caller-callee pairs, so time of a function called from many places
+    is split between its call stacks in proportion to the time of every call pair.
+    """
+    callees = {}
+    roots = []
+    for func, (_, _, _, _, callers) in stats.stats.items():
+        if not callers:
+            roots.append(func)
+        for caller, (_, _, _, cumulative) in callers.items():
+            callees.setdefault(caller, []).append((func, cumulative))
+
+    folded = {}
+
+    def walk(func, stack, share):
+        _, _, total_time, cumulative_time, _ = stats.stats[func]
+        # Skip stacks below the microsecond, they don't show on the flame graph
+        if cumulative_time * share < 0.000001:
+            return
+
+        stack = stack + [get_function_name(func)]
+        self_time = int(total_time * share * 1000000)
+        if self_time:
+            key = ';'.join(stack)
+            folded[key] = folded.get(key, 0) + self_time
+        for callee, cumulative in callees.get(func, []):
+            callee_cumulative = stats.stats[callee][3]
+            # Recursive calls are folded into the first call
+            if callee_cumulative and get_function_name(callee) not in stack:
+                walk(callee, stack, min(cumulative * share / callee_cumulative, 1))
+
+    for root in roots:
+        walk(root, [], 1)
+    return folded
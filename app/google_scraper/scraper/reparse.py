@@ -0,0 +1,94 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+
+from .analytics import save_analytics
+from .mixins import GoogleScraper, results_cache
+from .models import Results
+from .store import html_store
+from .words import dump_top_words
+
+# Get an instance of a logger
+logger = logging.getLogger(__name__)
+
+# Results fields updated with the parsed page, modified_date is kept as the page wasn't scraped again
+REPARSED_FIELDS = ['number_of_results', 'links', 'top_words', 'top_words_number']
+
+
+def parse_page(params, raw_html):
+    """
+    Parse the stored page with parameters of the request, in the worker process
+    :return: Tuple of results dictionary based on GoogleScraper.search() and analytics of the scraper
+    """
+    scraper = GoogleScraper(
+        params['query'],
+        None,
+        results_limitation=params['results_limitation'],
+        lang=params['lang'] or None,
+        country=params['country'] or None,
+        browser=params['browser'] or None,
+        user_agent='reparse',
+    )
+    scraper.parse_results(raw_html)
+    return scraper.get_results_dict(), scraper.get_analytics()
+
+
+def parse_page_or_none(params, raw_html):
+    """
+    Parse the stored page like parse_page, so one broken page doesn't stop the reparse
+    :return: Tuple of parse_page, None if parsing has failed
+    """
+    try:
+        return parse_page(params, raw_html)
+    except Exception:
+        logger.exception(f"Failed to parse stored page of {params['key']}")
+        return None
+
+
+def reparse_results(workers=None, chunk_size=100):
+    """
+    Parse again the stored pages of all Results in the html store and update them without network traffic.
+    Pages are parsed in the process pool, or in this process if workers is 0.
+    :return: Dictionary with numbers of updated, failed and missing (without Results object or page) keys
+    """
+    stats = {'updated': 0, 'failed': 0, 'missing': 0}
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=django.setup) if workers != 0 else None
+    keys = list(html_store.keys())
+    try:
+        for start in range(0, len(keys), chunk_size):
+            chunk = keys[start:start + chunk_size]
+            rows, pages = [], []
+            for row in Results.objects.filter(key__in=chunk).values(
+                'id', 'key', 'query', 'lang', 'country', 'browser', 'results_limitation',
+            ):
+                raw_html = html_store.get(row['key'])
+                if raw_html is not None:
+                    rows.append(row)
+                    pages.append(raw_html)
+            stats['missing'] += len(chunk) - len(rows)
+
+            parsed = executor.map(parse_page_or_none, rows, pages) if executor else map(parse_page_or_none, rows, pages)
+            updated, analytics = [], []
+            for row, parsed_page in zip(rows, parsed):
+                if parsed_page is None or 'error' in parsed_page[0]:
+                    stats['failed'] += 1
+                    continue
+                results, results_analytics = parsed_page
+                updated.append(Results(
+                    id=row['id'],
+                    number_of_results=results['number_of_results'],
+                    links=results['links'],
+                    top_words=dump_top_words(results['top_words']),
+                    top_words_number=results['top_words_number'],
+                ))
+                analytics.append((row['id'], *results_analytics))
+
+            Results.objects.bulk_update(updated, REPARSED_FIELDS)
+            save_analytics(analytics)
+            results_cache.delete_many([row['key'] for row in rows])
+            stats['updated'] += len(updated)
+    finally:
+        if executor:
+            executor.shutdown()
+    return stats
@@ -0,0 +1,197 @@
+import datetime
+import json
+import logging
+import re
+import time
+
+import pytz
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+
+from .apps import ScraperConfig
+from .models import Results, ResultsAccess
+
+# Get an instance of a logger
+logger = logging.getLogger(__name__)
+
+# Monthly partitions of the access log are named like scraper_resultsaccess_p2021_01
+ACCESS_TABLE = ResultsAccess._meta.db_table
+PARTITION_NAME_RE = re.compile(rf'^{ACCESS_TABLE}_p(\d{{4}})_(\d{{2}})$')
+
+
+def get_cutoff(retention, now=None):
+    now = now or datetime.datetime.now(pytz.utc)
+    return now - datetime.timedelta(seconds=retention)
+
+
+def get_expired_results(now=None):
+    """
+    Return queryset of results not modified within RESULTS_RETENTION, None if retention is disabled
+    """
+    if ScraperConfig.RESULTS_RETENTION is None:
+        return None
+    return Results.objects.filter(modified_date__lt=get_cutoff(ScraperConfig.RESULTS_RETENTION, now))
+
+
+def get_expired_accesses(now=None):
+    """
+    Return queryset of the access log older than ACCESS_RETENTION, None if retention is disabled
+    """
+    if ScraperConfig.ACCESS_RETENTION is None:
+        return None
+    return ResultsAccess.objects.filter(created_date__lt=get_cutoff(ScraperConfig.ACCESS_RETENTION, now))
+
+
+def write_rows(archive, rows):
+    """
+    Write rows to the archive file as newline delimited JSON
+    """
+    for row in rows:
+        archive.write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+
+
+def purge(queryset, batch_size=None, archive=None, pause=0):
+    """
+    Delete rows of the queryset in batches by primary key, every batch in its own short transaction,
+    so the table is never locked for long and concurrent writes go on between batches.
+    :param archive: Text file, eg. opened with gzip.open(), to which rows are written before deletion
+    :param pause: Time in sec to wait between batches to lower the load of the database
+    :return: Number of deleted rows
+    """
+    batch_size = batch_size or ScraperConfig.PURGE_BATCH_SIZE
+    model_class = queryset.model
+    pk_name = model_class._meta.pk.attname
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            ordered = queryset.order_by(pk_name)
+            if archive:
+                rows = list(ordered.values()[:batch_size])
+                write_rows(archive, rows)
+                pks = [row[pk_name] for row in rows]
+            else:
+                # Only primary keys are read, not whole rows with large JSON fields
+                pks = list(ordered.values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                return deleted
+            # Filtered by the queryset again, so rows updated since, eg. results scraped again, are kept.
+            # Collected for cascades with primary keys only
+            queryset.filter(pk__in=pks).only('pk').delete()
+        deleted += len(pks)
+        logger.info(f'Purged {deleted} rows of {model_class._meta.label}')
+        if pause:
+            time.sleep(pause)
+
+
+def is_access_log_partitioned():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE relname = %s", [ACCESS_TABLE])
+        row = cursor.fetchone()
+    return bool(row) and row[0] == 'p'
+
+
+def get_month_start(date, months=0):
+    month = date.year * 12 + date.month - 1 + months
+    return datetime.datetime(month // 12, month % 12 + 1, 1, tzinfo=pytz.utc)
+
+
+def partition_access_log(months_ahead=3, now=None):
+    """
+    PostgreSQL only. Convert the access log to the table partitioned by month of created_date
+    and create partitions for the next months, so old months are dropped at once instead of deleted row by row.
+    Existing rows are kept in the legacy partition. Run again periodically to create next partitions.
+    :return: List of created tables
+    """
+    if connection.vendor != 'postgresql':
+        raise ImproperlyConfigured('Partitioning is supported only on PostgreSQL')
+
+    now = now or datetime.datetime.now(pytz.utc)
+    first_month = get_month_start(now, 1)
+    created = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        if not is_access_log_partitioned():
+            legacy = f'{ACCESS_TABLE}_legacy'
+            cursor.execute(f'ALTER TABLE {ACCESS_TABLE} RENAME TO {legacy}')
+            cursor.execute(
+                f'CREATE TABLE {ACCESS_TABLE} (LIKE {legacy} INCLUDING DEFAULTS) PARTITION BY RANGE (created_date)'
+            )
+            # Primary key of the partitioned table has to include the partition column
+            cursor.execute(f'ALTER TABLE {ACCESS_TABLE} ADD PRIMARY KEY (id, created_date)')
+            cursor.execute(f'CREATE INDEX ON {ACCESS_TABLE} (results_id)')
+            cursor.execute(f'CREATE INDEX ON {ACCESS_TABLE} (created_date)')
+            cursor.execute(
+                f'ALTER TABLE {ACCESS_TABLE} ADD FOREIGN KEY (results_id) REFERENCES {Results._meta.db_table} (id) '
+                f'DEFERRABLE INITIALLY DEFERRED'
+            )
+            cursor.execute(f"SELECT pg_get_serial_sequence('{legacy}', 'id')")
+            cursor.execute(f'ALTER SEQUENCE {cursor.fetchone()[0]} OWNED BY {ACCESS_TABLE}.id')
+            cursor.execute(
+                f'ALTER TABLE {ACCESS_TABLE} ATTACH PARTITION {legacy} FOR VALUES FROM (MINVALUE) TO (%s)',
+                [first_month],
+            )
+            # Rows outside of the created partitions, eg. when partitions weren't created in time
+            cursor.execute(f'CREATE TABLE {ACCESS_TABLE}_default PARTITION OF {ACCESS_TABLE} DEFAULT')
+            created += [ACCESS_TABLE, f'{ACCESS_TABLE}_default']
+
+        for months in range(1, months_ahead + 1):
+            start, end = get_month_start(now, months), get_month_start(now, months + 1)
+            name = f'{ACCESS_TABLE}_p{start.year}_{start.month:02d}'
+            cursor.execute("SELECT 1 FROM pg_class WHERE relname = %s", [name])
+            if cursor.fetchone():
+                continue
+            cursor.execute(
+                f'CREATE TABLE {name} PARTITION OF {ACCESS_TABLE} FOR VALUES FROM (%s) TO (%s)', [start, end]
+            )
+            created.append(name)
+    return created
+
+
+def get_expired_partitions(cutoff):
+    """
+    Return list of (table, start, end) of the monthly access log partitions entirely older than cutoff
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON pg_inherits.inhparent = parent.oid "
+            "JOIN pg_class child ON pg_inherits.inhrelid = child.oid "
+            "WHERE parent.relname = %s",
+            [ACCESS_TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = []
+    for name in sorted(names):
+        match = PARTITION_NAME_RE.match(name)
+        if not match:
+            continue
+        start = datetime.datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=pytz.utc)
+        end = get_month_start(start, 1)
+        if end <= cutoff:
+            partitions.append((name, start, end))
+    return partitions
+
+
+def drop_expired_partitions(archive=None, now=None):
+    """
+    Drop monthly access log partitions older than ACCESS_RETENTION, which is instant
+    and leaves no dead rows to vacuum, unlike deletes
+    :return: Number of dropped rows
+    """
+    if ScraperConfig.ACCESS_RETENTION is None or connection.vendor != 'postgresql' \
+            or not is_access_log_partitioned():
+        return 0
+
+    dropped = 0
+    for name, start, end in get_expired_partitions(get_cutoff(ScraperConfig.ACCESS_RETENTION, now)):
+        with transaction.atomic():
+            rows = ResultsAccess.objects.filter(created_date__gte=start, created_date__lt=end)
+            if archive:
+                write_rows(archive, rows.values().iterator())
+            dropped += rows.count()
+            with connection.cursor() as cursor:
+                cursor.execute(f'ALTER TABLE {ACCESS_TABLE} DETACH PARTITION {name}')
+                cursor.execute(f'DROP TABLE {name}')
+        logger.info(f'Dropped partition {name}')
+    return dropped
@@ -0,0 +1,142 @@
+import datetime
+import logging
+
+import pytz
+from django.db import transaction
+from django.db.models import Count, F, Min, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+
+from .apps import ScraperConfig
+from .models import DailyRollup, DailyWordRollup, Results, ResultsAccess, ResultWord, RollupWatermark
+from ..core.utils import bulk_upsert
+
+# Get an instance of a logger
+logger = logging.getLogger(__name__)
+
+# Name of the watermark of the daily rollups
+WATERMARK = 'daily'
+
+# Counters of DailyRollup, incremented with every rolled up window
+DAILY_COUNTERS = ['requests', 'cache_hits', 'scrapes', 'number_of_results_sum', 'number_of_results_count']
+
+
+def get_watermark(lock=False):
+    """
+    Return end of the last rolled up window, None if nothing was rolled up yet
+    :param lock: Lock the watermark until the end of the transaction, so rollups don't run concurrently
+    """
+    watermarks = RollupWatermark.objects.select_for_update() if lock else RollupWatermark.objects
+    return watermarks.filter(name=WATERMARK).values_list('value', flat=True).first()
+
+
+def get_next_change(since=None):
+    """
+    Return time of the first request or scrape since the datetime, None if there are no more rows
+    """
+    results, accesses = Results.objects.all(), ResultsAccess.objects.all()
+    if since is not None:
+        results = results.filter(modified_date__gte=since)
+        accesses = accesses.filter(created_date__gte=since)
+    changes = [
+        results.aggregate(first=Min('modified_date'))['first'],
+        accesses.aggregate(first=Min('created_date'))['first'],
+    ]
+    changes = [value for value in changes if value is not None]
+    return min(changes) if changes else None
+
+
+def get_daily_rows(start, end):
+    """
+    Return DailyRollup values of the requests and scrapes between start and end, per day, country and lang
+    """
+    rows = {}
+
+    accesses = ResultsAccess.objects.filter(created_date__gte=start, created_date__lt=end).values(
+        day=TruncDate('created_date'),
+        # Results of the old accesses may be already purged
+        country=Coalesce('results__country', Value('')),
+        lang=Coalesce('results__lang', Value('')),
+    ).annotate(
+        requests=Count('id'),
+        cache_hits=Count('id', filter=Q(cache_hit=True)),
+    ).order_by()
+    for row in accesses:
+        values = rows.setdefault((row['day'], row['country'], row['lang']), {})
+        values.update(requests=row['requests'], cache_hits=row['cache_hits'])
+
+    scrapes = Results.objects.filter(modified_date__gte=start, modified_date__lt=end).values(
+        'country', 'lang', day=TruncDate('modified_date'),
+    ).annotate(
+        scrapes=Count('id'),
+        number_of_results_sum=Coalesce(Sum('number_of_results'), 0),
+        number_of_results_count=Count('number_of_results'),
+    ).order_by()
+    for row in scrapes:
+        values = rows.setdefault((row['day'], row['country'], row['lang']), {})
+        values.update({name: row[name] for name in DAILY_COUNTERS[2:]})
+
+    return [
+        dict({name: values.get(name, 0) for name in DAILY_COUNTERS}, day=day, country=country, lang=lang)
+        for (day, country, lang), values in rows.items()
+    ]
+
+
+def get_word_rows(start, end):
+    """
+    Return DailyWordRollup values of the words of the results scraped between start and end
+    """
+    return list(ResultWord.objects.filter(
+        results__modified_date__gte=start, results__modified_date__lt=end,
+    ).values(
+        'word',
+        day=TruncDate('results__modified_date'),
+        country=F('results__country'),
+        lang=F('results__lang'),
+    ).annotate(
+        count=Sum('count'),
+    ).order_by())
+
+
+def rollup(now=None):
+    """
+    Add requests and scrapes since the watermark to the daily rollups, window by window of ROLLUP_WINDOW sec,
+    every window in its own transaction with the new watermark. Rows of the last ROLLUP_LAG sec are left
+    for the next run, so rows of the transactions committed late are not skipped.
+    Scrapes are counted on the day of the last modification, so results scraped many times between runs
+    are counted once.
+    :return: Dictionary with numbers of rolled up windows, daily rows and word rows
+    """
+    end = (now or datetime.datetime.now(pytz.utc)) - datetime.timedelta(seconds=ScraperConfig.ROLLUP_LAG)
+    stats = {'windows': 0, 'daily_rows': 0, 'word_rows': 0}
+    while True:
+        with transaction.atomic():
+            watermark = get_watermark(lock=True)
+            # Windows without rows are skipped, eg. in the first run
+            start = get_next_change(watermark)
+            if start is None or start >= end:
+                if watermark is None or watermark < end:
+                    RollupWatermark.objects.update_or_create(name=WATERMARK, defaults={'value': end})
+                return stats
+
+            window_end = min(start + datetime.timedelta(seconds=ScraperConfig.ROLLUP_WINDOW), end)
+            daily_rows, word_rows = get_daily_rows(start, window_end), get_word_rows(start, window_end)
+            bulk_upsert(DailyRollup, daily_rows, unique_fields=['day', 'country', 'lang'],
+                        update_fields=[], increment_fields=DAILY_COUNTERS)
+            bulk_upsert(DailyWordRollup, word_rows, unique_fields=['day', 'country', 'lang', 'word'],
+                        update_fields=[], increment_fields=['count'])
+            RollupWatermark.objects.update_or_create(name=WATERMARK, defaults={'value': window_end})
+
+        stats['windows'] += 1
+        stats['daily_rows'] += len(daily_rows)
+        stats['word_rows'] += len(word_rows)
+        logger.info(f'Rolled up {start} - {window_end}')
+
+
+def clear_rollups():
+    """
+    Delete the rollups and the watermark, so the next rollup starts from the oldest rows
+    """
+    with transaction.atomic():
+        DailyRollup.objects.all().delete()
+        DailyWordRollup.objects.all().delete()
+        RollupWatermark.objects.filter(name=WATERMARK).delete()
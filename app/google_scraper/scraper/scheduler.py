@@ -0,0 +1,154 @@
+import contextlib
+import logging
+import random
+import time
+
+from .apps import ScraperConfig
+from .exceptions import ScrapingQueueTimeout
+from .metrics import stage_seconds
+from ..core.utils import AdaptiveTokenBucket, CallbackMetric, RateLimiter
+
+# Get an instance of a logger
+logger = logging.getLogger(__name__)
+
+# Browser profile of requests forwarding the client's user agent
+CLIENT_PROFILE = 'client'
+
+
+def get_retry_after(headers):
+    """
+    Return time in sec from the Retry-After header of the throttled response, None if not given in sec
+    """
+    retry_after = headers.get('Retry-After', '')
+    return int(retry_after) if retry_after.isdigit() else None
+
+
+class ScrapingScheduler(object):
+    """
+    Central scheduler of requests to Google shared by all scrapers of the process.
+    Every request takes a token of its Google host and of its browser profile, waiting for them
+    at most GOOGLE_QUEUE_TIMEOUT sec. Both limits slow down when Google throttles the request
+    and recover with successful responses, see AdaptiveTokenBucket.
+    """
+
+    def __init__(self):
+        self.hosts, self.profiles = None, None
+        self.reset()
+
+    def reset(self):
+        """
+        Create limits from ScraperConfig, forgetting the slowdowns
+        """
+        options = {
+            'bucket_class': AdaptiveTokenBucket,
+            'slowdown': ScraperConfig.THROTTLE_SLOWDOWN,
+            'recovery': ScraperConfig.THROTTLE_RECOVERY,
+        }
+        self.hosts = RateLimiter(ScraperConfig.GOOGLE_RATE_LIMIT, **options) \
+            if ScraperConfig.GOOGLE_RATE_LIMIT else None
+        self.profiles = RateLimiter(ScraperConfig.PROFILE_RATE_LIMIT, **options) \
+            if ScraperConfig.PROFILE_RATE_LIMIT else None
+
+    @contextlib.contextmanager
+    def unlimited(self):
+        """
+        Disable the limits within the block, eg. in load tests against the local stub server
+        """
+        limits, self.hosts, self.profiles = (self.hosts, self.profiles), None, None
+        try:
+            yield self
+        finally:
+            self.hosts, self.profiles = limits
+
+    def get_buckets(self, host, profile):
+        # Profile limit is the lower one, so host tokens aren't taken by requests still waiting for the profile
+        buckets = []
+        if self.profiles:
+            buckets.append(self.profiles.get_bucket(profile))
+        if self.hosts:
+            buckets.append(self.hosts.get_bucket(host))
+        return buckets
+
+    def choose_profile(self, profiles):
+        """
+        Return the browser profile with the most available tokens, so random browsers spread the load
+        """
+        if not self.profiles:
+            return random.choice(profiles)
+        tokens = {profile: self.profiles.get_bucket(profile).get_tokens() for profile in profiles}
+        most_tokens = max(tokens.values())
+        return random.choice([profile for profile in profiles if tokens[profile] == most_tokens])
+
+    def acquire(self, host, profile):
+        """
+        Wait for the turn of the request to the host with the browser profile
+        """
+        deadline = time.monotonic() + ScraperConfig.GOOGLE_QUEUE_TIMEOUT
+        with stage_seconds.time(stage='queue'):
+            for bucket in self.get_buckets(host, profile):
+                if not bucket.acquire(timeout=max(deadline - time.monotonic(), 0)):
+                    raise ScrapingQueueTimeout()
+
+    async def aacquire(self, host, profile):
+        """
+        Asynchronous variant of acquire()
+        """
+        deadline = time.monotonic() + ScraperConfig.GOOGLE_QUEUE_TIMEOUT
+        with stage_seconds.time(stage='queue'):
+            for bucket in self.get_buckets(host, profile):
+                if not await bucket.aacquire(timeout=max(deadline - time.monotonic(), 0)):
+                    raise ScrapingQueueTimeout()
+
+    def throttle(self, host, profile, pause=None):
+        """
+        Slow down requests after Google has throttled the request
+        :param pause: Time in sec without requests, by default THROTTLE_PAUSE
+        """
+        pause = ScraperConfig.THROTTLE_PAUSE if pause is None else pause
+        logger.warning(f"Google throttles requests of {profile} to {host}, paused for {pause} sec")
+        for bucket in self.get_buckets(host, profile):
+            bucket.throttle(pause)
+
+    def succeed(self, host, profile):
+        for bucket in self.get_buckets(host, profile):
+            bucket.succeed()
+
+    def get_stats(self):
+        """
+        Return current request rates per host and per profile
+        """
+        return {
+            'hosts': self.hosts.get_rates() if self.hosts else {},
+            'profiles': self.profiles.get_rates() if self.profiles else {},
+        }
+
+    def get_metrics(self, throttled=False):
+        """
+        Return list of (labels, value) of the current rates, see get_stats(), for the metrics
+        :param throttled: Return 1 for rates slowed down by throttling and 0 for the others instead of the rates
+        """
+        stats = self.get_stats()
+        values = []
+        base_rates = {'hosts': ScraperConfig.GOOGLE_RATE_LIMIT, 'profiles': ScraperConfig.PROFILE_RATE_LIMIT}
+        for limit, base_rate in base_rates.items():
+            for key, rate in sorted(stats[limit].items()):
+                values.append(({'limit': limit, 'key': key}, int(rate < base_rate) if throttled else rate))
+        return values
+
+
+# Scheduler of all requests to Google of the process
+scraping_scheduler = ScrapingScheduler()
+
+scheduler_rate = CallbackMetric(
+    'scraper_scheduler_rate',
+    'Requests per sec allowed by the scraping scheduler per Google host and browser profile, lowered by throttling',
+    scraping_scheduler.get_metrics,
+    labelnames=['limit', 'key'],
+)
+
+scheduler_throttled = CallbackMetric(
+    'scraper_scheduler_throttled',
+    'Google hosts and browser profiles slowed down by throttling: 1 until their rate recovers, else 0',
+    lambda: scraping_scheduler.get_metrics(throttled=True),
+    labelnames=['limit', 'key'],
+)
@@ -0,0 +1,93 @@
+from rest_framework import serializers
+
+from .apps import ScraperConfig
+
+
+# Language and country codes, eg. "pl", "en-GB" or "PL"
+CODE_REGEX = r'^[A-Za-z-]{2,5}$'
+
+
+class QuerySerializer(serializers.Serializer):
+    query = serializers.CharField(max_length=200)
+    lang = serializers.RegexField(CODE_REGEX, required=False, allow_blank=True)
+    country = serializers.RegexField(CODE_REGEX, required=False, allow_blank=True)
+    browser = serializers.CharField(max_length=20, required=False, allow_blank=True)
+    results_limitation = serializers.IntegerField(
+        min_value=1, max_value=ScraperConfig.MAX_RESULTS_LIMITATION, required=False,
+    )
+
+
+class ResultsSerializer(serializers.Serializer):
+    """
+    Results of GoogleScraper.search(), only the given fields if fields argument is passed
+    """
+    query = serializers.CharField()
+    links = serializers.DictField(child=serializers.CharField())
+    top_words = serializers.DictField(child=serializers.IntegerField())
+    number_of_results = serializers.IntegerField()
+    results_limitation = serializers.IntegerField()
+    top_words_number = serializers.IntegerField()
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class FieldsSerializer(serializers.Serializer):
+    # Comma separated fields of the results, eg. "query,links"
+    fields = serializers.CharField(required=False, allow_blank=True)
+
+    def validate_fields(self, value):
+        fields = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = [name for name in fields if name not in ResultsSerializer._declared_fields]
+        if unknown:
+            raise serializers.ValidationError(f"Unknown fields: {', '.join(unknown)}.")
+        return fields
+
+
+class BulkQuerySerializer(QuerySerializer, FieldsSerializer):
+    query = serializers.ListField(child=serializers.CharField(max_length=200), allow_empty=False)
+
+    def validate_query(self, value):
+        if len(value) > ScraperConfig.BULK_MAX_QUERIES:
+            raise serializers.ValidationError(
+                f"Ensure there are no more than {ScraperConfig.BULK_MAX_QUERIES} queries."
+            )
+        return value
+
+
+class BatchSerializer(serializers.Serializer):
+    queries = QuerySerializer(many=True, allow_empty=False)
+
+    def validate_queries(self, value):
+        if len(value) > ScraperConfig.BATCH_MAX_QUERIES:
+            raise serializers.ValidationError(
+                f"Ensure there are no more than {ScraperConfig.BATCH_MAX_QUERIES} queries."
+            )
+        return value
+
+
+class DailyRollupSerializer(serializers.Serializer):
+    day = serializers.DateField()
+    country = serializers.CharField(required=False)
+    lang = serializers.CharField(required=False)
+    requests = serializers.IntegerField()
+    cache_hits = serializers.IntegerField()
+    cache_hit_ratio = serializers.SerializerMethodField()
+    scrapes = serializers.IntegerField()
+    average_number_of_results = serializers.SerializerMethodField()
+
+    def get_cache_hit_ratio(self, obj):
+        return round(obj['cache_hits'] / obj['requests'], 3) if obj['requests'] else None
+
+    def get_average_number_of_results(self, obj):
+        if not obj['number_of_results_count']:
+            return None
+        return round(obj['number_of_results_sum'] / obj['number_of_results_count'])
+
+
+class WordCountSerializer(serializers.Serializer):
+    word = serializers.CharField()
+    count = serializers.IntegerField()
@@ -0,0 +1,148 @@
+import gzip
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from .apps import ScraperConfig
+
+# Get an instance of a logger
+logger = logging.getLogger(__name__)
+
+
+class HtmlStore(object):
+    """
+    Compressed, content-addressed on-disk store of fetched Google pages.
+    Pages are saved once per content in sharded directories, blobs/ab/cd/<sha256>.html.gz,
+    and the normalized request key refers to its last page in refs/ab/<key>.
+    The least recently saved pages are evicted when the blobs exceed HTML_STORE_MAX_BYTES.
+    Writes are atomic, so the store may be shared by worker processes.
+    """
+
+    def __init__(self, directory=None, max_bytes=None):
+        self._directory = directory
+        self._max_bytes = max_bytes
+        # Size of the blobs per store directory
+        self._sizes = {}
+        self._lock = threading.Lock()
+
+    @property
+    def directory(self):
+        return Path(self._directory or ScraperConfig.HTML_STORE_DIR)
+
+    @property
+    def max_bytes(self):
+        return self._max_bytes or ScraperConfig.HTML_STORE_MAX_BYTES
+
+    def get_blob_path(self, digest):
+        return self.directory / 'blobs' / digest[:2] / digest[2:4] / f'{digest}.html.gz'
+
+    def get_ref_path(self, key):
+        return self.directory / 'refs' / key[:2] / key
+
+    @staticmethod
+    def write_atomic(path, data):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def put(self, key, raw_html):
+        """
+        Save page of the request key, the same content is saved only once
+        :return: Content digest
+        """
+        content = raw_html.encode('utf-8')
+        digest = hashlib.sha256(content).hexdigest()
+        blob_path = self.get_blob_path(digest)
+
+        if blob_path.exists():
+            # Refresh the page, so it's evicted as the last one
+            os.utime(blob_path)
+        else:
+            data = gzip.compress(content, compresslevel=ScraperConfig.HTML_STORE_COMPRESSION)
+            self.write_atomic(blob_path, data)
+            with self._lock:
+                if self.directory in self._sizes:
+                    self._sizes[self.directory] += len(data)
+
+        self.write_atomic(self.get_ref_path(key), digest.encode())
+
+        if self.get_size() > self.max_bytes:
+            self.evict()
+        return digest
+
+    def get(self, key):
+        """
+        Return the last page of the request key, None if not stored or evicted
+        """
+        try:
+            digest = self.get_ref_path(key).read_text()
+            return gzip.decompress(self.get_blob_path(digest).read_bytes()).decode('utf-8')
+        except FileNotFoundError:
+            return None
+
+    def keys(self):
+        """
+        Yield request keys of the stored pages
+        """
+        for path in self.directory.glob('refs/*/*'):
+            if not path.name.endswith('.tmp'):
+                yield path.name
+
+    def get_blobs(self):
+        return list(self.directory.glob('blobs/*/*/*.html.gz'))
+
+    def get_size(self):
+        """
+        Return size of the stored pages in bytes, counted once per process and then updated on writes
+        """
+        with self._lock:
+            if self.directory not in self._sizes:
+                self._sizes[self.directory] = sum(path.stat().st_size for path in self.get_blobs())
+            return self._sizes[self.directory]
+
+    def evict(self):
+        """
+        Delete the least recently saved pages until the blobs fit in 90% of max_bytes
+        and then references to the deleted pages
+        """
+        blobs = []
+        for path in self.get_blobs():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            blobs.append((stat.st_mtime, stat.st_size, path))
+        blobs.sort()
+
+        size = sum(blob[1] for blob in blobs)
+        limit = self.max_bytes * 0.9
+        for _, blob_size, path in blobs:
+            if size <= limit:
+                break
+            path.unlink(missing_ok=True)
+            size -= blob_size
+            logger.info(f'Evicted page {path.name}')
+
+        with self._lock:
+            self._sizes[self.directory] = size
+
+        for key in list(self.keys()):
+            ref_path = self.get_ref_path(key)
+            try:
+                if not self.get_blob_path(ref_path.read_text()).exists():
+                    ref_path.unlink()
+            except FileNotFoundError:
+                continue
+
+
+# Store of the fetched pages, used when HTML_STORE_ENABLED
+html_store = HtmlStore()
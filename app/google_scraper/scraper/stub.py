@@ -0,0 +1,154 @@
+import collections
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+from .benchmarks import SERP_FIXTURES_DIR
+
+# Page served by Google to throttled clients instead of results
+CAPTCHA_FIXTURE = SERP_FIXTURES_DIR.parent / 'captcha' / 'sorry.html'
+
+
+class StubGoogleHandler(BaseHTTPRequestHandler):
+    """
+    Serve saved Google results page for the /search request.
+    The same query and start offset always get the same page, unless the server answers with
+    a random server error, 429 or CAPTCHA page, see StubGoogleServer.
+    """
+    # Keep connections alive like Google does
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != '/search':
+            self.send_error(404)
+            return
+
+        server = self.server
+        response, delay = server.draw_response()
+        if delay:
+            time.sleep(delay)
+
+        if response == 'error':
+            self.send_error(500)
+            return
+        if response == 'throttled':
+            self.send_response(429)
+            self.send_header('Retry-After', str(server.retry_after))
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        if response == 'captcha':
+            # Google serves the CAPTCHA page also with 200, so it's detected by content
+            body = server.captcha_page
+        else:
+            params = parse_qs(url.query)
+            page = '{}|{}'.format(params.get('q', [''])[0], params.get('start', ['0'])[0])
+            body = server.pages[zlib.crc32(page.encode()) % len(server.pages)]
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=UTF-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubGoogleServer(ThreadingHTTPServer):
+    """
+    Local stub of Google search used for tests and load tests, started in the background thread.
+    Every response takes latency plus random jitter sec, error_rate of the requests get 500,
+    throttle_rate get 429 with Retry-After and captcha_rate get the CAPTCHA page.
+    Random responses are drawn from the seeded generator, so runs are repeatable.
+    Usage:
+        with StubGoogleServer(latency=0.2, throttle_rate=0.01) as server:
+            ScraperConfig.GOOGLE_URL = server.url
+    """
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0, jitter=0, error_rate=0, throttle_rate=0, captcha_rate=0,
+                 retry_after=1, seed=0, fixtures_dir=SERP_FIXTURES_DIR):
+        super().__init__((host, port), StubGoogleHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.captcha_rate = captcha_rate
+        self.retry_after = retry_after
+        self.pages = [path.read_bytes() for path in sorted(Path(fixtures_dir).glob('*.html'))]
+        self.captcha_page = CAPTCHA_FIXTURE.read_bytes()
+        self.random = random.Random(seed)
+        self.requests = 0
+        # Number of served responses by kind: 'results', 'error', 'throttled' or 'captcha'
+        self.responses = collections.Counter()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def draw_response(self):
+        """
+        Count the request and draw its response
+        :return: Tuple of response kind and delay in sec
+        """
+        with self.lock:
+            self.requests += 1
+            draw = self.random.random()
+            delay = self.latency + self.random.uniform(0, self.jitter)
+            for response, rate in [('error', self.error_rate), ('throttled', self.throttle_rate),
+                                   ('captcha', self.captcha_rate)]:
+                if draw < rate:
+                    break
+                draw -= rate
+            else:
+                response = 'results'
+            self.responses[response] += 1
+        return response, delay
+
+    def get_stats(self):
+        with self.lock:
+            return dict(self.responses, requests=self.requests)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/search'
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+def add_stub_arguments(parser):
+    """
+    Add options of StubGoogleServer to the management command, see get_stub_kwargs()
+    """
+    parser.add_argument('--latency', type=float, default=0.2, help='Stub server response time in sec')
+    parser.add_argument('--jitter', type=float, default=0, help='Max random time in sec added to the latency')
+    parser.add_argument('--error-rate', type=float, default=0, help='Part of responses with 500 status')
+    parser.add_argument('--throttle-rate', type=float, default=0, help='Part of responses with 429 status')
+    parser.add_argument('--captcha-rate', type=float, default=0, help='Part of responses with the CAPTCHA page')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of random responses and latencies')
+
+
+def get_stub_kwargs(options):
+    return {
+        name: options[name] for name in ('latency', 'jitter', 'error_rate', 'throttle_rate', 'captcha_rate', 'seed')
+    }
@@ -0,0 +1,62 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+
+from ..mixins import GoogleScraper, results_cache
+from ..scheduler import scraping_scheduler
+
+
+def pytest_runtest_setup(item):
+    """
+    Skip tests of PostgreSQL only features on other databases
+    """
+    if item.get_closest_marker('postgres') and connection.vendor != 'postgresql':
+        pytest.skip('requires PostgreSQL')
+
+
+@pytest.fixture
+def search_results():
+    """
+    Static results of Google scraping
+    """
+    return {
+        'query': 'test',
+        'links': {1: 'https://example.com/'},
+        'top_words': {'example': 1},
+        'number_of_results': 100,
+        'results_limitation': 20,
+        'top_words_number': 10,
+    }
+
+
+@pytest.fixture
+def search_calls(monkeypatch, search_results):
+    """
+    Replace live Google scraping with static results and count calls
+    """
+    calls = []
+
+    def search(scraper):
+        calls.append(scraper.query)
+        return dict(search_results, query=scraper.query)
+
+    monkeypatch.setattr(GoogleScraper, 'search', search)
+    return calls
+
+
+@pytest.fixture(autouse=True)
+def clear_results_cache():
+    """
+    Don't share cached results between tests
+    """
+    results_cache.local.clear()
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_scraping_scheduler():
+    """
+    Don't share slowdowns of the scraping scheduler between tests
+    """
+    yield
+    scraping_scheduler.reset()
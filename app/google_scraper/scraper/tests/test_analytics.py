@@ -0,0 +1,137 @@
+import datetime
+import threading
+from collections import Counter
+
+import pytest
+import pytz
+from django import urls
+from django.db import connection
+
+from ..analytics import get_domain, get_top_domains, get_top_words, get_top_words_since, save_analytics
+from ..mixins import GoogleScraper
+from ..models import ResultLink, Results, ResultWord
+from ..parsers import ResultBlock
+from ..words import load_top_words
+from .test_mixins import get_results_page
+from .test_parsers import SERP_FIXTURES
+
+
+@pytest.fixture
+def fixture_page(monkeypatch):
+    """
+    Scrape the saved Google page instead of the live one
+    """
+    raw_html = (SERP_FIXTURES[0].parent / 'en_test.html').read_text(encoding='utf-8')
+    monkeypatch.setattr(GoogleScraper, 'fetch_results', lambda scraper, url=None: raw_html)
+    return raw_html
+
+
+def create_results(query):
+    return Results.objects.create(key=GoogleScraper.get_results_key(query), query=query, links={}, top_words=[])
+
+
+def test_domain_of_the_link():
+    """
+    Verify that domain is the host of the link without www prefix
+    """
+    assert get_domain('https://www.Example.com:8080/path?q=1') == 'example.com'
+    assert get_domain('http://docs.example.com/') == 'docs.example.com'
+
+
+@pytest.mark.django_db
+def test_scraped_links_and_words_are_saved(client, fixture_page):
+    """
+    Verify that links with titles and snippets and all words of the scraped results are saved,
+    so top words can be recomputed for any number, and scraping again replaces them
+    """
+    get_results_page(client, 'test', '10.0.0.1')
+    results = Results.objects.get()
+
+    links = list(ResultLink.objects.filter(results=results).order_by('rank'))
+    assert [link.url for link in links] == list(results.links.values())
+    assert [link.rank for link in links] == list(range(1, len(links) + 1))
+    assert all(link.title and link.snippet and link.domain for link in links)
+
+    assert get_top_words(results.id, results.top_words_number) == load_top_words(results.top_words)
+    assert get_top_words(results.id, 3) == dict(results.top_words[:3])
+    assert ResultWord.objects.filter(results=results).count() > results.top_words_number
+
+    Results.objects.update(modified_date=datetime.datetime(2020, 1, 1, tzinfo=pytz.utc))
+    get_results_page(client, 'test', '10.0.0.1')
+    assert ResultLink.objects.count() == len(links)
+
+
+@pytest.mark.postgres
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_saves_of_the_same_results():
+    """
+    Verify that links and words of the same results saved at once by many threads replace each other
+    """
+    results = create_results('test')
+    blocks = [ResultBlock('Title', 'Snippet', f'https://example.com/{rank}') for rank in range(20)]
+    errors = []
+
+    def save():
+        try:
+            for _ in range(10):
+                save_analytics([(results.id, blocks, Counter(example=2, test=1))])
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=save) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert ResultLink.objects.filter(results=results).count() == 20
+    assert get_top_words(results.id, 10) == {'example': 2, 'test': 1}
+
+
+@pytest.mark.django_db
+def test_batch_saves_links_and_words(admin_client, fixture_page):
+    """
+    Verify that links and words of the batch results are saved with their Results
+    """
+    b''.join(admin_client.post(urls.reverse('scraper:batch'), {'queries': [{'query': 'first'}, {'query': 'second'}]},
+                               content_type='application/json').streaming_content)
+
+    for results in Results.objects.all():
+        assert results.result_links.count() == len(results.links)
+        assert get_top_words(results.id, results.top_words_number) == load_top_words(results.top_words)
+
+
+@pytest.mark.django_db
+def test_aggregates_across_queries():
+    """
+    Verify that domains and words are aggregated across results in the db, and results are deleted with them
+    """
+    first, second, old = create_results('first'), create_results('second'), create_results('old')
+    Results.objects.filter(id=old.id).update(modified_date=datetime.datetime(2020, 1, 1, tzinfo=pytz.utc))
+
+    save_analytics([
+        (first.id, [
+            ResultBlock('Title', 'Snippet', 'https://www.example.com/a'),
+            ResultBlock('Title', 'Snippet', 'https://other.com/'),
+            ResultBlock('Title', 'Snippet', 'https://example.com/b'),
+        ], {'python': 3, 'django': 1}),
+        (second.id, [ResultBlock('Title', 'Snippet', 'https://other.com/b')], {'python': 2, 'scraper': 2}),
+        (old.id, [ResultBlock('Title', 'Snippet', 'https://old.com/')] * 3, {'old': 10}),
+    ])
+    since = datetime.datetime(2021, 1, 1, tzinfo=pytz.utc)
+
+    assert get_top_domains(since) == [
+        {'domain': 'other.com', 'results': 2, 'average_rank': 1.5},
+        {'domain': 'example.com', 'results': 1, 'average_rank': 2.0},
+    ]
+    assert get_top_words_since(since, number=2) == [
+        {'word': 'python', 'count': 5, 'results': 2},
+        {'word': 'scraper', 'count': 2, 'results': 1},
+    ]
+    assert get_top_words_since(number=1)[0]['word'] == 'old'
+
+    old.delete()
+    assert not ResultLink.objects.filter(domain='old.com').exists()
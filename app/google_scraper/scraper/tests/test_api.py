@@ -0,0 +1,138 @@
+import gzip
+import json
+
+import pytest
+from django import urls
+
+from ..apps import ScraperConfig
+from ..mixins import GoogleScraper
+from ..models import Results, ResultsAccess
+
+
+def get_results(client, **params):
+    return client.get(urls.reverse('scraper:results-api'), params, REMOTE_ADDR='10.0.0.1')
+
+
+@pytest.mark.django_db
+def test_results_api_returns_search_results(client, search_calls, search_results):
+    """
+    Verify that results API scrapes and returns results as JSON like the results view
+    """
+    resp = get_results(client, query='test')
+    get_results(client, query='test')
+
+    assert resp.status_code == 200
+    assert resp.json() == dict(search_results, links={'1': 'https://example.com/'})
+    assert search_calls == ['test']
+    assert list(ResultsAccess.objects.order_by('id').values_list('cache_hit', flat=True)) == [False, True]
+
+
+@pytest.mark.django_db
+def test_results_api_selects_fields(client, search_calls):
+    """
+    Verify that only the requested fields are returned and unknown fields are rejected
+    """
+    resp = get_results(client, query='test', fields='query,links')
+
+    assert resp.json() == {'query': 'test', 'links': {'1': 'https://example.com/'}}
+    assert get_results(client, query='test', fields='links,password').status_code == 400
+
+
+@pytest.mark.django_db
+def test_results_api_validates_query(client, search_calls):
+    """
+    Verify that not valid parameters are answered with 400 without scraping
+    """
+    resp = get_results(client, query='test', results_limitation=ScraperConfig.MAX_RESULTS_LIMITATION + 1)
+
+    assert resp.status_code == 400
+    assert 'results_limitation' in resp.json()
+    assert get_results(client).status_code == 400
+    assert search_calls == []
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('params', [
+    {'lang': 'en&start=900'},
+    {'lang': 'pl#x'},
+    {'country': 'PL=1'},
+    {'country': 'P'},
+])
+def test_results_api_validates_lang_and_country(client, search_calls, params):
+    """
+    Verify that only language and country codes are accepted
+    """
+    resp = get_results(client, query='a&b c#d', **params)
+
+    assert resp.status_code == 400
+    assert set(resp.json()) == set(params)
+    assert search_calls == []
+
+
+@pytest.mark.django_db
+def test_results_api_not_found(client, monkeypatch):
+    """
+    Verify that results without records are answered with 404
+    """
+    monkeypatch.setattr(GoogleScraper, 'search', lambda scraper: {'error': 'No records found', 'query': scraper.query})
+    resp = get_results(client, query='test')
+
+    assert resp.status_code == 404
+    assert resp.json() == {'detail': 'No records found'}
+
+
+@pytest.mark.django_db
+def test_results_api_compressed(client, monkeypatch, search_results):
+    """
+    Verify that accepted response is compressed with gzip and answered with 304 when not modified
+    """
+    links = {str(rank): f'https://example.com/{rank}' for rank in range(1, 51)}
+    monkeypatch.setattr(GoogleScraper, 'search', lambda scraper: dict(search_results, query=scraper.query, links=links))
+    url = urls.reverse('scraper:results-api')
+    resp = client.get(url, {'query': 'test'}, HTTP_ACCEPT_ENCODING='gzip, deflate')
+
+    assert resp['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in resp['Vary']
+    assert resp['ETag'].startswith('W/"')
+    assert json.loads(gzip.decompress(resp.content))['links'] == links
+
+    resp = client.get(url, {'query': 'test'}, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=resp['ETag'])
+    assert resp.status_code == 304
+    assert resp.content == b''
+
+
+@pytest.mark.django_db
+def test_bulk_results_api(client, search_calls, django_assert_max_num_queries):
+    """
+    Verify that bulk API serves valid results of many queries with one lookup and doesn't scrape missing ones
+    """
+    for query in ['first', 'second']:
+        get_results(client, query=query)
+    Results.objects.filter(query='second').update(modified_date='2000-01-01T00:00:00Z')
+    url = urls.reverse('scraper:results-bulk')
+
+    with django_assert_max_num_queries(2):
+        resp = client.get(url, {'query': ['First', 'second', 'third'], 'fields': 'query,number_of_results'})
+
+    assert resp.status_code == 200
+    assert resp.json() == {
+        'results': [{'query': 'First', 'number_of_results': 100}],
+        'missing': ['second', 'third'],
+    }
+    assert search_calls == ['first', 'second']
+    assert ResultsAccess.objects.filter(cache_hit=True).count() == 1
+
+    resp = client.get(url, {'query': ['First', 'second', 'third'], 'fields': 'query'}, HTTP_IF_NONE_MATCH=resp['ETag'])
+    assert resp.status_code == 304
+
+
+@pytest.mark.django_db
+def test_bulk_results_api_limits_queries(client, monkeypatch):
+    """
+    Verify that bulk API rejects more than BULK_MAX_QUERIES queries
+    """
+    monkeypatch.setattr(ScraperConfig, 'BULK_MAX_QUERIES', 2)
+    resp = client.get(urls.reverse('scraper:results-bulk'), {'query': ['a', 'b', 'c']})
+
+    assert resp.status_code == 400
+    assert 'query' in resp.json()
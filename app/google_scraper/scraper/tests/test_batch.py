@@ -0,0 +1,104 @@
+import json
+
+import pytest
+from django import urls
+from django.core.management import call_command
+
+from ..apps import ScraperConfig
+from ..batch import BatchScraper
+from ..mixins import GoogleScraper
+from ..models import Results, ScrapeClaim
+
+
+def get_ndjson(resp):
+    return [json.loads(line) for line in b''.join(resp.streaming_content).decode().splitlines()]
+
+
+@pytest.mark.django_db
+def test_batch_api_scrapes_unique_not_cached_queries(admin_client, search_calls):
+    """
+    Verify that batch API deduplicates queries, serves cached ones from db and streams NDJSON results
+    """
+    get_ndjson(admin_client.post(urls.reverse('scraper:batch'), {'queries': [{'query': 'cached'}]},
+                                 content_type='application/json'))
+
+    resp = admin_client.post(urls.reverse('scraper:batch'), {'queries': [
+        {'query': 'cached'},
+        {'query': 'Test', 'lang': 'pl'},
+        {'query': 'test ', 'lang': 'pl'},
+    ]}, content_type='application/json')
+
+    assert resp['Content-Type'] == 'application/x-ndjson'
+    results = get_ndjson(resp)
+    assert [(result['query'], result['cached']) for result in results] == [('cached', True), ('Test', False)]
+    assert search_calls == ['cached', 'Test']
+    assert Results.objects.filter(key=GoogleScraper.get_results_key('test', lang='pl')).exists()
+
+
+@pytest.mark.django_db
+def test_batch_api_validates_queries(admin_client, client):
+    """
+    Verify that batch API rejects empty batch and is open only to admins
+    """
+    resp = admin_client.post(urls.reverse('scraper:batch'), {'queries': []}, content_type='application/json')
+    assert resp.status_code == 400
+
+    resp = client.post(urls.reverse('scraper:batch'), {'queries': [{'query': 'test'}]}, content_type='application/json')
+    assert resp.status_code == 403
+
+
+@pytest.mark.django_db
+def test_batch_saves_results_every_chunk(search_calls):
+    """
+    Verify that scraped results are saved and their claims released every chunk_size results,
+    before the whole batch is done
+    """
+    results = BatchScraper([{'query': 'first'}, {'query': 'second'}], max_workers=1, chunk_size=1).run()
+
+    first = next(results)
+    assert list(Results.objects.values_list('query', flat=True)) == [first['query']]
+    assert list(ScrapeClaim.objects.values_list('key', flat=True)) == [
+        GoogleScraper.get_results_key(query) for query in ['first', 'second'] if query != first['query']
+    ]
+
+    list(results)
+    assert Results.objects.count() == 2
+    assert not ScrapeClaim.objects.exists()
+
+
+@pytest.mark.django_db
+def test_batch_skips_requests_claimed_by_another_worker(search_calls, monkeypatch):
+    """
+    Verify that requests claimed by another worker are served from stale results, or scraped without
+    the claim after waiting for the other worker, whose claim is kept
+    """
+    monkeypatch.setattr(ScraperConfig, 'SCRAPING_EXPIRATION', 0)
+    monkeypatch.setattr(ScraperConfig, 'SCRAPING_WAIT_TIMEOUT', 0.05)
+    monkeypatch.setattr(ScraperConfig, 'SCRAPING_WAIT_INTERVAL', 0.01)
+    list(BatchScraper([{'query': 'stale'}]).run())
+    claimed = [GoogleScraper.get_results_key(query) for query in ['stale', 'missing']]
+    for key in claimed:
+        ScrapeClaim.objects.create(key=key)
+
+    results = list(BatchScraper([{'query': 'stale'}, {'query': 'missing'}, {'query': 'new'}]).run())
+
+    assert sorted((result['query'], result['cached']) for result in results) == [
+        ('missing', False), ('new', False), ('stale', True),
+    ]
+    assert search_calls == ['stale', 'new', 'missing']
+    assert sorted(ScrapeClaim.objects.values_list('key', flat=True)) == sorted(claimed)
+
+
+@pytest.mark.django_db
+def test_scrape_batch_command(tmp_path, capsys, search_calls):
+    """
+    Verify that batch command scrapes queries from the file and writes NDJSON
+    """
+    queries = tmp_path / 'queries.txt'
+    queries.write_text('first\nsecond\n\n')
+
+    call_command('scrape_batch', str(queries), lang='en')
+
+    results = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert sorted(result['query'] for result in results) == ['first', 'second']
+    assert Results.objects.filter(lang='en').count() == 2
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from ..benchmarks import BENCHMARK_BASELINE, SERP_FIXTURES_DIR, benchmark_pages, get_regressions
+
+# Stages compared with the committed baseline, shorter ones are too noisy on shared CI machines
+BASELINE_STAGES = ('parse_results', 'count_words', 'peak_memory_kib')
+# Accepted regression against the baseline, high as the baseline was measured on a different machine
+BASELINE_MAX_REGRESSION = 2
+
+
+def test_benchmark_report_covers_all_pages():
+    """
+    Verify that benchmark times all stages of every saved page
+    """
+    paths = sorted(SERP_FIXTURES_DIR.glob('*.html'))
+    report = benchmark_pages(paths, repeat=1)
+
+    assert set(report['pages']) == {path.stem for path in paths}
+    assert report['bulk']['pages_per_sec'] > 0
+    for page in report['pages'].values():
+        assert set(page) == {
+            'parse_results', 'get_number_of_results', 'count_words', 'count_words_legacy', 'cache_hit',
+            'cache_hit_legacy', 'peak_memory_kib',
+        }
+
+
+def test_regressions_against_baseline():
+    """
+    Verify that only changes worse than max regression are reported
+    """
+    baseline = {'bulk': {'parse_results': 100, 'pages_per_sec': 50}}
+    report = {'bulk': {'parse_results': 120, 'pages_per_sec': 30}}
+
+    assert get_regressions(report, baseline, 0.25) == ['pages_per_sec: 30.00 vs baseline 50.00 (40% worse)']
+
+
+def test_benchmark_command_fails_on_regression(tmp_path):
+    """
+    Verify that benchmark command saves report and fails on regression against the baseline
+    """
+    output = tmp_path / 'report.json'
+    call_command('benchmark_parser', repeat=1, output=str(output))
+    report = json.loads(output.read_text())
+
+    baseline = tmp_path / 'baseline.json'
+    report['bulk']['pages_per_sec'] *= 100
+    baseline.write_text(json.dumps(report))
+
+    with pytest.raises(CommandError, match='pages_per_sec'):
+        call_command('benchmark_parser', repeat=1, baseline=str(baseline))
+
+
+def test_no_regression_against_committed_baseline():
+    """
+    Verify that parsing isn't much slower and doesn't take more memory than in the committed baseline.
+    Update the baseline with: python manage.py benchmark_parser --output <BENCHMARK_BASELINE>
+    """
+    baseline = json.loads(BENCHMARK_BASELINE.read_text())
+    baseline['bulk'] = {stage: baseline['bulk'][stage] for stage in BASELINE_STAGES}
+    report = benchmark_pages(sorted(SERP_FIXTURES_DIR.glob('*.html')), repeat=3)
+
+    assert set(baseline['pages']) == set(report['pages'])
+    assert get_regressions(report, baseline, BASELINE_MAX_REGRESSION) == []
@@ -0,0 +1,97 @@
+import time
+
+import pytest
+
+from ..apps import ScraperConfig
+from ..exceptions import ScrapingThrottled
+from ..loadtest import LoadTest, get_percentile
+from ..mixins import GoogleScraper
+from ..scheduler import scraping_scheduler
+from ..stub import StubGoogleServer
+from ...core.utils import http_get
+
+
+@pytest.fixture
+def stub_google(monkeypatch):
+    """
+    Scrape the local stub Google server without rate limits, responses are set by the test
+    """
+    with StubGoogleServer(latency=0) as server, scraping_scheduler.unlimited():
+        monkeypatch.setattr(ScraperConfig, 'GOOGLE_URL', server.url)
+        yield server
+
+
+def test_stub_serves_results_pages(stub_google):
+    """
+    Verify that the same query gets the same saved page and every request is counted
+    """
+    first = http_get(f'{stub_google.url}?q=test&num=5')
+    second = http_get(f'{stub_google.url}?q=test&num=5')
+
+    assert first.status_code == 200
+    assert first.text == second.text
+    assert stub_google.get_stats() == {'requests': 2, 'results': 2}
+
+
+@pytest.mark.parametrize('rate, response, status', [
+    ('throttle_rate', 'throttled', 429),
+    ('captcha_rate', 'captcha', 200),
+])
+def test_stub_throttles_scraping(stub_google, rate, response, status):
+    """
+    Verify that 429 responses and CAPTCHA pages of the stub are detected by the scraper
+    """
+    setattr(stub_google, rate, 1)
+    assert http_get(stub_google.url).status_code == status
+
+    with pytest.raises(ScrapingThrottled):
+        GoogleScraper('test', None, user_agent='pytest').search()
+    assert stub_google.get_stats() == {'requests': 2, response: 2}
+
+
+def test_stub_responses_are_repeatable():
+    """
+    Verify that random responses of the stub depend only on the seed and follow the rates
+    """
+    def draw(seed):
+        server = StubGoogleServer(error_rate=0.2, throttle_rate=0.2, captcha_rate=0.2, seed=seed)
+        try:
+            return [server.draw_response()[0] for _ in range(1000)]
+        finally:
+            server.server_close()
+
+    responses = draw(1)
+    assert responses == draw(1)
+    assert responses != draw(2)
+    for kind in ['error', 'throttled', 'captcha', 'results']:
+        assert 100 < responses.count(kind) < (500 if kind == 'results' else 300)
+
+
+def test_percentile():
+    """
+    Verify that percentile is one of the values, nearest-rank method
+    """
+    values = list(range(1, 101))
+
+    assert get_percentile(values, 50) == 51
+    assert get_percentile(values, 99) == 100
+    assert get_percentile([5], 95) == 5
+    assert get_percentile([], 50) is None
+
+
+@pytest.mark.django_db
+def test_load_test_counts_db_queries_and_google_requests(stub_google):
+    """
+    Verify that load test measures every request with its db queries,
+    and a cache hit doesn't reach Google
+    """
+    load_test = LoadTest(['results', 'api'], rps=10, duration=1, queries=1)
+    for scenario in ['results', 'api']:
+        load_test.send(scenario, 0, time.perf_counter())
+    report = LoadTest.get_report(load_test.samples['results'], elapsed=1)
+
+    assert stub_google.requests == 1
+    assert report['requests'] == 1
+    assert report['statuses'] == {200: 1}
+    assert report['db_queries_max'] > 0
+    assert load_test.samples['api'][0][1:] == (200, 2)
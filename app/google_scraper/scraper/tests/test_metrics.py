@@ -0,0 +1,71 @@
+import pytest
+from django import urls
+
+from ..benchmarks import SERP_FIXTURES_DIR, get_scraper
+from ..metrics import parse_failures, results_requests, skipped_blocks, stage_seconds
+from ..stub import StubGoogleServer
+from ...core.apps import CoreConfig
+from ...core.utils import get_connection_stats, http_get
+from .test_mixins import get_results_page
+
+
+@pytest.mark.django_db
+def test_results_request_stages_exposed_on_metrics(client, search_calls):
+    """
+    Verify that results request stages and cache status are counted and exposed on /metrics
+    """
+    misses, hits = results_requests.get(cache='miss'), results_requests.get(cache='hit')
+    persisted = stage_seconds.get_count(stage='persist')
+
+    get_results_page(client, 'test', '10.0.0.1')
+    get_results_page(client, 'test', '10.0.0.2')
+
+    assert results_requests.get(cache='miss') == misses + 1
+    assert results_requests.get(cache='hit') == hits + 1
+    assert stage_seconds.get_count(stage='persist') == persisted + 1
+
+    resp = client.get(urls.reverse('scraper:metrics'))
+    assert resp['Content-Type'].startswith('text/plain')
+    assert f'scraper_results_requests_total{{cache="hit"}} {hits + 1}' in resp.content.decode()
+    assert 'scraper_stage_seconds_bucket{stage="lookup",le="+Inf"}' in resp.content.decode()
+
+
+def test_parsing_failures_and_skipped_blocks_counted():
+    """
+    Verify that not standard blocks, pages without results stats and counting time are measured
+    """
+    skipped, failures = skipped_blocks.get(), parse_failures.get(reason='no_result_stats')
+    counted = stage_seconds.get_count(stage='count')
+
+    get_scraper().parse_results((SERP_FIXTURES_DIR / 'en_twitter_cards.html').read_text(encoding='utf-8'))
+    get_scraper().parse_results((SERP_FIXTURES_DIR / 'pl_no_result_stats.html').read_text(encoding='utf-8'))
+
+    assert skipped_blocks.get() > skipped
+    assert parse_failures.get(reason='no_result_stats') == failures + 1
+    assert stage_seconds.get_count(stage='count') == counted + 2
+
+
+def test_metrics_not_found_when_disabled(client, monkeypatch):
+    """
+    Verify that metrics endpoint is not available when metrics are disabled
+    """
+    monkeypatch.setattr(CoreConfig, 'METRICS_ENABLED', False)
+
+    assert client.get(urls.reverse('scraper:metrics')).status_code == 404
+
+
+def test_connection_reuse_exposed_on_metrics(client):
+    """
+    Verify that requests and opened and reused connections of the shared session are exposed on /metrics
+    """
+    with StubGoogleServer(latency=0) as server:
+        for _ in range(2):
+            http_get(server.url)
+    stats = get_connection_stats()
+
+    content = client.get(urls.reverse('scraper:metrics')).content.decode()
+
+    assert stats['requests'] >= 2 and stats['reused'] >= 1
+    assert f"http_client_requests_total {stats['requests']}" in content
+    assert f"http_client_connections_total {stats['connections']}" in content
+    assert f"http_client_reused_connections_total {stats['reused']}" in content
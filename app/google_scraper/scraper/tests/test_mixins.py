@@ -0,0 +1,329 @@
+import datetime
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from django import urls
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import F
+from django.test import AsyncClient
+from django.utils.http import http_date
+
+from ..apps import ScraperConfig
+from ..exceptions import ScrapingQueueTimeout, ScrapingThrottled
+from ..mixins import AsyncGoogleScraper, GoogleScraper, ResultsMixin, results_cache, results_refresher
+from ..models import Results, ResultsAccess, ScrapeClaim
+from ...core.exceptions import ExecutorSaturatedError, ExecutorTimeoutError
+from ...core.utils import upsert
+
+
+def get_results_page(client, query, ip):
+    return client.get(
+        urls.reverse('scraper:results'), {'query': query}, follow=True, REMOTE_ADDR=ip, HTTP_USER_AGENT='pytest',
+    )
+
+
+def test_results_key_is_normalized():
+    """
+    Verify that the same query written differently gives the same key
+    """
+    key = GoogleScraper.get_results_key('Test  query ')
+    assert key == GoogleScraper.get_results_key('test query')
+    assert key != GoogleScraper.get_results_key('test query', lang='pl')
+    assert key != GoogleScraper.get_results_key('test query', results_limitation=10)
+
+
+def test_results_key_ignores_unknown_browser():
+    """
+    Verify that not custom browser doesn't split the cache
+    """
+    assert GoogleScraper.get_results_key('test') == GoogleScraper.get_results_key('test', browser='Unknown')
+    assert GoogleScraper.get_results_key('test') != GoogleScraper.get_results_key('test', browser='Firefox')
+
+
+@pytest.mark.django_db
+def test_results_shared_between_ips(client, search_calls):
+    """
+    Verify that results scraped for one user are served to other users from the database
+    """
+    get_results_page(client, 'Test', '10.0.0.1')
+    resp = get_results_page(client, 'test ', '10.0.0.2')
+
+    assert resp.status_code == 200
+    assert search_calls == ['test']
+    assert Results.objects.count() == 1
+    assert Results.objects.values_list('links', 'top_words').get() == ({'1': 'https://example.com/'}, [['example', 1]])
+    assert list(ResultsAccess.objects.order_by('id').values_list('ip', 'cache_hit')) == [
+        ('10.0.0.1', False),
+        ('10.0.0.2', True),
+    ]
+
+
+@pytest.mark.django_db
+def test_top_words_order_kept_in_db(client, monkeypatch, search_results):
+    """
+    Verify that top words served from the database keep the order of counts.
+    Words are saved as pairs, because jsonb objects of Postgres order keys by length, not by count
+    """
+    top_words = {'zebra': 5, 'mm': 3, 'a': 2}
+    monkeypatch.setattr(GoogleScraper, 'search', lambda scraper: dict(search_results, top_words=top_words))
+    get_results_page(client, 'test', '10.0.0.1')
+    results_cache.local.clear()
+    cache.clear()
+    resp = get_results_page(client, 'test', '10.0.0.2')
+
+    assert Results.objects.values_list('top_words', flat=True).get() == [['zebra', 5], ['mm', 3], ['a', 2]]
+    assert list(resp.context['top_words'].items()) == list(top_words.items())
+    assert ResultsAccess.objects.filter(cache_hit=True).count() == 1
+
+
+@pytest.mark.django_db
+def test_valid_results_served_from_cache(client, search_calls, search_results, django_assert_num_queries):
+    """
+    Verify that valid results are looked up in the cache without db query and invalidated when saved again
+    """
+    get_results_page(client, 'test', '10.0.0.1')
+    assert results_cache.get(GoogleScraper.get_results_key('test')) is None
+
+    get_results_page(client, 'test', '10.0.0.1')
+    assert results_cache.get(GoogleScraper.get_results_key('test'))['number_of_results'] == 100
+
+    mixin = ResultsMixin()
+    mixin.key = GoogleScraper.get_results_key('test')
+    with django_assert_num_queries(0):
+        assert mixin.get_results_from_db()['number_of_results'] == 100
+
+    mixin.query, mixin.results = 'test', dict(search_results, number_of_results=200)
+    mixin.save_results_in_db()
+    assert results_cache.get(mixin.key) is None
+    assert mixin.get_results_from_db()['number_of_results'] == 200
+
+
+@pytest.mark.django_db
+def test_results_upsert_updates_existing_key():
+    """
+    Verify that results saved again for the same key, eg. by the concurrent worker, update the existing object
+    """
+    values = {'key': GoogleScraper.get_results_key('test'), 'query': 'test', 'links': {}, 'top_words': []}
+    first_id = upsert(Results, values, unique_fields=['key'], update_fields=Results.UPSERT_FIELDS)
+    second_id = upsert(Results, dict(values, number_of_results=10, query='ignored'),
+                       unique_fields=['key'], update_fields=Results.UPSERT_FIELDS)
+
+    assert first_id == second_id
+    assert list(Results.objects.values_list('query', 'number_of_results')) == [('test', 10)]
+
+
+@pytest.mark.django_db
+def test_benchmark_lookup_command_rolls_back_rows(capsys):
+    """
+    Verify that lookup benchmark times both lookups and leaves no generated rows
+    """
+    call_command('benchmark_lookup', rows=100, lookups=10)
+
+    out = capsys.readouterr().out
+    assert 'key: p50=' in out and 'query: p50=' in out
+    assert not Results.objects.exists()
+
+
+@pytest.mark.django_db
+def test_stale_results_served_when_another_worker_scrapes(client, search_calls, monkeypatch):
+    """
+    Verify that stale results are served without scraping when the request is claimed by another worker
+    """
+    monkeypatch.setattr(ScraperConfig, 'SCRAPING_EXPIRATION', 0)
+    monkeypatch.setattr(ScraperConfig, 'SCRAPING_REFRESH_WORKERS', 0)
+    get_results_page(client, 'test', '10.0.0.1')
+    ScrapeClaim.objects.create(key=GoogleScraper.get_results_key('test'))
+
+    resp = get_results_page(client, 'test', '10.0.0.2')
+
+    assert resp.status_code == 200
+    assert search_calls == ['test']
+    assert ResultsAccess.objects.filter(cache_hit=True).count() == 1
+
+
+@pytest.mark.django_db
+def test_claim_of_another_worker_kept_after_wait_timeout(search_calls, monkeypatch):
+    """
+    Verify that request scraped after waiting for another worker in vain doesn't release the claim
+    of that worker, so the next request keeps waiting instead of claiming it again
+    """
+    monkeypatch.setattr(ScraperConfig, 'SCRAPING_WAIT_TIMEOUT', 0.05)
+    monkeypatch.setattr(ScraperConfig, 'SCRAPING_WAIT_INTERVAL', 0.01)
+    key = GoogleScraper.get_results_key('test')
+    other_claim = ScrapeClaim.objects.create(key=key)
+    mixins = []
+    for _ in range(2):
+        mixin = ResultsMixin()
+        mixin.query, mixin.key = 'test', key
+        mixins.append(mixin)
+
+    assert mixins[0].scrape_results()[2] is True
+    assert list(ScrapeClaim.objects.all()) == [other_claim]
+    assert mixins[1].claim_scraping() is False
+    assert search_calls == ['test']
+
+
+@pytest.mark.django_db
+def test_expired_results_refreshed_in_background(client, search_calls, monkeypatch):
+    """
+    Verify that expired results within hard expiration are served immediately and refreshed in the background
+    """
+    scheduled = []
+    monkeypatch.setattr(ScraperConfig, 'SCRAPING_EXPIRATION', 0)
+    monkeypatch.setattr(results_refresher, 'submit', lambda key, fn: scheduled.append(key))
+    get_results_page(client, 'test', '10.0.0.1')
+
+    resp = get_results_page(client, 'test', '10.0.0.2')
+
+    assert resp.status_code == 200
+    assert search_calls == ['test']
+    assert scheduled == [GoogleScraper.get_results_key('test')]
+
+
+@pytest.mark.django_db
+def test_hard_expired_results_scraped(client, search_calls, monkeypatch):
+    """
+    Verify that results after hard expiration are scraped synchronously
+    """
+    monkeypatch.setattr(ScraperConfig, 'SCRAPING_EXPIRATION', 0)
+    monkeypatch.setattr(ScraperConfig, 'SCRAPING_HARD_EXPIRATION', 0)
+    get_results_page(client, 'test', '10.0.0.1')
+    get_results_page(client, 'test', '10.0.0.2')
+
+    assert search_calls == ['test', 'test']
+
+
+@pytest.mark.django_db
+def test_async_results_shared_with_sync_results(client, search_calls, search_results, monkeypatch):
+    """
+    Verify that async results view scrapes with AsyncGoogleScraper and shares results with the sync view
+    """
+    async def search(scraper):
+        search_calls.append(f'async {scraper.query}')
+        return dict(search_results, query=scraper.query)
+
+    monkeypatch.setattr(AsyncGoogleScraper, 'search', search)
+    async_client = AsyncClient()
+    for query in ['async test', 'test']:
+        url = ResultsMixin.get_results_url(query, view_name='scraper:results-async')
+        resp = async_to_sync(async_client.get)(url, HTTP_USER_AGENT='pytest')
+        assert resp.status_code == 200
+        get_results_page(client, query, '10.0.0.1')
+
+    assert search_calls == ['async async test', 'async test']
+    assert ResultsAccess.objects.filter(cache_hit=True).count() == 2
+
+
+@pytest.mark.django_db
+def test_results_redirected_to_canonical_url(client, search_calls):
+    """
+    Verify that not canonical results url is permanently redirected before scraping
+    """
+    url = urls.reverse('scraper:results')
+    resp = client.get(url, {'query': 'Test  Query', 'lang': 'PL', 'results_limitation': 20})
+
+    assert resp.status_code == 301
+    assert resp.url == f'{url}?query=test+query&lang=pl'
+    assert resp.url == ResultsMixin.get_results_url('test query', lang='pl')
+    assert search_calls == []
+
+
+@pytest.mark.django_db
+def test_results_served_with_cache_headers(client, search_calls):
+    """
+    Verify that results are cacheable by their url and don't write the session
+    """
+    resp = get_results_page(client, 'test', '10.0.0.1')
+    modified_date = Results.objects.values_list('modified_date', flat=True).get()
+
+    assert resp.status_code == 200
+    assert resp['ETag'].startswith('"')
+    assert resp['Last-Modified'] == http_date(modified_date.timestamp())
+    assert 'public' in resp['Cache-Control']
+    assert 0 < int(resp['Cache-Control'].split('max-age=')[1]) <= ScraperConfig.SCRAPING_EXPIRATION
+    assert 'sessionid' not in resp.cookies
+    assert not client.session.keys()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('header', ['HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE'])
+def test_not_modified_results_not_rendered(client, search_calls, header):
+    """
+    Verify that conditional request of not modified results is answered with 304 without rendering
+    """
+    resp = get_results_page(client, 'test', '10.0.0.1')
+    validator = resp['ETag'] if header == 'HTTP_IF_NONE_MATCH' else resp['Last-Modified']
+    resp = client.get(resp.request['PATH_INFO'], {'query': 'test'}, **{header: validator})
+
+    assert resp.status_code == 304
+    assert resp.content == b''
+    assert not resp.templates
+    assert resp['ETag']
+    assert search_calls == ['test']
+    assert ResultsAccess.objects.filter(cache_hit=True).count() == 1
+
+
+@pytest.mark.django_db
+def test_modified_results_rendered(client, search_calls):
+    """
+    Verify that results saved again after the cached copy are rendered with a new ETag
+    """
+    etag = get_results_page(client, 'test', '10.0.0.1')['ETag']
+    Results.objects.update(modified_date=F('modified_date') + datetime.timedelta(seconds=1))
+    results_cache.local.clear()
+    resp = client.get(urls.reverse('scraper:results'), {'query': 'test'}, HTTP_IF_NONE_MATCH=etag)
+
+    assert resp.status_code == 200
+    assert resp['ETag'] != etag
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('error, retry_after', [
+    (ExecutorSaturatedError(), '1'),
+    (ExecutorTimeoutError(), '1'),
+    (ScrapingThrottled(wait=30), '30'),
+    (ScrapingQueueTimeout(), '1'),
+])
+def test_overloaded_scraping_answered_with_503(client, monkeypatch, error, retry_after):
+    """
+    Verify that overloaded parse pool, throttled scraping and full scraping queue are answered
+    with 503 and Retry-After by the results views and API
+    """
+    def search(scraper):
+        raise error
+
+    monkeypatch.setattr(GoogleScraper, 'search', search)
+    monkeypatch.setattr(AsyncGoogleScraper, 'search', sync_to_async(search))
+    responses = [
+        get_results_page(client, 'test', '10.0.0.1'),
+        async_to_sync(AsyncClient().get)(ResultsMixin.get_results_url('test', view_name='scraper:results-async')),
+        client.get(urls.reverse('scraper:results-api'), {'query': 'test'}),
+    ]
+
+    for resp in responses:
+        assert resp.status_code == 503
+        assert resp['Retry-After'] == retry_after
+        assert str(error.detail) in resp.content.decode()
+    assert 'no-cache' in responses[0]['Cache-Control']
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('error', [ExecutorSaturatedError, ScrapingThrottled, ScrapingQueueTimeout])
+def test_expired_results_served_when_scraping_unavailable(client, search_calls, monkeypatch, error):
+    """
+    Verify that expired results are served instead of 503 when scraping is unavailable
+    """
+    get_results_page(client, 'test', '10.0.0.1')
+    monkeypatch.setattr(ScraperConfig, 'SCRAPING_EXPIRATION', 0)
+    monkeypatch.setattr(ScraperConfig, 'SCRAPING_HARD_EXPIRATION', 0)
+
+    def search(scraper):
+        raise error()
+
+    monkeypatch.setattr(GoogleScraper, 'search', search)
+    resp = get_results_page(client, 'test', '10.0.0.2')
+
+    assert resp.status_code == 200
+    assert resp.context['links'] == {'1': 'https://example.com/'}
+    assert 'max-age=0' in resp['Cache-Control']
@@ -0,0 +1,141 @@
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from asgiref.sync import async_to_sync
+
+from ..apps import ScraperConfig
+from ..mixins import AsyncGoogleScraper, GoogleScraper
+
+WORDS = ['alpha', 'beta', 'gamma', 'delta', 'epsilon', 'zeta', 'theta']
+
+
+def get_link(rank):
+    return f'https://example.com/{rank}'
+
+
+def make_page(ranks):
+    """
+    Return Google results page with result blocks of the given ranks
+    """
+    blocks = ''.join(
+        f'<div class="g"><a href="{get_link(rank)}"><h3>Title {WORDS[rank % len(WORDS)]}</h3></a>'
+        f'<span class="aCOpRe">Description {WORDS[rank % 3]} {rank}</span></div>'
+        for rank in ranks
+    )
+    return f'<html><body><div id="result-stats">About 12,300 results</div>{blocks}</body></html>'
+
+
+class FakeGoogle(object):
+    """
+    Serve pages of 100 results with the fetch delay, by default every page starts at its offset
+    """
+
+    def __init__(self, pages=None, delay=0.05):
+        self.pages = pages or {}
+        self.delay = delay
+        self.fetched = []
+        self.in_flight = self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def fetch_results(self, url):
+        params = parse_qs(urlparse(url).query)
+        start = int(params.get('start', ['0'])[0])
+        with self.lock:
+            self.fetched.append(start)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self.lock:
+            self.in_flight -= 1
+        return make_page(self.pages.get(start, range(start, start + int(params['num'][0]))))
+
+
+@pytest.fixture
+def fake_google(monkeypatch):
+    google = FakeGoogle()
+    monkeypatch.setattr(
+        GoogleScraper, 'fetch_results', lambda scraper, url=None: google.fetch_results(url or scraper.google_url),
+    )
+    monkeypatch.setattr(ScraperConfig, 'PAGE_SIZE', 100)
+    monkeypatch.setattr(ScraperConfig, 'PAGE_WORKERS', 3)
+    return google
+
+
+def test_pages_are_fetched_concurrently_and_added_in_rank_order(fake_google):
+    """
+    Verify that pages are fetched at once and their links are added in the rank order up to results_limitation
+    """
+    scraper = GoogleScraper('test', None, results_limitation=250, user_agent='pytest')
+    results = scraper.search()
+
+    assert sorted(fake_google.fetched) == [0, 100, 200]
+    assert fake_google.max_in_flight == 3
+    assert scraper.links == [get_link(rank) for rank in range(250)]
+    assert results['number_of_results'] == 12300
+
+    parsed = GoogleScraper('test', None, results_limitation=250, user_agent='pytest')
+    parsed.parse_results(make_page(range(250)))
+    assert results['top_words'] == parsed.top_words
+
+
+def test_async_scraper_fetches_pages(fake_google):
+    """
+    Verify that async scraper gets results above one page from many pages, like the blocking one
+    """
+    scraper = AsyncGoogleScraper('test', None, results_limitation=250, user_agent='pytest')
+    results = async_to_sync(scraper.search)()
+
+    assert sorted(fake_google.fetched) == [0, 100, 200]
+    assert list(results['links'].values()) == [get_link(rank) for rank in range(250)]
+
+
+def test_repeated_links_are_added_once(fake_google):
+    """
+    Verify that results repeated on the next page are skipped and the missing results are taken from the next page
+    """
+    fake_google.pages[100] = range(90, 190)
+    scraper = GoogleScraper('test', None, results_limitation=200, user_agent='pytest')
+    scraper.search()
+
+    assert fake_google.fetched[-1] == 200
+    assert scraper.links == [get_link(rank) for rank in list(range(190)) + list(range(200, 210))]
+
+
+def test_pages_stop_at_empty_page(fake_google):
+    """
+    Verify that scraping stops at the first page without result blocks.
+    Page 300 is requested with the first page added and may be fetched before the empty page is seen
+    """
+    fake_google.pages[100] = []
+    scraper = GoogleScraper('test', None, results_limitation=500, user_agent='pytest')
+    scraper.search()
+
+    assert scraper.links == [get_link(rank) for rank in range(100)]
+    assert 400 not in fake_google.fetched
+
+
+def test_single_page_url_is_not_changed(fake_google):
+    """
+    Verify that results_limitation up to PAGE_SIZE is scraped from the single page without offset
+    """
+    scraper = GoogleScraper('test', None, results_limitation=20, lang='pl', user_agent='pytest')
+    scraper.search()
+
+    assert scraper.google_url == f'{ScraperConfig.GOOGLE_URL}?q=test&num=25&hl=pl'
+    assert fake_google.fetched == [0]
+    assert len(scraper.links) == 20
+
+
+def test_page_url_parameters_are_encoded():
+    """
+    Verify that "&", "#" and "=" of the query, lang and country don't add or cut off url parameters
+    """
+    scraper = GoogleScraper('a&b c#d=e', None, lang='en&start=900', country='PL#x=1', user_agent='pytest')
+    url = scraper.get_page_url(25, start=100)
+
+    assert urlparse(url).fragment == ''
+    assert parse_qs(urlparse(url).query) == {
+        'q': ['a&b c#d=e'], 'num': ['25'], 'start': ['100'], 'hl': ['en&start=900'], 'cr': ['countryPL#x=1'],
+    }
@@ -0,0 +1,131 @@
+import timeit
+from pathlib import Path
+
+import pytest
+
+from ..apps import ScraperConfig
+from .. import mixins
+from ..mixins import GoogleScraper, parse_executors
+from ..parsers import LxmlParser, SoupParser, StreamParser
+
+# Synthetic Google results pages
+SERP_FIXTURES = sorted((Path(__file__).parent / 'fixtures' / 'serp').glob('*.html'))
+
+
+def parse(raw_html, backend, monkeypatch):
+    monkeypatch.setattr(ScraperConfig, 'PARSER_BACKEND', backend)
+    scraper = GoogleScraper('test', None, user_agent='pytest')
+    scraper.parse_results(raw_html)
+    return scraper
+
+
+@pytest.mark.parametrize('path', SERP_FIXTURES, ids=lambda path: path.stem)
+def test_parser_backends_return_the_same_blocks(path):
+    """
+    Verify that lxml parser finds the same result blocks and stats as BeautifulSoup parser
+    """
+    raw_html = path.read_text(encoding='utf-8')
+    soup_parser, lxml_parser = SoupParser(raw_html), LxmlParser(raw_html)
+
+    assert lxml_parser.get_result_stats() == soup_parser.get_result_stats()
+    assert list(lxml_parser.get_result_blocks()) == list(soup_parser.get_result_blocks())
+
+
+@pytest.mark.parametrize('path', SERP_FIXTURES, ids=lambda path: path.stem)
+def test_stream_parser_returns_the_same_blocks(path):
+    """
+    Verify that stream parser fed in chunks finds the same result blocks and stats as BeautifulSoup parser
+    """
+    raw_html = path.read_text(encoding='utf-8')
+    stream_parser, blocks = StreamParser(), []
+    for i in range(0, len(raw_html), 1000):
+        stream_parser.feed(raw_html[i:i + 1000])
+        blocks += stream_parser.get_result_blocks()
+    stream_parser.close()
+    blocks += stream_parser.get_result_blocks()
+
+    soup_parser = SoupParser(raw_html)
+    assert stream_parser.get_result_stats() == soup_parser.get_result_stats()
+    assert blocks == list(soup_parser.get_result_blocks())
+
+
+class StreamedResponse(object):
+    """
+    Fake requests response counting downloaded chunks of the page
+    """
+    status_code = 200
+    headers = {}
+
+    def __init__(self, raw_html):
+        self.raw_html, self.encoding, self.chunks = raw_html, 'utf-8', 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size, decode_unicode):
+        for i in range(0, len(self.raw_html), chunk_size):
+            self.chunks += 1
+            yield self.raw_html[i:i + chunk_size]
+
+
+def test_streaming_stops_after_results_limitation(monkeypatch):
+    """
+    Verify that streaming download stops when enough links are found and gives the same results
+    """
+    raw_html = (SERP_FIXTURES[0].parent / 'en_speed_test_num100.html').read_text(encoding='utf-8')
+    response = StreamedResponse(raw_html)
+    monkeypatch.setattr(mixins, 'http_get', lambda *args, **kwargs: response)
+    monkeypatch.setattr(ScraperConfig, 'STREAMING_FETCH', True)
+    monkeypatch.setattr(ScraperConfig, 'STREAMING_CHUNK_SIZE', 4096)
+
+    streamed = GoogleScraper('test', None, results_limitation=5, user_agent='pytest')
+    streamed.search()
+    parsed = GoogleScraper('test', None, results_limitation=5, user_agent='pytest')
+    parsed.parse_results(raw_html)
+
+    assert response.chunks < len(raw_html) / 4096 * 0.75
+    assert streamed.links == parsed.links
+    assert streamed.top_words == parsed.top_words
+    assert streamed.number_of_results == parsed.number_of_results
+
+
+@pytest.mark.parametrize('path', SERP_FIXTURES, ids=lambda path: path.stem)
+def test_parser_backends_return_the_same_results(path, monkeypatch, record_property):
+    """
+    Verify that lxml parser backend gives the same scraping results as BeautifulSoup backend
+    and report its speedup
+    """
+    raw_html = path.read_text(encoding='utf-8')
+    soup_scraper = parse(raw_html, 'soup', monkeypatch)
+    lxml_scraper = parse(raw_html, 'lxml', monkeypatch)
+
+    assert soup_scraper.links
+    assert lxml_scraper.links == soup_scraper.links
+    assert lxml_scraper.top_words == soup_scraper.top_words
+    assert lxml_scraper.number_of_results == soup_scraper.number_of_results
+
+    soup_time = min(timeit.repeat(lambda: parse(raw_html, 'soup', monkeypatch), number=1, repeat=3))
+    lxml_time = min(timeit.repeat(lambda: parse(raw_html, 'lxml', monkeypatch), number=1, repeat=3))
+    record_property('lxml_speedup', round(soup_time / lxml_time, 1))
+
+
+@pytest.mark.parametrize('executor', ['thread', 'process'])
+def test_parse_executors_results_the_same_as_inline(executor, monkeypatch):
+    """
+    Verify that pages parsed in the thread or process pool give the same results as parsed inline
+    """
+    raw_html = SERP_FIXTURES[0].read_text(encoding='utf-8')
+    monkeypatch.setattr(GoogleScraper, 'fetch_results', lambda scraper: raw_html)
+    inline = GoogleScraper('test', None, user_agent='pytest').search()
+
+    monkeypatch.setattr(ScraperConfig, 'PARSE_EXECUTOR', executor)
+    try:
+        assert GoogleScraper('test', None, user_agent='pytest').search() == inline
+    finally:
+        parse_executors.pop(executor).shutdown()
@@ -0,0 +1,97 @@
+import pstats
+
+import pytest
+from django.core.management import call_command
+
+from ..apps import ScraperConfig
+from ..benchmarks import SERP_FIXTURES_DIR, get_scraper
+from ..mixins import GoogleScraper, parse_executors
+from ..profiling import profile_sampled
+from .test_mixins import get_results_page
+
+
+@pytest.fixture
+def profiling_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(ScraperConfig, 'PROFILING_DIR', tmp_path)
+    monkeypatch.setattr(ScraperConfig, 'PROFILING_SAMPLE_RATE', 1)
+    return tmp_path
+
+
+def test_sampled_call_saved_with_parsed_html(profiling_dir):
+    """
+    Verify that profile of the sampled call is saved with the parsed page
+    """
+    raw_html = (SERP_FIXTURES_DIR / 'en_test.html').read_text(encoding='utf-8')
+    profile_sampled(lambda: get_scraper().parse_results(raw_html))()
+
+    profile, = profiling_dir.glob('*.prof')
+    assert profile.with_suffix('.html').read_text(encoding='utf-8') == raw_html
+
+
+def get_profiled_functions(profile):
+    return {name for _, _, name in pstats.Stats(str(profile)).stats}
+
+
+def test_sampled_call_parsed_in_request_thread(profiling_dir, monkeypatch):
+    """
+    Verify that page of the sampled call is parsed in the profiled thread instead of the parse pool
+    """
+    monkeypatch.setattr(ScraperConfig, 'PARSE_EXECUTOR', 'thread')
+    raw_html = (SERP_FIXTURES_DIR / 'en_test.html').read_text(encoding='utf-8')
+    profile_sampled(lambda: get_scraper().parse_page(raw_html))()
+
+    profile, = profiling_dir.glob('*.prof')
+    assert 'get_result_blocks' in get_profiled_functions(profile)
+    assert profile.with_suffix('.html').read_text(encoding='utf-8') == raw_html
+    assert 'thread' not in parse_executors
+
+
+def test_sampled_pages_parsed_in_request_thread(profiling_dir, monkeypatch):
+    """
+    Verify that pages fetched by the page workers of the sampled call are parsed in the profiled thread
+    """
+    raw_html = (SERP_FIXTURES_DIR / 'en_speed_test_num100.html').read_text(encoding='utf-8')
+    monkeypatch.setattr(GoogleScraper, 'fetch_results', lambda scraper, url=None: raw_html)
+    scraper = GoogleScraper('test', None, user_agent='pytest', results_limitation=150)
+    profile_sampled(scraper.search)()
+
+    profile, = profiling_dir.glob('*.prof')
+    assert 'get_result_blocks' in get_profiled_functions(profile)
+    assert profile.with_suffix('.html').read_text(encoding='utf-8').startswith(raw_html * 2)
+
+def test_profiles_rotated(profiling_dir, monkeypatch):
+    """
+    Verify that only the last PROFILING_MAX_FILES profiles are kept
+    """
+    monkeypatch.setattr(ScraperConfig, 'PROFILING_MAX_FILES', 2)
+    for _ in range(4):
+        profile_sampled(lambda: None)()
+
+    assert len(list(profiling_dir.glob('*.prof'))) == 2
+
+
+def test_not_sampled_call_not_profiled(profiling_dir, monkeypatch):
+    """
+    Verify that profiling is disabled with 0 sample rate
+    """
+    monkeypatch.setattr(ScraperConfig, 'PROFILING_SAMPLE_RATE', 0)
+    profile_sampled(lambda: None)()
+
+    assert not list(profiling_dir.iterdir())
+
+
+@pytest.mark.django_db
+def test_results_view_profiles_aggregated(client, search_calls, profiling_dir, capsys):
+    """
+    Verify that results view requests are profiled and aggregated into folded stacks
+    """
+    get_results_page(client, 'test', '10.0.0.1')
+    get_results_page(client, 'other', '10.0.0.1')
+    output = profiling_dir / 'profiles.folded'
+
+    call_command('aggregate_profiles', dir=str(profiling_dir), output=str(output))
+
+    assert '2 profiles' in capsys.readouterr().out
+    lines = output.read_text().splitlines()
+    assert any('get_results' in line for line in lines)
+    assert all(int(line.rsplit(' ', 1)[1]) > 0 for line in lines)
@@ -0,0 +1,134 @@
+import datetime
+import gzip
+import io
+import json
+
+import pytest
+import pytz
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .. import retention
+from ..models import Results, ResultsAccess
+
+
+def create_results(key, days_ago):
+    results = Results.objects.create(key=key, query=key, links={}, top_words={})
+    modified_date = datetime.datetime.now(pytz.utc) - datetime.timedelta(days=days_ago)
+    Results.objects.filter(id=results.id).update(modified_date=modified_date)
+    ResultsAccess.objects.create(results=results, ip='10.0.0.1')
+    ResultsAccess.objects.filter(results=results).update(created_date=modified_date)
+    return results
+
+
+@pytest.mark.django_db
+def test_purge_archives_and_deletes_expired_rows_in_batches(tmp_path):
+    """
+    Verify that purge command archives expired results and access log and deletes them in batches
+    """
+    for i in range(5):
+        create_results(f'old{i}', days_ago=365)
+    create_results('new', days_ago=0)
+
+    call_command('purge_results', archive=str(tmp_path), batch_size=2)
+
+    assert list(Results.objects.values_list('key', flat=True)) == ['new']
+    assert ResultsAccess.objects.count() == 1
+    archived = {
+        path.name.split('-')[0]: [json.loads(line) for line in gzip.open(path, 'rt', encoding='utf-8')]
+        for path in tmp_path.iterdir()
+    }
+    assert sorted(row['key'] for row in archived['results']) == [f'old{i}' for i in range(5)]
+    assert len(archived['accesses']) == 5
+
+
+@pytest.mark.django_db
+def test_purge_keeps_rows_updated_in_batch():
+    """
+    Verify that results scraped again after they were selected for deletion are kept
+    """
+    for i in range(2):
+        create_results(f'old{i}', days_ago=365)
+
+    class RefreshingArchive(io.StringIO):
+        def write(self, line):
+            Results.objects.filter(key='old0').update(modified_date=datetime.datetime.now(pytz.utc))
+            return super().write(line)
+
+    archive = RefreshingArchive()
+    retention.purge(retention.get_expired_results(), archive=archive)
+
+    assert list(Results.objects.values_list('key', flat=True)) == ['old0']
+    assert len(archive.getvalue().splitlines()) == 2
+
+
+@pytest.mark.django_db
+def test_purge_without_archive_reads_only_keys(django_assert_max_num_queries):
+    """
+    Verify that rows are not loaded when they aren't archived, only their primary keys
+    """
+    for i in range(3):
+        create_results(f'old{i}', days_ago=365)
+    create_results('new', days_ago=0)
+
+    with CaptureQueriesContext(connection) as queries:
+        assert retention.purge(retention.get_expired_results(), batch_size=2) == 3
+
+    selects = [query['sql'] for query in queries if query['sql'].startswith('SELECT')]
+    assert selects and all('"links"' not in sql for sql in selects)
+    assert list(Results.objects.values_list('key', flat=True)) == ['new']
+
+
+@pytest.mark.django_db
+def test_purge_dry_run_keeps_rows(capsys):
+    """
+    Verify that dry run only counts expired rows
+    """
+    create_results('old', days_ago=365)
+
+    call_command('purge_results', dry_run=True)
+
+    assert capsys.readouterr().out.splitlines() == ['accesses: 1', 'results: 1']
+    assert Results.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_partitioning_requires_postgres():
+    """
+    Verify that access log partitioning fails clearly on not supported database
+    """
+    with pytest.raises(CommandError, match='PostgreSQL'):
+        call_command('partition_access_log')
+
+
+@pytest.mark.postgres
+@pytest.mark.django_db
+def test_expired_partitions_of_access_log_dropped():
+    """
+    Verify that the access log is partitioned by month, new rows go to their partitions
+    and partitions older than ACCESS_RETENTION are archived and dropped at once
+    """
+    past = datetime.datetime.now(pytz.utc) - datetime.timedelta(days=365)
+    first_month = retention.get_month_start(past, 1)
+    old = create_results('old', days_ago=400)
+
+    created = retention.partition_access_log(months_ahead=2, now=past)
+
+    assert retention.is_access_log_partitioned()
+    assert created[-2:] == [
+        f'{retention.ACCESS_TABLE}_p{first_month:%Y_%m}',
+        f'{retention.ACCESS_TABLE}_p{retention.get_month_start(past, 2):%Y_%m}',
+    ]
+    assert retention.partition_access_log(months_ahead=2, now=past) == []
+    ResultsAccess.objects.create(results=old, ip='10.0.0.2')
+    ResultsAccess.objects.filter(ip='10.0.0.2').update(created_date=first_month + datetime.timedelta(days=1))
+    create_results('new', days_ago=0)
+
+    archive = io.StringIO()
+    assert retention.drop_expired_partitions(archive) == 1
+
+    assert [json.loads(line)['ip'] for line in archive.getvalue().splitlines()] == ['10.0.0.2']
+    assert retention.get_expired_partitions(datetime.datetime.now(pytz.utc)) == []
+    # Rows of the legacy and default partitions are kept for purge
+    assert ResultsAccess.objects.count() == 2
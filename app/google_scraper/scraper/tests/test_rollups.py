@@ -0,0 +1,113 @@
+import datetime
+
+import pytest
+import pytz
+from django import urls
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from ..models import DailyRollup, DailyWordRollup, Results, ResultsAccess, ResultWord
+from ..rollups import rollup
+
+NOW = datetime.datetime(2021, 3, 10, 12, 0, tzinfo=pytz.utc)
+
+
+def create_results(query, modified_date, country='', lang='', number_of_results=None, words=None, accesses=()):
+    """
+    Create results scraped at modified_date with the access log of (created_date, cache_hit) tuples
+    """
+    results = Results.objects.create(key=query, query=query, country=country, lang=lang, links={}, top_words={},
+                                     number_of_results=number_of_results)
+    Results.objects.filter(id=results.id).update(modified_date=modified_date)
+    for word, count in (words or {}).items():
+        ResultWord.objects.create(results=results, word=word, count=count)
+    for created_date, cache_hit in accesses:
+        access = ResultsAccess.objects.create(results=results, ip='10.0.0.1', cache_hit=cache_hit)
+        ResultsAccess.objects.filter(id=access.id).update(created_date=created_date)
+    return results
+
+
+def get_daily(**lookup):
+    return DailyRollup.objects.values(
+        'requests', 'cache_hits', 'scrapes', 'number_of_results_sum', 'number_of_results_count',
+    ).get(**lookup)
+
+
+@pytest.fixture
+def rollups(db):
+    """
+    Results of two days in Poland and Germany rolled up at NOW
+    """
+    day = NOW - datetime.timedelta(days=1)
+    create_results('first', day, 'PL', 'pl', 1000, {'python': 3, 'django': 1},
+                   accesses=[(day, False), (day, True), (day, True)])
+    create_results('second', day, 'PL', 'pl', 3000, {'python': 1})
+    create_results('third', NOW - datetime.timedelta(hours=1), 'DE', 'de', None, {'scraper': 5},
+                   accesses=[(NOW - datetime.timedelta(hours=1), False)])
+    rollup(NOW)
+
+
+def test_rollup_is_incremental(rollups):
+    """
+    Verify that rollup aggregates rows per day, country and lang, and the next run adds only rows after the watermark
+    """
+    assert get_daily(day=datetime.date(2021, 3, 9), country='PL', lang='pl') == {
+        'requests': 3, 'cache_hits': 2, 'scrapes': 2, 'number_of_results_sum': 4000, 'number_of_results_count': 2,
+    }
+    assert get_daily(day=datetime.date(2021, 3, 10), country='DE')['number_of_results_count'] == 0
+    assert DailyWordRollup.objects.get(day=datetime.date(2021, 3, 9), word='python').count == 4
+
+    # Rows of the last ROLLUP_LAG sec are left for the next run
+    create_results('late', NOW - datetime.timedelta(seconds=10), 'DE', 'de', 500, {'scraper': 1})
+    rollup(NOW)
+    rollup(NOW + datetime.timedelta(minutes=5))
+
+    assert get_daily(day=datetime.date(2021, 3, 10), country='DE') == {
+        'requests': 1, 'cache_hits': 0, 'scrapes': 2, 'number_of_results_sum': 500, 'number_of_results_count': 1,
+    }
+    assert DailyWordRollup.objects.get(day=datetime.date(2021, 3, 10), word='scraper').count == 6
+
+
+def test_rollup_rebuild_command(rollups, capsys):
+    """
+    Verify that rebuilt rollups are the same as incremental ones
+    """
+    rows = list(DailyRollup.objects.values().order_by('day', 'country'))
+    call_command('rollup_results', rebuild=True)
+
+    assert 'Rolled up' in capsys.readouterr().out
+    assert [dict(row, id=None) for row in DailyRollup.objects.values().order_by('day', 'country')] == \
+        [dict(row, id=None) for row in rows]
+
+
+def test_daily_analytics_api_reads_only_rollups(rollups, admin_client):
+    """
+    Verify that daily analytics are filtered and grouped without queries of the raw tables
+    """
+    with CaptureQueriesContext(connection) as queries:
+        resp = admin_client.get(urls.reverse('scraper:analytics-daily'), {'date_from': '2021-03-09'})
+    assert not [query for query in queries if 'scraper_results' in query['sql']]
+
+    assert resp.json() == [
+        {'day': '2021-03-09', 'requests': 3, 'cache_hits': 2, 'cache_hit_ratio': 0.667, 'scrapes': 2,
+         'average_number_of_results': 2000},
+        {'day': '2021-03-10', 'requests': 1, 'cache_hits': 0, 'cache_hit_ratio': 0.0, 'scrapes': 1,
+         'average_number_of_results': None},
+    ]
+
+    resp = admin_client.get(urls.reverse('scraper:analytics-daily'), {'group_by': 'country,lang', 'country': 'DE'})
+    assert [(row['day'], row['country'], row['lang']) for row in resp.json()] == [('2021-03-10', 'DE', 'de')]
+
+
+def test_words_analytics_api(rollups, admin_client, client):
+    """
+    Verify that trending words are summed up in the period and the API is available only to admins
+    """
+    resp = admin_client.get(urls.reverse('scraper:analytics-words'), {'date_to': '2021-03-09', 'limit': 1})
+    assert resp.json() == [{'word': 'python', 'count': 4}]
+
+    resp = admin_client.get(urls.reverse('scraper:analytics-words'))
+    assert [row['word'] for row in resp.json()] == ['scraper', 'python', 'django']
+
+    assert client.get(urls.reverse('scraper:analytics-words')).status_code == 403
@@ -0,0 +1,122 @@
+from pathlib import Path
+
+import pytest
+
+from .. import mixins
+from ..apps import ScraperConfig
+from ..exceptions import ScrapingQueueTimeout, ScrapingThrottled
+from ..metrics import throttled_responses
+from ..mixins import GoogleScraper
+from ..parsers import is_captcha_page
+from ..scheduler import CLIENT_PROFILE, ScrapingScheduler, scraping_scheduler
+from ...core.utils import metrics_registry
+from .test_parsers import SERP_FIXTURES
+
+CAPTCHA_PAGE = Path(__file__).parent / 'fixtures' / 'captcha' / 'sorry.html'
+
+
+class Response(object):
+    """
+    Fake requests response
+    """
+
+    def __init__(self, text, status_code=200, headers=None):
+        self.text, self.status_code, self.headers = text, status_code, headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise AssertionError('Throttled response must be handled before raise_for_status')
+
+
+@pytest.fixture
+def parsed_pages(monkeypatch):
+    """
+    Count parsed pages
+    """
+    pages = []
+    monkeypatch.setattr(GoogleScraper, 'parse_results', lambda scraper, raw_html: pages.append(raw_html))
+    return pages
+
+
+def test_captcha_page_is_detected():
+    """
+    Verify that CAPTCHA page is detected and none of the results pages is taken for CAPTCHA page
+    """
+    assert is_captcha_page(CAPTCHA_PAGE.read_text(encoding='utf-8'))
+    for path in SERP_FIXTURES:
+        assert not is_captcha_page(path.read_text(encoding='utf-8'))
+
+
+def test_captcha_page_throttles_scraping_without_parsing(monkeypatch, parsed_pages):
+    """
+    Verify that CAPTCHA page isn't parsed and slows down requests of the host and the browser profile,
+    exposed on the metrics
+    """
+    response = Response(CAPTCHA_PAGE.read_text(encoding='utf-8'))
+    monkeypatch.setattr(mixins, 'http_get', lambda *args, **kwargs: response)
+    throttled = throttled_responses.get(reason='captcha')
+    scraper = GoogleScraper('test', None, browser='Chrome')
+
+    with pytest.raises(ScrapingThrottled):
+        scraper.search()
+
+    assert not parsed_pages
+    assert throttled_responses.get(reason='captcha') == throttled + 1
+    stats = scraping_scheduler.get_stats()
+    assert stats['hosts'][scraper.host] == ScraperConfig.GOOGLE_RATE_LIMIT * ScraperConfig.THROTTLE_SLOWDOWN
+    assert stats['profiles']['Chrome'] == ScraperConfig.PROFILE_RATE_LIMIT * ScraperConfig.THROTTLE_SLOWDOWN
+
+    metrics = metrics_registry.render()
+    assert f'scraper_scheduler_rate{{limit="profiles",key="Chrome"}} {stats["profiles"]["Chrome"]}' in metrics
+    assert f'scraper_scheduler_throttled{{limit="hosts",key="{scraper.host}"}} 1' in metrics
+
+
+def test_retry_after_pauses_requests(monkeypatch, parsed_pages):
+    """
+    Verify that requests wait for the end of Retry-After pause and fail when it's longer than the queue timeout
+    """
+    response = Response('Too many requests', status_code=429, headers={'Retry-After': '60'})
+    monkeypatch.setattr(mixins, 'http_get', lambda *args, **kwargs: response)
+    monkeypatch.setattr(ScraperConfig, 'GOOGLE_QUEUE_TIMEOUT', 0.1)
+
+    with pytest.raises(ScrapingThrottled) as exc_info:
+        GoogleScraper('test', None, user_agent='pytest').search()
+    assert exc_info.value.wait == 60
+
+    response.status_code = 200
+    with pytest.raises(ScrapingQueueTimeout):
+        GoogleScraper('test', None, user_agent='pytest').search()
+    # Other browser profiles still wait for the host
+    with pytest.raises(ScrapingQueueTimeout):
+        GoogleScraper('test', None, browser='Edge').search()
+    assert not parsed_pages
+
+
+def test_successful_responses_restore_rate(monkeypatch):
+    """
+    Verify that successful responses restore the rate of the throttled browser profile
+    """
+    monkeypatch.setattr(mixins, 'http_get', lambda *args, **kwargs: Response('<html></html>'))
+    monkeypatch.setattr(ScraperConfig, 'PROFILE_RATE_LIMIT', 100)
+    monkeypatch.setattr(ScraperConfig, 'GOOGLE_RATE_LIMIT', 100)
+    scraping_scheduler.reset()
+    scraper = GoogleScraper('test', None, user_agent='pytest')
+    scraping_scheduler.throttle(scraper.host, CLIENT_PROFILE, pause=0)
+
+    responses = 0
+    while scraping_scheduler.get_stats()['profiles'][CLIENT_PROFILE] < 100:
+        scraper.fetch_results()
+        responses += 1
+
+    assert responses == 5
+
+
+def test_random_browser_is_the_least_loaded_profile():
+    """
+    Verify that scraper without browser and client's user agent takes the browser profile with the most tokens
+    """
+    scheduler = ScrapingScheduler()
+    for browser in ['Edge', 'Firefox']:
+        scheduler.acquire('www.google.com', browser)
+
+    assert scheduler.choose_profile(list(GoogleScraper.BROWSERS)) == 'Chrome'
@@ -0,0 +1,107 @@
+import pytest
+from django.core.management import call_command
+
+from ..apps import ScraperConfig
+from ..benchmarks import SERP_FIXTURES_DIR, get_scraper
+from ..mixins import GoogleScraper
+from ..models import Results
+from ..store import HtmlStore, html_store
+from ..words import dump_top_words
+
+
+@pytest.fixture
+def store_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(ScraperConfig, 'HTML_STORE_ENABLED', True)
+    monkeypatch.setattr(ScraperConfig, 'HTML_STORE_DIR', tmp_path)
+    return tmp_path
+
+
+def test_same_pages_saved_once(tmp_path):
+    """
+    Verify that the same page of different requests is saved once and compressed
+    """
+    store = HtmlStore(tmp_path)
+    raw_html = (SERP_FIXTURES_DIR / 'en_test.html').read_text(encoding='utf-8')
+
+    assert store.put('a' * 40, raw_html) == store.put('b' * 40, raw_html)
+    blob, = store.get_blobs()
+    assert blob.stat().st_size < len(raw_html) / 2
+    assert store.get('a' * 40) == store.get('b' * 40) == raw_html
+    assert store.get('c' * 40) is None
+    assert sorted(store.keys()) == ['a' * 40, 'b' * 40]
+
+
+def test_least_recently_saved_pages_evicted(tmp_path):
+    """
+    Verify that the oldest pages and their references are evicted above max bytes
+    """
+    store = HtmlStore(tmp_path, max_bytes=1000)
+    pages = [str(i) * 2000 for i in range(3)]
+    for i, page in enumerate(pages):
+        store.put(str(i) * 40, page)
+    size = store.get_size()
+    store._max_bytes = size * 2 // 3 + 1
+
+    store.put('3' * 40, pages[0])
+
+    assert store.get('1' * 40) is None
+    assert store.get('0' * 40) == store.get('3' * 40) == pages[0]
+    assert '1' * 40 not in set(store.keys())
+
+
+def test_fetched_page_stored(store_dir, monkeypatch):
+    """
+    Verify that scraper saves the fetched page under the request key
+    """
+    raw_html = (SERP_FIXTURES_DIR / 'en_test.html').read_text(encoding='utf-8')
+    monkeypatch.setattr(GoogleScraper, 'fetch_results', lambda scraper: raw_html)
+
+    GoogleScraper('Test', None, lang='en', user_agent='pytest').search()
+
+    assert html_store.get(GoogleScraper.get_results_key('test', lang='en')) == raw_html
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('workers', [0, 2])
+def test_reparse_updates_results_from_stored_pages(store_dir, workers, capsys):
+    """
+    Verify that reparse command updates results from the stored pages without scraping
+    """
+    raw_html = (SERP_FIXTURES_DIR / 'en_test.html').read_text(encoding='utf-8')
+    key = GoogleScraper.get_results_key('test')
+    html_store.put(key, raw_html)
+    html_store.put(GoogleScraper.get_results_key('deleted'), raw_html)
+    Results.objects.create(key=key, query='test', links={}, top_words=[], results_limitation=20)
+
+    call_command('reparse_results', workers=workers)
+
+    scraper = get_scraper()
+    scraper.parse_results(raw_html)
+    assert capsys.readouterr().out.strip() == 'updated: 1, failed: 0, missing: 1'
+    assert Results.objects.values_list('top_words', flat=True).get() == dump_top_words(scraper.top_words)
+
+
+@pytest.mark.django_db
+def test_reparse_counts_broken_pages_as_failed(store_dir, monkeypatch, capsys):
+    """
+    Verify that page failing to parse is counted as failed and the other pages are updated
+    """
+    raw_html = (SERP_FIXTURES_DIR / 'en_test.html').read_text(encoding='utf-8')
+    parse_results = GoogleScraper.parse_results
+
+    def parse_or_fail(scraper, html):
+        if html == 'broken':
+            raise ValueError(html)
+        return parse_results(scraper, html)
+
+    monkeypatch.setattr(GoogleScraper, 'parse_results', parse_or_fail)
+    for query, page in [('broken', 'broken'), ('test', raw_html)]:
+        key = GoogleScraper.get_results_key(query)
+        html_store.put(key, page)
+        Results.objects.create(key=key, query=query, links={}, top_words=[], results_limitation=20)
+
+    call_command('reparse_results', workers=0)
+
+    assert capsys.readouterr().out.strip() == 'updated: 1, failed: 1, missing: 0'
+    assert Results.objects.get(query='broken').links == {}
+    assert Results.objects.get(query='test').links
@@ -6,19 +6,20 @@ from django import urls
 from requests import get
 
 from ..mixins import GoogleScraper
+from ..stub import StubGoogleServer
 
 
 @pytest.fixture
 def soup():
     """
-    Prepare soup based on "test" query with 5 results
+    Prepare soup based on "test" query with 5 results, served by the local stub Google server
     """
-    url = 'https://www.google.com/search?q=test&num=5'
     browsers = GoogleScraper.BROWSERS
     usr_agent = {
         'User-Agent': browsers[random.choice(list(browsers.keys()))]
     }
-    raw_html = get(url, headers=usr_agent).text
+    with StubGoogleServer(latency=0) as server:
+        raw_html = get(f'{server.url}?q=test&num=5', headers=usr_agent).text
     return BeautifulSoup(raw_html, 'html.parser')
 
 
@@ -87,4 +88,4 @@ def test_redirect_to_results_when_scraping(client):
     resp = client.post(url, {
         'query': 'test',
     })
-    assert resp.url == urls.reverse('scraper:results')
+    assert resp.url == f"{urls.reverse('scraper:results')}?query=test"
@@ -0,0 +1,57 @@
+import pytest
+
+from ..benchmarks import SERP_FIXTURES_DIR, count_words, count_words_legacy, get_standard_blocks
+from ..mixins import GoogleScraper
+from ..words import WordCounter, dump_top_words, load_top_words
+
+
+def test_tokenizer_validates_words():
+    """
+    Verify that odd characters, short words, digits and excluded words are skipped
+    """
+    assert GoogleScraper.TOKENIZER.tokenize('Test: the „Speed” test (2020) | A x-ray') == [
+        'test', 'speed', 'test', 'xray',
+    ]
+
+
+def test_top_words_keep_first_occurrence_order_of_ties():
+    """
+    Verify that words with the same count are in order of the first occurrence
+    """
+    counter = WordCounter(GoogleScraper.TOKENIZER)
+    counter.add('beta alpha gamma alpha')
+    counter.add('gamma beta delta')
+
+    assert counter.get_top_words(3) == {'beta': 2, 'alpha': 2, 'gamma': 2}
+
+
+def test_word_counters_aggregate_pages():
+    """
+    Verify that counts of many pages are summed up
+    """
+    first, second = WordCounter(GoogleScraper.TOKENIZER), WordCounter(GoogleScraper.TOKENIZER)
+    first.add('speed test')
+    second.add('test online')
+    first.update(second)
+
+    assert first.get_top_words(10) == {'test': 2, 'speed': 1, 'online': 1}
+
+
+@pytest.mark.parametrize('path', sorted(SERP_FIXTURES_DIR.glob('*.html')), ids=lambda path: path.stem)
+def test_top_words_the_same_as_legacy_counting(path):
+    """
+    Verify that word counter gives the same top words as the previous counting
+    """
+    blocks = get_standard_blocks(path.read_text(encoding='utf-8'))
+
+    assert count_words(blocks) == count_words_legacy(blocks)
+
+
+def test_top_words_loaded_in_order():
+    """
+    Verify that saved pairs keep the order and objects saved before the pairs are ordered by count
+    """
+    top_words = {'zebra': 5, 'mm': 3, 'a': 3}
+
+    assert list(load_top_words(dump_top_words(top_words)).items()) == list(top_words.items())
+    assert list(load_top_words({'a': 1, 'mm': 3, 'zebra': 5})) == ['zebra', 'mm', 'a']
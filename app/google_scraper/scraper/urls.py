@@ -1,5 +1,8 @@
 from django.urls import path
-from .views import ResultsView, ScraperView
+from .views import (
+    BatchView, BulkResultsAPIView, CacheStatsView, DailyAnalyticsView, ResultsAPIView, ResultsView, ScraperView,
+    WordsAnalyticsView, async_results_view, metrics_view,
+)
 
 app_name = "google_scraper.scraper"
 
@@ -14,5 +17,45 @@ urlpatterns = [
         view=ResultsView.as_view(),
         name='results',
     ),
+    path(
+        route='results/async/',
+        view=async_results_view,
+        name='results-async',
+    ),
+    path(
+        route='api/results/',
+        view=ResultsAPIView.as_view(),
+        name='results-api',
+    ),
+    path(
+        route='api/results/bulk/',
+        view=BulkResultsAPIView.as_view(),
+        name='results-bulk',
+    ),
+    path(
+        route='api/batch/',
+        view=BatchView.as_view(),
+        name='batch',
+    ),
+    path(
+        route='api/cache/',
+        view=CacheStatsView.as_view(),
+        name='cache-stats',
+    ),
+    path(
+        route='api/analytics/daily/',
+        view=DailyAnalyticsView.as_view(),
+        name='analytics-daily',
+    ),
+    path(
+        route='api/analytics/words/',
+        view=WordsAnalyticsView.as_view(),
+        name='analytics-words',
+    ),
+    path(
+        route='metrics',
+        view=metrics_view,
+        name='metrics',
+    ),
 ]
 
@@ -1,9 +1,31 @@
+from asgiref.sync import sync_to_async
+from django.db.models import Sum
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
-from django.urls import reverse
+from django.utils.cache import add_never_cache_headers, get_conditional_response, patch_cache_control
+from django.utils.decorators import method_decorator
+from django.utils.http import http_date
 from django.views.generic import View
+from rest_framework.generics import ListAPIView
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from .apps import ScraperConfig
+from .batch import BatchScraper, to_ndjson
+from .filters import DailyRollupFilter, DailyWordRollupFilter
 from .forms import QueryForm
-from .mixins import ResultsMixin
+from .exceptions import ResultsNotFound
+from .mixins import BulkResultsMixin, ResultsMixin, results_cache
+from .models import DailyRollup, DailyWordRollup
+from .profiling import profile_sampled
+from .serializers import (
+    BatchSerializer, BulkQuerySerializer, DailyRollupSerializer, FieldsSerializer, ResultsSerializer,
+    WordCountSerializer,
+)
+from ..core.apps import CoreConfig
+from ..core.exceptions import ServiceUnavailable
+from ..core.utils import compress_page, metrics_registry
 
 
 class ScraperView(View):
@@ -11,7 +33,7 @@ class ScraperView(View):
     A homepage of Google scraper
 
     GET: Render query form. User can write query in the form's field.
-    POST: Set session variable "query" with form data and redirect to results CBV.
+    POST: Redirect to the canonical url of the query results.
     """
 
     form_class = QueryForm
@@ -25,21 +47,250 @@ class ScraperView(View):
         form = self.form_class(request.POST)
         if form.is_valid():
             query = form.cleaned_data.get('query')
-            request.session['query'] = query
-            return redirect(reverse('scraper:results'))
+            view_name = 'scraper:results-async' if ScraperConfig.ASYNC_RESULTS else 'scraper:results'
+            return redirect(ResultsMixin.get_results_url(query, view_name=view_name))
 
         return render(request, self.template_name, {'form': form})
 
 
+def cache_response(request, get_response, etag=None, last_modified=None, max_age=0):
+    """
+    Return response of get_response() with HTTP caching headers, never cached without ETag.
+    Conditional requests of not modified content are answered with 304 without calling get_response().
+    :param last_modified: Timestamp in sec, HTTP dates have second precision
+    """
+    if etag is None:
+        response = get_response()
+        add_never_cache_headers(response)
+        return response
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = get_response()
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, public=True, max_age=max_age)
+    return response
+
+
+def render_unavailable(request, query, exc):
+    """
+    Render results page of the temporarily unavailable scraping with 503 and Retry-After, like DRF API views
+    """
+    response = render(request, ResultsView.template_name, {'query': query, 'error': exc.detail}, status=exc.status_code)
+    response['Retry-After'] = '%d' % exc.wait
+    add_never_cache_headers(response)
+    return response
+
+
+def render_results(request, mixin, results):
+    """
+    Render results with HTTP caching headers derived from the modification date of the results,
+    not modified results are not rendered
+    """
+    return cache_response(
+        request, lambda: render(request, ResultsView.template_name, results), **mixin.get_cache_validators(),
+    )
+
+
 class ResultsView(ResultsMixin, View):
     """
     Results View
+
+    GET: Render results of the query in the url, eg. /results/?query=test&lang=pl.
+    Results urls are canonical and don't depend on the session, so they may be cached and shared.
     """
 
     template_name = 'scraper/results.html'
 
+    @method_decorator(profile_sampled)
+    def get(self, request, *args, **kwargs):
+        self.query = self.get_query(request)
+        if not self.query:
+            return redirect('scraper:index')
+
+        canonical_url = self.get_canonical_url(request)
+        if canonical_url:
+            return redirect(canonical_url, permanent=True)
+
+        try:
+            results = self.get_results(request)
+        except ServiceUnavailable as exc:
+            return render_unavailable(request, self.query, exc)
+
+        return render_results(request, self, results)
+
+
+async def async_results_view(request):
+    """
+    Async Results View
+
+    The same as ResultsView, but Google results are fetched without blocking the worker,
+    so one ASGI process can serve many requests waiting for Google at once.
+    """
+    mixin = ResultsMixin()
+    mixin.query = mixin.get_query(request)
+    if not mixin.query:
+        return redirect('scraper:index')
+
+    canonical_url = mixin.get_canonical_url(request, view_name='scraper:results-async')
+    if canonical_url:
+        return redirect(canonical_url, permanent=True)
+
+    try:
+        results = await mixin.aget_results(request)
+    except ServiceUnavailable as exc:
+        return render_unavailable(request, mixin.query, exc)
+
+    return await sync_to_async(render_results)(request, mixin, results)
+
+
+def get_fields(request):
+    """
+    Return list of the results fields of the API request, empty if all fields are requested
+    """
+    serializer = FieldsSerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+    return serializer.validated_data.get('fields')
+
+
+class ResultsAPIView(ResultsMixin, APIView):
+    """
+    Results API
+
+    GET: Results of GoogleScraper.search() as JSON, scraped if not valid like in the results view,
+    eg. /api/results/?query=test&lang=pl&fields=links,top_words. Only the given fields are returned.
+    Responses are compressed and not modified results are answered with 304, see ETag and Last-Modified.
+    """
+
+    @method_decorator(compress_page)
     def get(self, request, *args, **kwargs):
+        fields = get_fields(request)
+        self.query = self.get_query(request, raise_exception=True)
         results = self.get_results(request)
+        if 'error' in results:
+            raise ResultsNotFound(results['error'])
+
+        return cache_response(
+            request, lambda: Response(ResultsSerializer(results, fields=fields).data), **self.get_cache_validators(),
+        )
+
+
+class BulkResultsAPIView(BulkResultsMixin, APIView):
+    """
+    Bulk results API
+
+    GET: Valid results of many queries in one request, eg. /api/results/bulk/?query=a&query=b&fields=links.
+    Results are only looked up in the cache and db, queries without valid results are listed in "missing"
+    and may be scraped with the results API.
+    """
 
-        return render(request, self.template_name, results) if results else redirect('scraper:index')
+    @method_decorator(compress_page)
+    def get(self, request, *args, **kwargs):
+        serializer = BulkQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        self.set_search_params(params)
+        results, missing = self.get_bulk_results(request, params['query'])
+
+        return cache_response(request, lambda: Response({
+            'results': ResultsSerializer(results, many=True, fields=params.get('fields')).data,
+            'missing': missing,
+        }), **self.get_cache_validators())
+
+
+class BatchView(APIView):
+    """
+    Batch scraping API
+
+    POST: Scrape list of queries, eg. {"queries": [{"query": "test", "lang": "pl", "country": "PL"}]}.
+    Results are streamed as newline delimited JSON as soon as they are ready.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def post(self, request, *args, **kwargs):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        batch = BatchScraper(serializer.validated_data['queries'])
+
+        return StreamingHttpResponse(to_ndjson(batch.run()), content_type='application/x-ndjson')
+
+
+class CacheStatsView(APIView):
+    """
+    Results cache statistics of the serving process
+
+    GET: Hit, miss and eviction counters of the local and shared cache tiers, used to size the cache.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(results_cache.get_stats())
+
+
+class DailyAnalyticsView(ListAPIView):
+    """
+    Daily analytics API, read only from the rollups of the rollup_results command
+
+    GET: Requests, cache hit ratio, scrapes and average number of results per day.
+    Filtered by date_from, date_to, country and lang, grouped also by country and lang with group_by=country,lang.
+    """
+
+    permission_classes = [IsAdminUser]
+    queryset = DailyRollup.objects.all()
+    filterset_class = DailyRollupFilter
+    serializer_class = DailyRollupSerializer
+
+    # Dimensions available in group_by parameter
+    GROUP_BY = ['country', 'lang']
+
+    def list(self, request, *args, **kwargs):
+        group_by = [name for name in request.query_params.get('group_by', '').split(',') if name in self.GROUP_BY]
+        rows = self.filter_queryset(self.get_queryset()).values('day', *group_by).annotate(
+            requests=Sum('requests'),
+            cache_hits=Sum('cache_hits'),
+            scrapes=Sum('scrapes'),
+            number_of_results_sum=Sum('number_of_results_sum'),
+            number_of_results_count=Sum('number_of_results_count'),
+        ).order_by('day', *group_by)
+
+        return Response(self.get_serializer(rows, many=True).data)
+
+
+class WordsAnalyticsView(ListAPIView):
+    """
+    Trending words API, read only from the rollups of the rollup_results command
+
+    GET: The most common words of the results scraped in the period, at most limit words (default 20).
+    Filtered by date_from, date_to, country and lang.
+    """
+
+    permission_classes = [IsAdminUser]
+    queryset = DailyWordRollup.objects.all()
+    filterset_class = DailyWordRollupFilter
+    serializer_class = WordCountSerializer
+
+    def list(self, request, *args, **kwargs):
+        try:
+            limit = min(int(request.query_params.get('limit', 20)), ScraperConfig.ANALYTICS_MAX_WORDS)
+        except ValueError:
+            limit = 20
+        rows = self.filter_queryset(self.get_queryset()).values('word').annotate(
+            count=Sum('count'),
+        ).order_by('-count', 'word')[:max(limit, 0)]
+
+        return Response(self.get_serializer(rows, many=True).data)
+
+
+def metrics_view(request):
+    """
+    Metrics View
+
+    Metrics of the serving process in Prometheus text format, not found if metrics are disabled.
+    """
+    if not CoreConfig.METRICS_ENABLED:
+        raise Http404('Metrics are disabled')
 
+    return HttpResponse(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,68 @@
+from collections import Counter
+
+
+class Tokenizer(object):
+    """
+    Split text into validated words: lowercase, without odd characters,
+    longer than 1 character, not digits and not excluded.
+    Excluded words are kept in a frozenset. Odd characters are removed with str.replace
+    only when present, which for a dozen of characters is faster than str.translate.
+    """
+
+    def __init__(self, excluded_words=(), odd_chars=()):
+        self.excluded_words = frozenset(excluded_words)
+        self.odd_chars = tuple(odd_chars)
+
+    def tokenize(self, text):
+        for ch in self.odd_chars:
+            if ch in text:
+                text = text.replace(ch, '')
+        excluded_words = self.excluded_words
+        return [
+            word for word in text.lower().split()
+            if len(word) > 1 and not word.isdigit() and word not in excluded_words
+        ]
+
+
+class WordCounter(object):
+    """
+    Count words of the texts, eg. titles and descriptions of one or many results pages.
+    Words are counted in the order of the first occurrence, so ties in the top words keep that order.
+    """
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        self.counter = Counter()
+
+    def add(self, text):
+        self.counter.update(self.tokenizer.tokenize(text))
+
+    def update(self, other):
+        """
+        Add counts of the other WordCounter, eg. to get statistics of many pages
+        """
+        self.counter.update(other.counter)
+
+    def get_top_words(self, number):
+        """
+        Return dictionary of the most common words, selected with heapq.nlargest instead of sorting all words
+        """
+        return dict(self.counter.most_common(number))
+
+
+def dump_top_words(top_words):
+    """
+    Return top words as the list of [word, count] pairs saved in Results.top_words.
+    Postgres jsonb doesn't keep the order of object keys, so an object would lose the order of counts.
+    """
+    return [[word, count] for word, count in top_words.items()]
+
+
+def load_top_words(stored):
+    """
+    Return dictionary of top words in the order of the saved pairs.
+    Objects saved before the pairs, eg. still in the results cache, are ordered by count.
+    """
+    if isinstance(stored, dict):
+        return dict(sorted(stored.items(), key=lambda item: item[1], reverse=True))
+    return dict(stored)